@@ -13,12 +13,29 @@ academic integrity.
 '''
 
 
-# shelve is the module that allows the program to store the address data in a permanent database location
-import shelve
+import os
+import base64
+import struct
 import logging
+import threading
+
+from Metrics import Metrics
 
 class Address:
-    DB_FILE = 'address_book.db' # Setting filename where database is stored
+    # Only these attributes are stored on each Address object, so an object does not carry its own __dict__
+    __slots__ = ('addressNumber', 'street', 'unit', 'names', 'position', 'section', 'isBusiness', 'isCBU', 'isVacant')
+    RECORD_VERSION = 1 # Version byte at the start of every compact record written by to_record()
+    RECORD_HEADER = struct.Struct('<BBqqI') # Version, bit flags, addressNumber, section, and number of names
+    RECORD_LENGTH = struct.Struct('<I') # Length in bytes of each string that follows the header
+    FLAG_IS_BUSINESS = 1
+    FLAG_IS_CBU = 2
+    FLAG_IS_VACANT = 4
+    FLAG_HAS_UNIT = 8
+    ENGINE = os.environ.get('ADDRESS_BOOK_ENGINE', 'shelve') # Setting which storage engine the address book uses ('shelve', 'sqlite', or 'sharded')
+    DB_FILE = os.environ.get('ADDRESS_BOOK_FILE', {'sqlite': 'address_book.sqlite3', 'sharded': 'address_book.shards'}.get(ENGINE, 'address_book.db')) # Setting filename where database is stored
+    CACHE_SIZE = int(os.environ.get('ADDRESS_BOOK_CACHE_SIZE', '1024')) # Setting how many decoded addresses each open store keeps in its record cache (0 turns the cache off)
+    LOCK_TIMEOUT = float(os.environ.get('ADDRESS_BOOK_LOCK_TIMEOUT', '10')) # Setting how many seconds an operation waits for another process to release the address book before giving up
+    sharedStores = threading.local() # The AddressStore that each thread keeps open between operations, if it opened one with open_shared_store(), since a store can only be used by one thread at a time
 
     def __init__(
         self,
@@ -42,196 +59,387 @@ class Address:
         self.isBusiness = isBusiness
         self.isCBU = isCBU
         self.isVacant = isVacant
-    
+
+
+    '''
+    __setstate__() restores an Address object that was pickled, which is how addresses were stored before compact records were used.
+    It takes the pickled state for state, which is either the __dict__ of an address pickled before Address used __slots__, or a tuple of a dictionary and the slot values.
+    '''
+    def __setstate__(self, state):
+        if (isinstance(state, tuple)):
+            state = {**(state[0] or {}), **state[1]}
+        for key in Address.__slots__:
+            setattr(self, key, state.get(key))
+
+
+    '''
+    copy() returns a new Address object with the same data as the calling address, so that changing one does not change the other.
+    '''
+    def copy(self):
+        address = Address.__new__(Address)
+        for key in Address.__slots__:
+            setattr(address, key, getattr(self, key))
+        address.names = list(self.names)
+        return address
+
+
+    '''
+    to_dict() returns a dictionary containing the data of the calling address, which is the format that the controller and view work with.
+    The names are copied into a new list, so changing the dictionary never changes the address it came from, such as an address kept in a store's record cache.
+    '''
+    def to_dict(self):
+        return {
+            'addressNumber': self.addressNumber,
+            'street':        self.street,
+            'unit':          self.unit,
+            'names':         list(self.names),
+            'position':      self.position,
+            'section':       self.section,
+            'isBusiness':    self.isBusiness,
+            'isCBU':         self.isCBU,
+            'isVacant':      self.isVacant,
+        }
+
+
+    '''
+    to_record() returns the calling address as a compact record of bytes, which is how the storage engines store an address.
+    The record starts with RECORD_HEADER, which holds the version byte, the bool fields and whether there is a unit as bit flags, the addressNumber and section as packed ints, and the number of names.
+    It is followed by the street, the unit if there is one, and each name, each as its length and its UTF-8 bytes.
+    The position is not stored in the record, since it is kept by the order of the address book.
+    '''
+    def to_record(self):
+        flags = 0
+        if (self.isBusiness):
+            flags |= Address.FLAG_IS_BUSINESS
+        if (self.isCBU):
+            flags |= Address.FLAG_IS_CBU
+        if (self.isVacant):
+            flags |= Address.FLAG_IS_VACANT
+        strings = [self.street]
+        if (self.unit is not None):
+            flags |= Address.FLAG_HAS_UNIT
+            strings.append(self.unit)
+        strings.extend(self.names)
+        parts = [Address.RECORD_HEADER.pack(Address.RECORD_VERSION, flags, self.addressNumber, self.section, len(self.names))]
+        for string in strings:
+            encoded = string.encode('utf-8')
+            parts.append(Address.RECORD_LENGTH.pack(len(encoded)))
+            parts.append(encoded)
+        return b''.join(parts)
+
+
+    '''
+    from_record() is a static method that returns the Address object stored in a compact record written by to_record(), with its position property set to None.
+    It takes bytes for record.
+    The values are set directly, since they were already converted to uppercase when the address was created.
+    If the record does not start with RECORD_VERSION, it raises a ValueError.
+    '''
+    @staticmethod
+    def from_record(record):
+        version, flags, addressNumber, section, nameCount = Address.RECORD_HEADER.unpack_from(record)
+        if (version != Address.RECORD_VERSION):
+            raise ValueError(f"Unknown address record version {version}")
+        offset = Address.RECORD_HEADER.size
+        strings = []
+        for _ in range(1 + (1 if (flags & Address.FLAG_HAS_UNIT) else 0) + nameCount):
+            (length,) = Address.RECORD_LENGTH.unpack_from(record, offset)
+            offset += Address.RECORD_LENGTH.size
+            strings.append(record[offset:(offset + length)].decode('utf-8'))
+            offset += length
+        address = Address.__new__(Address)
+        address.addressNumber = addressNumber
+        address.street = strings[0]
+        address.unit = strings[1] if (flags & Address.FLAG_HAS_UNIT) else None
+        address.names = strings[(len(strings) - nameCount):]
+        address.position = None
+        address.section = section
+        address.isBusiness = bool(flags & Address.FLAG_IS_BUSINESS)
+        address.isCBU = bool(flags & Address.FLAG_IS_CBU)
+        address.isVacant = bool(flags & Address.FLAG_IS_VACANT)
+        return address
+
 
     '''
     read() is a static method that retrieves the data for all existing addresses and returns them in a list of dictionaries.
+    It takes an optional AddressStore for store, which is the open session to use.
+    It builds the list in a single pass over the order index, instead of looking up each position separately.
     If the address book is empty, it returns None.
     '''
     @staticmethod
-    def read():
+    @Metrics.timed
+    def read(store = None):
         logging.debug("Beginning function execution.")
-        lastPosition = Address.get_last_position()
-        if (lastPosition):
+        with Address.session(store) as store:
+            if (not store.header['count']):
+                logging.info("Since the address book is empty, returning None.")
+                return None
             logging.info("Since the address book is not empty, getting each address into a list and returning the list.")
-            addressBookToReturn = []
-            for position in range(1, lastPosition + 1):
-                addressBookToReturn.append(Address.read_single(position))
-            return addressBookToReturn
-        else:
-            logging.info("Since the address book is empty, returning None.")
-            return None
+            return [address.to_dict() for address in store.iter_records()]
+
+
+    '''
+    read_stream() is a static method that works like read(), except that it is a generator that yields each address's data in position order as it is read, instead of building a list of the whole address book.
+    It takes an optional AddressStore for store, which stays open until the generator is finished or closed.
+    If the address book is empty, it yields nothing.
+    '''
+    @staticmethod
+    def read_stream(store = None):
+        logging.debug("Beginning function execution.")
+        with Address.session(store) as store:
+            for address in store.iter_records():
+                yield address.to_dict()
 
 
     '''
     read_single() is a static method that retrieves the data for an address and returns it in a dictionary.
-    It takes an int for positionToRead, which is the position value of the address to be read.
+    It takes an int for positionToRead, which is the position value of the address to be read, and an optional AddressStore for store.
     If no address is found, it returns None.
     '''
     @staticmethod
-    def read_single(positionToRead):
-        logging.debug(f"Beginning function execution with positionToRead = {positionToRead}.")
-        with shelve.open(Address.DB_FILE) as addressBook:
-            if (str(positionToRead) in addressBook):
-                logging.info(f"Since an address was found at position {positionToRead}, returning the address data.")
-                address = addressBook[str(positionToRead)]
-                return {
-                    'addressNumber': address.addressNumber,
-                    'street':        address.street,
-                    'unit':          address.unit,
-                    'names':         address.names,
-                    'position':      address.position,
-                    'section':       address.section,
-                    'isBusiness':    address.isBusiness,
-                    'isCBU':         address.isCBU,
-                    'isVacant':      address.isVacant,
-                }
-            else:
-                logging.info(f"Since no address was found at position {positionToRead}, returning None.")
-                return None
+    @Metrics.timed
+    def read_single(positionToRead, store = None):
+        logging.debug("Beginning function execution with positionToRead = %s.", positionToRead)
+        with Address.session(store) as store:
+            address = store.get_record_at(positionToRead)
+        if (address):
+            logging.info("Since an address was found at position %s, returning the address data.", positionToRead)
+            return address.to_dict()
+        else:
+            logging.info("Since no address was found at position %s, returning None.", positionToRead)
+            return None
+
+
+    '''
+    find() is a static method that retrieves the data for every address that matches all of the given values, using the storage engine's secondary indexes instead of reading every address.
+    It takes an optional string for street, an optional int for addressNumber, an optional string for unit, an optional string for name, which matches any one of an address's names, and an optional AddressStore for store.
+    If addressNumber is given, the street and unit must match exactly, where a unit of None matches only addresses without a unit.
+    The strings are converted to uppercase, the same as when an address is created.
+    It returns a list of dictionaries sorted by position, which is empty if no address matches.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def find(street = None, addressNumber = None, unit = None, name = None, store = None):
+        logging.debug("Beginning function execution with street = %s, addressNumber = %s, unit = %s, name = %s.", street, addressNumber, unit, name)
+        with Address.session(store) as store:
+            addresses = store.find_records(
+                street.upper() if street else street,
+                addressNumber,
+                unit.upper() if unit else unit,
+                name.upper() if name else name
+            )
+        logging.info("Found %s matching addresses.", len(addresses))
+        return [address.to_dict() for address in addresses]
+
+
+    '''
+    find_similar() is a static method that retrieves the data for the addresses whose names or street best match a search text, even if it is misspelled.
+    It takes a string for text, an optional int for limit, which is the largest number of addresses returned, and an optional AddressStore for store.
+    It returns a list of dictionaries sorted from the best match to the worst, each containing the match's 'score' between 0 and 1 and the 'address' data.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def find_similar(text, limit = 10, store = None):
+        logging.debug("Beginning function execution with text = %s, limit = %s.", text, limit)
+        with Address.session(store) as store:
+            matches = store.find_similar(text, limit)
+        logging.info("Found %s similar addresses.", len(matches))
+        return [{'score': score, 'address': address.to_dict()} for score, address in matches]
 
 
     '''
     create() is a method that inserts an address entry into the address book.
     The calling object is what is stored in the actual database, so the object's properties must be set to the desired values before calling this method.
+    It takes an optional AddressStore for store.
+    The address is stored under a new record id, and the record id is inserted into the order index at its position, which moves every later address back one position without rewriting them.
     After inserting the address entry, it reads the new entry from the address book and returns it to confirm the successful operation.
     '''
-    def create(self):
-        logging.debug(f"Beginning function execution with self = {self}.")
-        lastPosition = Address.get_last_position()
-        if (not lastPosition):
-            logging.debug("Since address book is empty, setting position to 1.")
-            self.position = 1
-        elif (self.position > lastPosition):
-            logging.debug(f"Since the position {self.position} is beyond the last position {lastPosition}, setting the position to 1 after the last position.")
-            self.position = lastPosition + 1
-        Address.shift_positions(self.position, 'forward')
-        lastSection = Address.get_last_section()
-        if (not lastSection):
-            logging.debug("Since address book is empty, setting section to 1.")
-            self.section = 1
-        elif (self.section > lastSection):
-            logging.debug(f"Since the section {self.section} is beyond the last section {lastSection}, setting the section to 1 after the last section.")
-            self.section = lastSection + 1
-        with shelve.open(Address.DB_FILE) as addressBook:
-            addressBook[str(self.position)] = self
-        return Address.read_single(self.position)
+    @Metrics.timed
+    def create(self, store = None):
+        logging.debug("Beginning function execution with self = %s.", self)
+        with Address.session(store, exclusive = True) as store:
+            lastPosition = store.header['lastPosition']
+            if (not lastPosition):
+                logging.debug("Since address book is empty, setting position and section to 1.")
+                self.position = 1
+                self.section = 1
+            else:
+                if (self.position > lastPosition):
+                    logging.debug("Since the position %s is beyond the last position %s, setting the position to 1 after the last position.", self.position, lastPosition)
+                    self.position = lastPosition + 1
+                if (self.section > store.header['lastSection']):
+                    logging.debug("Since the section %s is beyond the last section %s, setting the section to 1 after the last section.", self.section, store.header['lastSection'])
+                    self.section = store.header['lastSection'] + 1
+            store.insert_address(self)
+            return Address.read_single(self.position, store)
+
+
+    '''
+    create_batch() is a static method that inserts a list of address entries into the address book in a single pass.
+    It takes a list of Address objects for addresses and an optional AddressStore for store.
+    Each address's position is the position it should have after the batch, which is turned into an insert point in the address book as it was before the batch by taking away the number of addresses sorted before it in the batch, and the addresses are then all inserted at their insert points together.
+    So an address ends up at its position unless addresses sorted before it in the batch already take it up, in which case it goes right after them, and addresses with the same position end up one after another in the order they were given, with the first of them at that position.
+    This is not the same as creating addresses with the same position one after another, which would leave them in the reverse order.
+    Positions and sections beyond the end of the address book are adjusted the same way as in create().
+    It returns a list of dictionaries containing the data of each created address, in the same order as the addresses were given.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def create_batch(addresses, store = None):
+        logging.debug("Beginning function execution with %s addresses.", len(addresses))
+        with Address.session(store, exclusive = True) as store:
+            lastPosition = store.header['lastPosition'] or 0
+            lastSection = store.header['lastSection'] or 0
+            sortedAddresses = sorted(addresses, key = lambda address: address.position)
+            insertPosition = 1
+            for order, address in enumerate(sortedAddresses):
+                insertPosition = max(insertPosition, address.position - order) # The addresses before it in the batch will move it back by one position each
+                if (insertPosition > (lastPosition + 1)):
+                    logging.debug("Since the position %s is beyond the last position, setting the position to 1 after the last position.", address.position)
+                    insertPosition = lastPosition + 1
+                address.position = insertPosition
+                if (address.section > lastSection):
+                    logging.debug("Since the section %s is beyond the last section %s, setting the section to 1 after the last section.", address.section, lastSection)
+                    address.section = lastSection + 1
+                if (address.position == (lastPosition + 1)):
+                    lastSection = address.section # Addresses appended to the end of the route become the last section for the addresses after them
+            store.insert_addresses(sortedAddresses)
+        return [address.to_dict() for address in addresses]
 
 
     '''
     update() is a method that updates an existing address entry in the address book.
     The calling object is what is stored in the actual database, so the object's properties must be set to the desired values before calling this method.
-    It takes an int for initialPosition.
-    Depending on where the update is moving the address relative to its initial position, it deletes the original entry and inserts the new entry in an order that will be compatible with the shifting after each operation.
+    It takes an int for initialPosition and an optional AddressStore for store.
+    The position property is the position the updated address is inserted before, counted with the original entry still in the address book, so an address moved to a higher position ends up one position lower than its position property, after the original entry is taken out.
+    The address is moved with the storage engine's move_address(), which keeps its record and only moves the addresses between the initial and final positions, so an address that stays in the same position is rewritten in place.
+    Positions and sections beyond the end of the address book are adjusted the same way as in create().
     After updating the address entry, it reads the updated entry from the address book and returns it to confirm the successful operation.
-    If 
-    '''
-    def update(self, initialPosition):
-        logging.debug(f"Beginning function execution with self = {self}, initialPosition = {initialPosition}.")
-        if (self.position < initialPosition):
-            logging.debug("Since the address is being moved to a lower position, deleting the address at the initial position first, because shifting the addresses back won't affect the updated address's new position.")
-            Address.delete(initialPosition)
-            self.create()
-            return Address.read_single(self.position)
-        elif (self.position > initialPosition):
-            logging.debug("Since the address is being moved to a higher position, inserting the updated address first so that shifting the addresses back won't affect the updated address's position.")
-            self.create()
-            Address.delete(initialPosition)
-            return Address.read_single(self.position - 1) # Although updated address's position is now one less than desired position due to shifting, addresses are still in the desired order
-        else:
-            logging.debug("Since the updated address is remaining in the same position, the order of deletion and insertion doesn't matter.")
-            Address.delete(initialPosition)
-            self.create()
-            return Address.read_single(self.position)
+    '''
+    @Metrics.timed
+    def update(self, initialPosition, store = None):
+        logging.debug("Beginning function execution with self = %s, initialPosition = %s.", self, initialPosition)
+        with Address.session(store, exclusive = True) as store:
+            count = store.header['count']
+            if (self.position > initialPosition):
+                logging.debug("Since the address is being moved to a higher position, its final position is one less than its position property, since the original entry is taken out before it.")
+                self.position = min(self.position, count + 1) - 1
+            runs = store.header['sections']
+            lastSection = store.header['lastSection']
+            if ((initialPosition == count) and runs and (runs[-1][1] == 1)):
+                lastSection = runs[-2][0] if (len(runs) > 1) else None # The original entry is the only address in the last section, so it does not count as the last section
+            if (lastSection is None):
+                logging.debug("Since the address is the only address in the address book, setting position and section to 1.")
+                self.position = 1
+                self.section = 1
+            elif (self.section > lastSection):
+                logging.debug("Since the section %s is beyond the last section %s, setting the section to 1 after the last section.", self.section, lastSection)
+                self.section = lastSection + 1
+            if (store.move_address(initialPosition, self) is None):
+                logging.info("Since no address exists at position %s, creating the address instead.", initialPosition)
+                return self.create(store)
+            return Address.read_single(self.position, store)
 
 
     '''
     delete() is a static method that deletes an address entry from the address book.
-    It takes an int for positionToDelete.
+    It takes an int for positionToDelete and an optional AddressStore for store.
     Before deleting the address entry, it saves its data and then returns it after the deletion to provide a 'pop' like functionality.
     If the address entry cannot be found, it returns None.
     '''
     @staticmethod
-    def delete(positionToDelete):
-        logging.debug(f"Beginning function execution with positionToDelete = {positionToDelete}.")
-        lastPosition = Address.get_last_position()
-        if (lastPosition is None):
-            logging.info("Since address book is empty, returning None.")
-            return None
-        if (positionToDelete > (lastPosition)):
-            logging.info("Since the position to delete is beyond the last position, returning None.")
-            return None
-        logging.info(f"Since an address exists at position {positionToDelete}, deleting the address at position {positionToDelete}.")
-        addressToDelete = Address.read_single(positionToDelete)
-        Address.shift_positions(positionToDelete, direction = 'backward')
-        return addressToDelete
-
-
-    '''
-    shift_positions() is a static method that shifts the address entries in the address book 1 spot according to the parameters.
-    It takes an int for startPosition which is the initial position value of the address which is adjacent to either the address being deleted or the address to be inserted.
-    It also takes an optional string for direction, which is 'forward' by default for an insert, and the alternative is meant to be 'backward' for a deletion.
-    '''
-    @staticmethod
-    def shift_positions(startPosition, direction = 'forward'):
-        logging.debug(f"Beginning function execution with startPosition = {startPosition}, direction = {direction}.")
-        sortedKeys = Address.get_sorted_keys()
-        if (not sortedKeys):
-            logging.info("Since the address book is empty, returning.")
-            return
-        keysToShift = []
-        for key in sortedKeys:
-            if (key >= startPosition):
-                keysToShift.append(key)
-        if (not keysToShift):
-            logging.info("Since there are no keys needing to be shifted, returning.")
-            return
-        if (direction == 'forward'):
-            logging.debug("Since the shift direction is 'forward', reversing the list of addresses to shift.")
-            keysToShift = list(reversed(keysToShift))
-        logging.debug(f"The keys that will be shifted are: {keysToShift}")
-        with shelve.open(Address.DB_FILE, writeback = True) as addressBook:
-            for position in keysToShift:
-                if (direction == 'forward'):
-                    keyToFill = str(position + 1)
-                    keyToMove = str(position)
-                else:
-                    keyToFill = str(position)
-                    keyToMove = str(position + 1)
-                    if (keyToMove not in addressBook):
-                        del addressBook[keyToFill]
-                        break
-                logging.debug(f"Overwriting the address at position {keyToFill} with the address at position {keyToMove}.")
-                addressBook[keyToFill] = addressBook[keyToMove]
-            for key in addressBook: # After shifting the addresses, make sure the position value of each address matches its key in the address book, since they should be stored in position order.
-                addressBook[key].position = int(key)
-
-
-    '''
-    get_sorted_keys() is a static method that returns a list that contains each key from the address book, each converted to an int, and in numeric order.
-    Since the address book uses keys that are the position value for each address, they should all be numeric strings.
-    '''
-    @staticmethod
-    def get_sorted_keys():
-        logging.debug("Beginning function execution.")
-        with shelve.open(Address.DB_FILE) as addressBook:
-            numericKeys = []
-            for key in addressBook.keys():
-                numericKeys.append(int(key))
-            return sorted(numericKeys)
+    @Metrics.timed
+    def delete(positionToDelete, store = None):
+        logging.debug("Beginning function execution with positionToDelete = %s.", positionToDelete)
+        with Address.session(store, exclusive = True) as store:
+            lastPosition = store.header['lastPosition']
+            if (not lastPosition):
+                logging.info("Since address book is empty, returning None.")
+                return None
+            if ((positionToDelete < 1) or (positionToDelete > lastPosition)):
+                logging.info("Since the position to delete is outside of the existing positions, returning None.")
+                return None
+            logging.info("Since an address exists at position %s, deleting the address at position %s.", positionToDelete, positionToDelete)
+            return store.remove_address(positionToDelete).to_dict()
+
+
+    '''
+    move_range() is a static method that moves the block of address entries from a start position to an end position so that it comes right after the address entry at a target position, keeping the block's order.
+    It takes an int for startPosition, an int for endPosition, an int for targetPosition, which is counted before the move and is 0 to move the block to the front, and an optional AddressStore for store.
+    The target position must not be inside the block, and a target position right before the block leaves the address book as it is.
+    Only the address entries between the block and the target move, each with a single write, and the section index is updated once at the end.
+    It returns a tuple of the first and last position of the block after the move.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def move_range(startPosition, endPosition, targetPosition, store = None):
+        logging.debug("Beginning function execution with startPosition = %s, endPosition = %s, targetPosition = %s.", startPosition, endPosition, targetPosition)
+        blockLength = endPosition - startPosition + 1
+        if (targetPosition == (startPosition - 1)):
+            logging.info("Since the target is right before the block, the block is already in place.")
+            return (startPosition, endPosition)
+        with Address.session(store, exclusive = True) as store:
+            store.move_range(startPosition, endPosition, targetPosition)
+        firstPosition = (targetPosition - blockLength + 1) if (targetPosition > endPosition) else (targetPosition + 1)
+        return (firstPosition, firstPosition + blockLength - 1)
+
+
+    '''
+    reorder() is a static method that puts a run of consecutive address entries in a new order.
+    It takes a list of ints for positions, which holds every position of the run exactly once in the new order, so the address entry at positions[0] moves to the first position of the run, and so on, and an optional AddressStore for store.
+    Only the address entries whose position changes move, each with a single write, and the section index is updated once at the end.
+    It returns a tuple of the first and last position of the run.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def reorder(positions, store = None):
+        logging.debug("Beginning function execution with %s positions.", len(positions))
+        firstPosition = min(positions)
+        with Address.session(store, exclusive = True) as store:
+            store.reorder(firstPosition, positions)
+        return (firstPosition, firstPosition + len(positions) - 1)
+
+
+    '''
+    get_section_runs() is a static method that returns the section index, which is a list of [section, count] pairs, one for each run of consecutive positions with the same section, in route order.
+    It takes an optional AddressStore for store.
+    '''
+    @staticmethod
+    def get_section_runs(store = None):
+        with Address.session(store) as store:
+            return [list(run) for run in store.header['sections']]
+
+
+    '''
+    get_moved_section_runs() is a static method that returns the section index as it would be after move_range() with the same positions, without moving anything.
+    '''
+    @staticmethod
+    def get_moved_section_runs(startPosition, endPosition, targetPosition, store = None):
+        with Address.session(store) as store:
+            return store.moved_section_runs(startPosition, endPosition, targetPosition)
+
+
+    '''
+    get_reordered_section_runs() is a static method that returns the section index as it would be after reorder() with the same positions, without moving anything.
+    '''
+    @staticmethod
+    def get_reordered_section_runs(positions, store = None):
+        with Address.session(store) as store:
+            return store.reordered_section_runs(min(positions), positions)
 
 
     '''
     get_last_position() is a static method that returns the position number of the last address in the address book.
+    It takes an optional AddressStore for store.
     If the address book is empty, it returns None.
     '''
     @staticmethod
-    def get_last_position():
+    def get_last_position(store = None):
         logging.debug("Beginning function execution.")
-        sortedKeys = Address.get_sorted_keys()
-        if (sortedKeys):
-            logging.info(f"Since the address book is not empty, returning the last position number: {max(sortedKeys)}.")
-            return max(sortedKeys)
+        with Address.session(store) as store:
+            lastPosition = store.header['lastPosition']
+        if (lastPosition):
+            logging.info("Since the address book is not empty, returning the last position number: %s.", lastPosition)
+            return lastPosition
         else:
             logging.info("Since the address book is empty, returning None.")
             return None
@@ -239,15 +447,292 @@ class Address:
 
     '''
     get_last_section() is a static method that returns the section number of the last address in the address book.
+    It takes an optional AddressStore for store.
     If the address book is empty, it returns None.
     '''
     @staticmethod
-    def get_last_section():
+    def get_last_section(store = None):
         logging.debug("Beginning function execution.")
-        lastPosition = Address.get_last_position()
-        if (not lastPosition):
+        with Address.session(store) as store:
+            lastSection = store.header['lastSection']
+        if (lastSection):
+            logging.info("Since address book is not empty, returning the last section number: %s.", lastSection)
+            return lastSection
+        else:
             logging.info("Since address book is empty, returning None.")
             return None
-        with shelve.open(Address.DB_FILE) as addressBook:
-            logging.info(f"Since address book is not empty, returning the last section number: {addressBook[str(lastPosition)].section}.")
-            return addressBook[str(lastPosition)].section
\ No newline at end of file
+
+
+    '''
+    get_section_bounds() is a static method that returns a tuple of the first and last position of a section, using the section index instead of reading any addresses.
+    It takes an int for section and an optional AddressStore for store.
+    If no address has the section, it returns None.
+    '''
+    @staticmethod
+    def get_section_bounds(section, store = None):
+        logging.debug("Beginning function execution with section = %s.", section)
+        with Address.session(store) as store:
+            return store.get_section_bounds(section)
+
+
+    '''
+    get_section_at() is a static method that returns the section of the address at a position, using the section index instead of reading the address.
+    It takes an int for position and an optional AddressStore for store.
+    If no address exists at the position, it returns None.
+    '''
+    @staticmethod
+    def get_section_at(position, store = None):
+        logging.debug("Beginning function execution with position = %s.", position)
+        with Address.session(store) as store:
+            return store.get_section_at(position)
+
+
+    '''
+    get_sections() is a static method that returns a list of every section number in the address book, in route order, using the section index instead of reading any addresses.
+    It takes an optional AddressStore for store.
+    '''
+    @staticmethod
+    def get_sections(store = None):
+        logging.debug("Beginning function execution.")
+        with Address.session(store) as store:
+            return list(dict.fromkeys(section for section, count in store.header['sections']))
+
+
+    '''
+    get_cache_stats() is a static method that returns a dictionary of the record cache's 'capacity', 'size', 'hits', and 'misses'.
+    It takes an optional AddressStore for store.
+    The counts cover the time the store has existed, so they are most useful for the shared store that is kept open between operations.
+    '''
+    @staticmethod
+    def get_cache_stats(store = None):
+        logging.debug("Beginning function execution.")
+        with Address.session(store) as store:
+            return store.recordCache.stats()
+
+
+    '''
+    checkpoint() is a static method that writes every change saved in the store's journal into the main address book file and empties the journal.
+    It takes an optional AddressStore for store.
+    It returns the number of bytes the journal held.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def checkpoint(store = None):
+        logging.debug("Beginning function execution.")
+        with Address.session(store, exclusive = True) as store:
+            return store.checkpoint()
+
+
+    '''
+    checkpoint_if_needed() is a static method that checkpoints the store's journal if the storage engine asks for it with needs_checkpoint().
+    It is meant to be called while the process is idle, such as between requests, so that no operation has to wait for the checkpoint.
+    It takes an optional AddressStore for store, and returns the number of bytes the journal held, or 0 if no checkpoint was needed.
+    '''
+    @staticmethod
+    def checkpoint_if_needed(store = None):
+        logging.debug("Beginning function execution.")
+        with Address.session(store) as store:
+            if (not store.needs_checkpoint()):
+                return 0
+        logging.info("Since the journal has grown large, checkpointing it while the process is idle.")
+        return Address.checkpoint(store)
+
+
+    '''
+    get_journal_size() is a static method that returns the number of bytes in the store's journal, which are the changes saved since the last checkpoint.
+    It takes an optional AddressStore for store.
+    '''
+    @staticmethod
+    def get_journal_size(store = None):
+        logging.debug("Beginning function execution.")
+        with Address.session(store) as store:
+            return store.get_journal_size()
+
+
+    '''
+    get_lock_stats() is a static method that returns a dictionary of how many times this process 'acquired' the file lock, how many of those times it 'waited' for another process, the number of 'timeouts', and the total and longest wait in seconds ('waitSeconds' and 'maxWaitSeconds').
+    '''
+    @staticmethod
+    def get_lock_stats():
+        from FileLock import FileLock
+        return FileLock.get_stats()
+
+
+    '''
+    get_generation() is a static method that returns the lock file's generation number, which is raised every time any process changes the address book, so an unchanged number means the address book is unchanged.
+    It takes an optional AddressStore for store, and returns None if this system has no file locking, since the number is then never raised.
+    '''
+    @staticmethod
+    def get_generation(store = None):
+        from FileLock import FileLock
+        if (not FileLock.is_supported()):
+            return None
+        with Address.session(store) as store:
+            return store.generation
+
+
+    '''
+    read_sections() is a static method that retrieves the data for every address in a range of sections and returns them in a list of dictionaries in position order.
+    It takes an int for firstSection, an int for lastSection, and an optional AddressStore for store.
+    The first and last positions of the range are looked up in the section index, so only the addresses in the range are read.
+    If no address is in the range, it returns None.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def read_sections(firstSection, lastSection, store = None):
+        logging.debug("Beginning function execution with firstSection = %s, lastSection = %s.", firstSection, lastSection)
+        with Address.session(store) as store:
+            bounds = [store.get_section_bounds(section) for section in set(section for section, count in store.header['sections']) if (firstSection <= section <= lastSection)]
+            if (not bounds):
+                logging.info("Since no address is in the range of sections, returning None.")
+                return None
+            firstPosition = min(first for first, last in bounds)
+            lastPosition = max(last for first, last in bounds)
+            logging.info("Reading positions %s to %s for sections %s to %s.", firstPosition, lastPosition, firstSection, lastSection)
+            return [address.to_dict() for address in store.iter_range(firstPosition, lastPosition) if (firstSection <= address.section <= lastSection)]
+
+
+    '''
+    read_section() is a static method that retrieves the data for every address in a section and returns them in a list of dictionaries in position order.
+    It takes an int for section and an optional AddressStore for store.
+    If no address has the section, it returns None.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def read_section(section, store = None):
+        logging.debug("Beginning function execution with section = %s.", section)
+        return Address.read_sections(section, section, store)
+
+
+    '''
+    read_range() is a static method that retrieves the data for a run of consecutive addresses and returns them in a list of dictionaries in position order.
+    It takes an int for startPosition, which is the position of the first address to read, an int for count, which is the most addresses to read, and an optional AddressStore for store.
+    Only the addresses in the range are read from the store, so the size of the address book does not matter.
+    If no address is at startPosition, it returns None.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def read_range(startPosition, count, store = None):
+        logging.debug("Beginning function execution with startPosition = %s, count = %s.", startPosition, count)
+        with Address.session(store) as store:
+            addresses = [address.to_dict() for address in store.iter_range(startPosition, startPosition + count - 1)]
+        return addresses if addresses else None
+
+
+    '''
+    read_page() is a static method that retrieves a page of addresses and a cursor for the page after it.
+    It takes an optional string for cursor, which is a cursor returned by an earlier call, or None for the first page, an int for count, which is the most addresses on the page, and an optional AddressStore for store.
+    The cursor remembers the record id of the last address on the page, which does not change when other addresses are inserted or deleted, so the next page starts right after that address even if it has moved.
+    If that address has since been deleted, the next page starts at the position it had, where the address after it now is.
+    It returns a tuple of a list of dictionaries for the page and the cursor for the next page, which is None if the page reaches the end of the address book.
+    If the cursor cannot be decoded, it raises a ValueError.
+    '''
+    @staticmethod
+    @Metrics.timed
+    def read_page(cursor = None, count = 20, store = None):
+        logging.debug("Beginning function execution with cursor = %s, count = %s.", cursor, count)
+        with Address.session(store) as store:
+            startPosition = 1
+            if (cursor is not None):
+                recordId, position = Address.decode_cursor(cursor)
+                currentPosition = store.get_record_position(recordId)
+                startPosition = currentPosition + 1 if (currentPosition is not None) else position
+            addresses = list(store.iter_range(startPosition, startPosition + count - 1))
+            nextCursor = None
+            if (addresses and (addresses[-1].position < store.header['count'])):
+                lastPosition = addresses[-1].position
+                nextCursor = Address.encode_cursor(store.get_record_id_at(lastPosition), lastPosition)
+            return ([address.to_dict() for address in addresses], nextCursor)
+
+
+    '''
+    encode_cursor() is a static method that returns the opaque string cursor for the address with a record id at a position.
+    '''
+    @staticmethod
+    def encode_cursor(recordId, position):
+        return base64.urlsafe_b64encode(f"{recordId}:{position}".encode('ascii')).decode('ascii')
+
+
+    '''
+    decode_cursor() is a static method that returns the record id and position stored in a cursor from encode_cursor() as a tuple of ints.
+    If the cursor is not valid, it raises a ValueError.
+    '''
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            recordId, position = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split(':')
+            recordId, position = int(recordId), int(position)
+        except (AttributeError, UnicodeError, ValueError) as err:
+            raise ValueError(f"{cursor} is not a valid cursor") from err
+        if ((recordId < 0) or (position < 1)):
+            raise ValueError(f"{cursor} is not a valid cursor")
+        return (recordId, position)
+
+
+    '''
+    session() is a static method that returns the AddressStore to use for an operation, which should be used in a with statement.
+    It takes an optional AddressStore for store, and an optional bool for exclusive, which must be True for an operation that changes the address book so that it holds the lock exclusively.
+    If a store is given, it is returned so that the operation joins the session that is already open.
+    Otherwise, the calling thread's shared store is returned if it opened one, and if not, a new store is returned that will be closed at the end of the with statement.
+    '''
+    @staticmethod
+    def session(store = None, exclusive = False):
+        if (store):
+            return store.session(exclusive)
+        sharedStore = Address.get_shared_store()
+        if (sharedStore):
+            return sharedStore.session(exclusive)
+        return Address.new_store().session(exclusive)
+
+
+    '''
+    new_store() is a static method that returns a new, unopened AddressStore for Address.DB_FILE using the storage engine set in Address.ENGINE.
+    It takes an optional bool for keepOpen, which is passed to the store along with Address.CACHE_SIZE and Address.LOCK_TIMEOUT.
+    '''
+    @staticmethod
+    def new_store(keepOpen = False):
+        # The engines are imported here instead of at the top of the file, since they import Address to rebuild Address objects from their records
+        if (Address.ENGINE == 'sqlite'):
+            from SQLiteAddressStore import SQLiteAddressStore
+            return SQLiteAddressStore(Address.DB_FILE, keepOpen, Address.CACHE_SIZE, Address.LOCK_TIMEOUT)
+        if (Address.ENGINE == 'sharded'):
+            from ShardedAddressStore import ShardedAddressStore
+            return ShardedAddressStore(Address.DB_FILE, keepOpen, Address.CACHE_SIZE, Address.LOCK_TIMEOUT)
+        from ShelveAddressStore import ShelveAddressStore
+        return ShelveAddressStore(Address.DB_FILE, keepOpen, Address.CACHE_SIZE, Address.LOCK_TIMEOUT)
+
+
+    '''
+    open_shared_store() is a static method that opens an AddressStore that stays open between operations, so that every following operation of the calling thread reuses the same handle.
+    Each thread that calls it gets its own store, and each operation still syncs the address book when it ends.
+    It returns the calling thread's shared store.
+    '''
+    @staticmethod
+    def open_shared_store():
+        logging.debug("Beginning function execution.")
+        sharedStore = Address.get_shared_store()
+        if (not sharedStore):
+            sharedStore = Address.sharedStores.store = Address.new_store(keepOpen = True)
+            with sharedStore.session():
+                logging.info("Opened the shared store for %s.", Address.DB_FILE)
+        return sharedStore
+
+
+    '''
+    get_shared_store() is a static method that returns the calling thread's shared AddressStore, or None if it has not opened one.
+    '''
+    @staticmethod
+    def get_shared_store():
+        return getattr(Address.sharedStores, 'store', None)
+
+
+    '''
+    close_shared_store() is a static method that closes the calling thread's shared AddressStore, if it opened one.
+    '''
+    @staticmethod
+    def close_shared_store():
+        logging.debug("Beginning function execution.")
+        sharedStore = Address.get_shared_store()
+        if (sharedStore):
+            sharedStore.close()
+            Address.sharedStores.store = None
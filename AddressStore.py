@@ -0,0 +1,583 @@
+'''
+    AddressStore is the session object that holds the address book open for a whole logical operation.
+    Every Address method and controller function that takes a store uses the same open store, so one operation opens and syncs the address book only once.
+    A store can also be kept open between operations (keepOpen), which lets a long-running process reuse the same handle instead of reopening the file for every request.
+    Each session holds a FileLock on a sidecar lock file, shared for reading and exclusive for changing the address book, so several processes can use the same address book without corrupting it.
+    A store that is kept open checks the lock file's generation number at the start of each session, and reopens the address book if another process changed it since.
+
+    This class holds what every storage engine has in common: the with statement handling and the metadata in the header.
+    Each storage engine is a subclass that implements the methods below that raise NotImplementedError:
+        ShelveAddressStore  - the default engine, which stores the address book in a shelve file with an order index
+        SQLiteAddressStore  - stores the address book in an SQLite database with indexes on position and section
+        ShardedAddressStore - splits the shelve address book by section into separate shard files, with a manifest of where each shard starts
+    Fuzzy search is also shared by every engine: each word of the names and street is indexed by its trigrams (every run of 3 characters, padded with spaces at the ends), and words are ranked by how many trigrams they share with the words searched for.
+    The header is a dictionary that every engine keeps up to date with the number of addresses ('count'), the last position ('lastPosition'), and the last section ('lastSection').
+    It also holds the section index ('sections'), which is a list of [section, count] pairs, one for each run of consecutive positions with the same section, in route order.
+    Since a route normally has only a few sections, updating the runs is cheap, and the first and last position of each section are worked out from them once after each change.
+    Addresses read by position are kept in a RecordCache while the store is open, which is told about every insert and remove so that the cached addresses keep their correct positions.
+    Every engine saves each operation through a journal, which is checkpointed into the main file when it grows large, preferably while the process is idle, and throws the operation's changes away with abort() if it fails part way through.
+'''
+
+
+import re
+import bisect
+import logging
+
+from RecordCache import RecordCache
+from FileLock import FileLock
+from Metrics import Metrics
+
+class AddressStore:
+    MIN_WORD_LENGTH = 2 # Words shorter than this, such as initials, are not indexed for fuzzy search
+    MIN_SIMILARITY = 0.3 # Share of trigrams that a word must have in common with a searched word to be a match
+    MAX_SIMILAR_WORDS = 20 # Number of best matching words that are used for each searched word
+
+    def __init__(self, fileName, keepOpen = False, cacheSize = 1024, lockTimeout = 10.0):
+        self.fileName = fileName
+        self.keepOpen = keepOpen
+        self.isOpen = False
+        self.header = None
+        self.depth = 0 # How many nested with statements are currently using this store
+        self.metadataChanged = False
+        self.sectionBounds = None # Dictionary of each section's [first position, last position], worked out from the section runs when it is first needed
+        self.sectionRunEnds = None # List of the last position of each section run, for finding the section at a position with a binary search
+        self.recordCache = RecordCache(cacheSize) # Addresses recently read by position, which is emptied when the store is closed
+        self.lock = FileLock(fileName + '.lock', lockTimeout)
+        self.generation = None # The lock file's generation number when the address book was last loaded or changed by this store
+        self.nextSessionExclusive = False # Whether the next with statement takes the lock exclusively, which is set by session()
+
+
+    '''
+    session() returns the store to be used in a with statement, which holds the lock exclusively if exclusive is True and shared otherwise.
+    It takes an optional bool for exclusive, which must be True for any operation that changes the address book.
+    '''
+    def session(self, exclusive = False):
+        self.nextSessionExclusive = exclusive
+        return self
+
+
+    '''
+    __enter__() takes the lock and opens the address book if it is not already open, so a store can be used in nested with statements without reopening the file.
+    If a nested with statement needs the lock exclusively while the outer one holds it shared, the lock is converted, and the address book is reloaded if another process changed it in between.
+    If the lock cannot be taken within the lock timeout, it raises a TimeoutError.
+    '''
+    def __enter__(self):
+        exclusive = self.nextSessionExclusive
+        self.nextSessionExclusive = False
+        if (self.depth == 0):
+            self.lock.acquire(exclusive)
+            try:
+                self.refresh()
+            except BaseException:
+                self.lock.release()
+                raise
+        elif (exclusive and (self.lock.mode != 'exclusive')):
+            logging.warning("Converting the shared lock to an exclusive lock inside a session, which should take the lock exclusively from the start.")
+            self.lock.acquire(True)
+            self.refresh()
+        self.depth += 1
+        return self
+
+
+    '''
+    __exit__() ends the use of the store by a with statement.
+    When the outermost with statement ends, the address book is synced if the store is being kept open, or closed otherwise, and then the lock is released.
+    If an exception ended an operation that held the lock exclusively, the operation's changes are thrown away instead, so the address book is left as it was before the operation.
+    If the lock was held exclusively, the lock file's generation number is raised first, so that other processes know to reload the address book.
+    '''
+    def __exit__(self, excType, excValue, traceback):
+        self.depth -= 1
+        if (self.depth == 0):
+            try:
+                if ((excType is not None) and (self.lock.mode == 'exclusive')):
+                    logging.warning("Throwing away the changes of an operation that ended with %s.", excType.__name__)
+                    self.abort()
+                elif (self.keepOpen):
+                    self.sync()
+                else:
+                    self.close()
+                if (self.lock.mode == 'exclusive'):
+                    self.generation = self.lock.bump_generation()
+            finally:
+                self.lock.release()
+        return False
+
+
+    '''
+    refresh() opens the address book if it is not open, and reopens it if another process changed it since this store loaded it, which is known from the lock file's generation number.
+    It must only be called while the lock is held.
+    '''
+    def refresh(self):
+        generation = self.lock.read_generation()
+        if (self.isOpen and (generation != self.generation)):
+            logging.info("Since another process changed the address book, reopening it.")
+            depth = self.depth
+            self.close()
+            self.depth = depth
+        if (not self.isOpen):
+            if (Metrics.enabled):
+                Metrics.count('storeOpens')
+            self.open()
+        self.generation = generation
+
+
+    '''
+    update_metadata_for_insert() updates the metadata in the header after addresses were inserted.
+    It takes a list of the inserted Address objects for addresses, sorted by their final position.
+    The inserted addresses are merged into the section runs in one pass.
+    '''
+    def update_metadata_for_insert(self, addresses):
+        self.recordCache.shift_for_insert([address.position for address in addresses])
+        self.header['count'] += len(addresses)
+        self.header['lastPosition'] = self.header['count']
+        runs = []
+        position = 1 # The next final position to fill
+        nextInsert = 0
+        for section, count in self.header['sections']:
+            remaining = count
+            while (remaining > 0):
+                if ((nextInsert < len(addresses)) and (addresses[nextInsert].position == position)):
+                    AddressStore.append_section_run(runs, addresses[nextInsert].section, 1)
+                    nextInsert += 1
+                    position += 1
+                else:
+                    taken = remaining if (nextInsert == len(addresses)) else min(remaining, addresses[nextInsert].position - position)
+                    AddressStore.append_section_run(runs, section, taken)
+                    remaining -= taken
+                    position += taken
+        for address in addresses[nextInsert:]: # Addresses inserted after the last existing address
+            AddressStore.append_section_run(runs, address.section, 1)
+        self.set_section_runs(runs)
+
+
+    '''
+    update_metadata_for_remove() updates the metadata in the header after the address at a position was removed.
+    It takes an int for position.
+    '''
+    def update_metadata_for_remove(self, position):
+        self.recordCache.shift_for_remove(position)
+        self.header['count'] -= 1
+        self.header['lastPosition'] = self.header['count'] or None
+        runs = [list(run) for run in self.header['sections']]
+        index = bisect.bisect_left(self.get_section_run_ends(), position)
+        runs[index][1] -= 1
+        if (not runs[index][1]):
+            logging.debug("Since the removed address was the only one left in its run of the section, removing the run.")
+            del runs[index]
+            if ((0 < index < len(runs)) and (runs[index - 1][0] == runs[index][0])):
+                runs[index - 1][1] += runs.pop(index)[1]
+        self.set_section_runs(runs)
+
+
+    '''
+    update_metadata_for_move() updates the metadata in the header after the address at a position was replaced by an Address object at its final position.
+    It takes an int for fromPosition and the moved Address object for address.
+    It is the same as removing the address at fromPosition and then inserting the moved address, which also moves the cached addresses between the two positions by one.
+    If the address kept its position and section, the metadata is unchanged and only its cached copy is dropped, so the header does not need to be written.
+    '''
+    def update_metadata_for_move(self, fromPosition, address):
+        if ((address.position == fromPosition) and (self.get_section_at(fromPosition) == address.section)):
+            self.recordCache.evict_range(fromPosition, fromPosition)
+            return
+        self.update_metadata_for_remove(fromPosition)
+        self.update_metadata_for_insert([address])
+
+
+    '''
+    update_metadata_for_reorder() updates the metadata in the header after the addresses from a first position to a last position were put in a new order.
+    It takes an int for firstPosition, an int for lastPosition, and the list of [section, count] runs of the whole address book after the reorder for runs.
+    The section runs are replaced once, and only the cached addresses in the reordered positions are dropped.
+    '''
+    def update_metadata_for_reorder(self, firstPosition, lastPosition, runs):
+        self.recordCache.evict_range(firstPosition, lastPosition)
+        self.set_section_runs(runs)
+
+
+    '''
+    slice_section_runs() returns the list of [section, count] runs of the positions from a first position to a last position.
+    It takes an int for firstPosition and an int for lastPosition, and an empty range returns an empty list.
+    '''
+    def slice_section_runs(self, firstPosition, lastPosition):
+        runs = []
+        runStart = 1
+        for section, count in self.header['sections']:
+            runEnd = runStart + count - 1
+            AddressStore.append_section_run(runs, section, min(runEnd, lastPosition) - max(runStart, firstPosition) + 1)
+            runStart = runEnd + 1
+        return runs
+
+
+    '''
+    moved_section_runs() returns the section runs of the whole address book as they would be after move_range(), worked out from the current section runs without reading any address.
+    It takes an int for startPosition, an int for endPosition, and an int for targetPosition, the same as move_range().
+    '''
+    def moved_section_runs(self, startPosition, endPosition, targetPosition):
+        count = self.header['count']
+        if (targetPosition > endPosition):
+            pieces = [(1, startPosition - 1), (endPosition + 1, targetPosition), (startPosition, endPosition), (targetPosition + 1, count)]
+        else:
+            pieces = [(1, targetPosition), (startPosition, endPosition), (targetPosition + 1, startPosition - 1), (endPosition + 1, count)]
+        runs = []
+        for firstPosition, lastPosition in pieces:
+            for section, runCount in self.slice_section_runs(firstPosition, lastPosition):
+                AddressStore.append_section_run(runs, section, runCount)
+        return runs
+
+
+    '''
+    reordered_section_runs() returns the section runs of the whole address book as they would be after reorder(), worked out from the current section runs without reading any address.
+    It takes an int for firstPosition and a list of ints for oldPositions, the same as reorder().
+    '''
+    def reordered_section_runs(self, firstPosition, oldPositions):
+        runs = self.slice_section_runs(1, firstPosition - 1)
+        for position in oldPositions:
+            AddressStore.append_section_run(runs, self.get_section_at(position), 1)
+        for section, count in self.slice_section_runs(firstPosition + len(oldPositions), self.header['count']):
+            AddressStore.append_section_run(runs, section, count)
+        return runs
+
+
+    '''
+    append_section_run() is a static method that adds a number of positions with a section to the end of a list of section runs, extending the last run if it has the same section.
+    '''
+    @staticmethod
+    def append_section_run(runs, section, count):
+        if (count <= 0):
+            return
+        if (runs and (runs[-1][0] == section)):
+            runs[-1][1] += count
+        else:
+            runs.append([section, count])
+
+
+    '''
+    set_section_runs() replaces the section runs in the header and updates the last section from them.
+    It takes a list of [section, count] pairs for runs.
+    '''
+    def set_section_runs(self, runs):
+        self.header['sections'] = runs
+        self.header['lastSection'] = runs[-1][0] if runs else None
+        self.sectionBounds = None
+        self.sectionRunEnds = None
+        self.metadataChanged = True
+
+
+    '''
+    build_section_runs() is a static method that returns the list of section runs of a sequence of sections in route order.
+    '''
+    @staticmethod
+    def build_section_runs(sections):
+        runs = []
+        for section in sections:
+            AddressStore.append_section_run(runs, section, 1)
+        return runs
+
+
+    '''
+    get_section_run_ends() returns the list of the last position of each section run.
+    '''
+    def get_section_run_ends(self):
+        if (self.sectionRunEnds is None):
+            self.sectionRunEnds = []
+            lastPosition = 0
+            for section, count in self.header['sections']:
+                lastPosition += count
+                self.sectionRunEnds.append(lastPosition)
+        return self.sectionRunEnds
+
+
+    '''
+    get_section_bounds() returns a tuple of the first and last position of a section, or None if no address has that section.
+    It takes an int for section.
+    The bounds of every section are worked out from the section runs the first time they are needed after a change, so every later lookup is a single dictionary lookup.
+    '''
+    def get_section_bounds(self, section):
+        if (self.sectionBounds is None):
+            self.sectionBounds = {}
+            firstPosition = 1
+            for runSection, count in self.header['sections']:
+                bounds = self.sectionBounds.setdefault(runSection, [firstPosition, firstPosition + count - 1])
+                bounds[1] = firstPosition + count - 1
+                firstPosition += count
+        bounds = self.sectionBounds.get(section)
+        return tuple(bounds) if bounds else None
+
+
+    '''
+    get_section_at() returns the section of the address at a position, or None if the position does not exist.
+    It takes an int for position, and finds the section with a binary search of the section runs instead of reading the address.
+    '''
+    def get_section_at(self, position):
+        if ((position < 1) or (position > self.header['count'])):
+            return None
+        return self.header['sections'][bisect.bisect_left(self.get_section_run_ends(), position)][0]
+
+
+    '''
+    words() is a static method that returns the list of distinct words in a string that are indexed for fuzzy search, in uppercase.
+    Numbers are left out, since a mistyped number is not similar to the number that was meant in the way a mistyped name is.
+    '''
+    @staticmethod
+    def words(text):
+        return list(dict.fromkeys(word for word in re.findall(r"[^\W\d_]+", text.upper()) if len(word) >= AddressStore.MIN_WORD_LENGTH))
+
+
+    '''
+    address_words() is a static method that returns the list of distinct words in an Address object's names and street that are indexed for fuzzy search.
+    '''
+    @staticmethod
+    def address_words(address):
+        return AddressStore.words(' '.join([address.street] + address.names))
+
+
+    '''
+    trigrams() is a static method that returns the set of trigrams of a word, which includes the word padded with two spaces in front and one space behind, so that the start and end of the word count more.
+    '''
+    @staticmethod
+    def trigrams(word):
+        padded = '  ' + word + ' '
+        return {padded[index:(index + 3)] for index in range(len(padded) - 2)}
+
+
+    '''
+    similar_words() returns a dictionary of the indexed words that are most similar to a word, mapped to their similarity between 0 and 1.
+    The similarity is the number of trigrams the words have in common, divided by the number of different trigrams in both words.
+    Only words with at least MIN_SIMILARITY are returned, and at most MAX_SIMILAR_WORDS of them.
+    '''
+    def similar_words(self, word):
+        wordTrigrams = AddressStore.trigrams(word)
+        similarities = {}
+        for candidate, shared in self.count_shared_trigrams(wordTrigrams).items():
+            similarity = shared / (len(wordTrigrams) + len(AddressStore.trigrams(candidate)) - shared)
+            if (similarity >= AddressStore.MIN_SIMILARITY):
+                similarities[candidate] = similarity
+        return dict(sorted(similarities.items(), key = lambda item: -item[1])[:AddressStore.MAX_SIMILAR_WORDS])
+
+
+    '''
+    find_similar() returns a list of tuples of a score and an Address object, with its position property set, for the addresses whose names or street best match a search text.
+    It takes a string for text, which may be misspelled, and an int for limit, which is the largest number of addresses returned.
+    Each address's score is the average, over the words searched for, of how similar the best matching word in the address is, so it is 1 when every word matches exactly.
+    The results are sorted from the highest score to the lowest, and addresses with the same score are kept in the order they were created.
+    '''
+    def find_similar(self, text, limit):
+        logging.debug("Beginning function execution with text = %s, limit = %s.", text, limit)
+        searchWords = AddressStore.words(text)
+        if (not searchWords):
+            return []
+        bestSimilarities = {}
+        for index, searchWord in enumerate(searchWords):
+            for word, similarity in self.similar_words(searchWord).items():
+                for recordId in self.get_word_record_ids(word):
+                    similarities = bestSimilarities.setdefault(recordId, [0.0] * len(searchWords))
+                    similarities[index] = max(similarities[index], similarity)
+        ranked = sorted(((sum(similarities) / len(searchWords), recordId) for recordId, similarities in bestSimilarities.items()), key = lambda item: (-item[0], item[1]))[:limit]
+        addresses = self.get_records_by_ids([recordId for score, recordId in ranked])
+        return [(score, addresses[recordId]) for score, recordId in ranked if recordId in addresses]
+
+
+    '''
+    open() opens the address book, loads the header, and sets isOpen to True.
+    '''
+    def open(self):
+        raise NotImplementedError
+
+
+    '''
+    sync() saves every change made since the last sync to the file.
+    '''
+    def sync(self):
+        raise NotImplementedError
+
+
+    '''
+    close() syncs and closes the address book, and sets isOpen to False.
+    '''
+    def close(self):
+        raise NotImplementedError
+
+
+    '''
+    abort() throws away every change made since the last sync and closes the address book, and sets isOpen to False.
+    '''
+    def abort(self):
+        raise NotImplementedError
+
+
+    '''
+    checkpoint() writes every change saved in the journal into the main address book file and empties the journal.
+    It returns the number of bytes the journal held, and must only be called while the lock is held exclusively.
+    '''
+    def checkpoint(self):
+        raise NotImplementedError
+
+
+    '''
+    get_journal_size() returns the number of bytes in the journal, which are the changes saved since the last checkpoint.
+    '''
+    def get_journal_size(self):
+        raise NotImplementedError
+
+
+    '''
+    needs_checkpoint() returns True if the journal has grown large enough that it should be checkpointed the next time the process is idle.
+    Engines that keep their journal small by themselves, such as SQLite, never ask for a checkpoint.
+    '''
+    def needs_checkpoint(self):
+        return False
+
+
+    '''
+    get_record_at() returns the Address object stored at a position, with its position property set to that position.
+    It takes an int for position.
+    The address is returned from the record cache if it is there, and otherwise it is read with read_record_at() and added to the cache.
+    The cache only ever hands out and takes in copies, so the caller can change the returned address without changing what the cache holds.
+    If no address exists at the position, it returns None.
+    '''
+    def get_record_at(self, position):
+        address = self.recordCache.get(position)
+        if (Metrics.enabled):
+            Metrics.count('cacheMisses' if (address is None) else 'cacheHits')
+        if (address is None):
+            address = self.read_record_at(position)
+            if (address is not None):
+                self.recordCache.put(address)
+        return address
+
+
+    '''
+    read_record_at() reads the Address object stored at a position from the file, with its position property set to that position.
+    It takes an int for position.
+    If no address exists at the position, it returns None.
+    '''
+    def read_record_at(self, position):
+        raise NotImplementedError
+
+
+    '''
+    iter_records() is a generator that yields every Address object in position order, with its position property set.
+    '''
+    def iter_records(self):
+        raise NotImplementedError
+
+
+    '''
+    iter_range() is a generator that yields every Address object from a first position to a last position, in position order, with its position property set.
+    It takes an int for firstPosition and an int for lastPosition, and positions outside the address book are skipped.
+    It only reads the addresses in the range.
+    '''
+    def iter_range(self, firstPosition, lastPosition):
+        raise NotImplementedError
+
+
+    '''
+    get_record_id_at() returns the record id of the address at a position, which stays the same when other addresses are inserted, deleted, or moved.
+    It takes an int for position.
+    If no address exists at the position, it returns None.
+    '''
+    def get_record_id_at(self, position):
+        raise NotImplementedError
+
+
+    '''
+    get_record_position() returns the current position of the address with a record id.
+    It takes an int for recordId.
+    If the address no longer exists, it returns None.
+    '''
+    def get_record_position(self, recordId):
+        raise NotImplementedError
+
+
+    '''
+    insert_address() stores an Address object as a new record at its position property, which moves every later address back one position.
+    It takes an Address object for address, whose position must be between 1 and 1 after the last position.
+    It updates the header and returns the new record id.
+    '''
+    def insert_address(self, address):
+        raise NotImplementedError
+
+
+    '''
+    insert_addresses() stores a batch of Address objects as new records in one pass.
+    It takes a list of Address objects for addresses, sorted by their position property, where each position is where the address goes in the address book as it was before the batch (between 1 and 1 after the last position).
+    Addresses with the same position are inserted in the order they were given, before the address that was at that position.
+    Each address's position property is set to its final position, and the header is updated.
+    '''
+    def insert_addresses(self, addresses):
+        raise NotImplementedError
+
+
+    '''
+    move_address() replaces the address at a position with an Address object and moves it to the Address object's position property, which moves every address between the two positions by one.
+    It takes an int for fromPosition and an Address object for address, whose position is its final position (between 1 and the last position).
+    The record keeps its record id, so only the addresses between the two positions are touched, and an address that stays at the same position is rewritten in place.
+    It updates the header and returns the Address object that was replaced, with its position property set to fromPosition.
+    If no address exists at fromPosition, it returns None.
+    '''
+    def move_address(self, fromPosition, address):
+        raise NotImplementedError
+
+
+    '''
+    move_range() moves the block of addresses from a start position to an end position so that it comes right after the address at a target position, keeping the block's order.
+    It takes an int for startPosition, an int for endPosition, and an int for targetPosition, which is counted before the move and is 0 to move the block to the front.
+    The target position must not be inside the block, and every position must exist.
+    Only the addresses between the block and the target are touched, each once, and the section runs are worked out once at the end.
+    '''
+    def move_range(self, startPosition, endPosition, targetPosition):
+        raise NotImplementedError
+
+
+    '''
+    reorder() puts a run of consecutive addresses in a new order.
+    It takes an int for firstPosition and a list of ints for oldPositions, where the address at oldPositions[k] is moved to firstPosition + k.
+    oldPositions must hold every position from firstPosition to firstPosition + len(oldPositions) - 1 exactly once.
+    Only the addresses whose position changes are touched, each once, and the section runs are worked out once at the end.
+    '''
+    def reorder(self, firstPosition, oldPositions):
+        raise NotImplementedError
+
+
+    '''
+    find_records() returns a list of the Address objects that match every given value, sorted by position, with their position properties set.
+    It takes an optional string for street, an optional int for addressNumber, an optional string for unit, and an optional string for name, which matches any one of an address's names.
+    If addressNumber is given, the address must also have the given street and unit exactly, where a unit of None matches only addresses without a unit.
+    The strings must already be uppercase, the same as the values stored by Address.
+    It uses the engine's indexes, so it never reads every record.
+    '''
+    def find_records(self, street = None, addressNumber = None, unit = None, name = None):
+        raise NotImplementedError
+
+
+    '''
+    count_shared_trigrams() returns a dictionary of every indexed word that has any of the given trigrams, mapped to the number of the trigrams it has.
+    It takes a set of strings for trigrams.
+    '''
+    def count_shared_trigrams(self, trigrams):
+        raise NotImplementedError
+
+
+    '''
+    get_word_record_ids() returns the list of record ids of the addresses whose names or street contain a word.
+    It takes a string for word.
+    '''
+    def get_word_record_ids(self, word):
+        raise NotImplementedError
+
+
+    '''
+    get_records_by_ids() returns a dictionary that maps each of the given record ids to its Address object, with its position property set.
+    It takes a list of ints for recordIds. Record ids that do not exist are left out.
+    '''
+    def get_records_by_ids(self, recordIds):
+        raise NotImplementedError
+
+
+    '''
+    remove_address() deletes the record at a position, which moves every later address forward one position.
+    It takes an int for position.
+    It updates the header and returns the deleted Address object with its position property set.
+    If no address exists at the position, it returns None.
+    '''
+    def remove_address(self, position):
+        raise NotImplementedError
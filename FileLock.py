@@ -0,0 +1,215 @@
+'''
+    FileLock is a reader/writer lock on a sidecar lock file next to the address book, so that several processes can use the same address book safely.
+    Any number of processes can hold the lock shared to read at the same time, but a process that changes the address book holds it exclusively, so no other process reads or writes while the change is half done.
+    The lock is taken with fcntl.flock(), which the operating system releases by itself if a process dies while holding it.
+    Waiting for the lock gives up with a TimeoutError after a configurable number of seconds, and the time spent waiting is counted for every process in FileLock.stats.
+    In the main thread, the wait is a blocking flock() that is interrupted by a timer signal at the timeout, so the operating system hands the lock to waiting processes as soon as it is released.
+    Other threads cannot use the timer signal, so they try again for the lock with short, growing delays instead.
+    flock() lets a new reader in ahead of a writer that is waiting, so while a thread of this process waits for the lock exclusively, the other threads of this process wait before taking it shared, and a steady stream of reads cannot hold a change off.
+    The lock file also holds a generation number, which each exclusive holder raises when it is done, so a process that keeps the address book open can tell that another process changed it and reload it.
+    On systems without fcntl, such as Windows, the lock does nothing and the address book must only be used by one process at a time.
+'''
+
+
+import os
+import time
+import struct
+import signal
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class FileLock:
+    GENERATION = struct.Struct('<Q') # The generation number stored at the start of the lock file
+    FIRST_RETRY_DELAY = 0.001 # Seconds a thread other than the main thread waits before trying again for a lock that is held by another process, which doubles up to MAX_RETRY_DELAY
+    MAX_RETRY_DELAY = 0.02
+    # Totals for every lock used by this process, which are kept at the class level since a new store, and so a new lock, is made for most operations
+    stats = {
+        'acquired':         0,
+        'waited':           0,
+        'timeouts':         0,
+        'waitSeconds':      0.0,
+        'maxWaitSeconds':   0.0,
+    }
+    statsLock = threading.Lock() # Held while FileLock.stats is read or changed, since the async controller's worker threads take locks at the same time
+    waitingWriters = {} # Dictionary of each lock file's name to the number of threads of this process waiting to take it exclusively
+    writersCondition = threading.Condition() # Held while waitingWriters is read or changed, and notified when a thread stops waiting
+
+    def __init__(self, fileName, timeout = 10.0):
+        self.fileName = fileName
+        self.timeout = timeout
+        self.fileDescriptor = None
+        self.mode = None # None when the lock is not held, or 'shared' or 'exclusive'
+
+
+    '''
+    acquire() takes the lock, waiting for other processes to release it if needed.
+    It takes a bool for exclusive, which is True to take the lock for changing the address book and False to take it for reading.
+    If the lock is already held shared and exclusive is True, the lock is converted, which briefly releases it, so the address book may have changed when it returns.
+    If the lock cannot be taken within the timeout, it raises a TimeoutError.
+    '''
+    def acquire(self, exclusive):
+        mode = 'exclusive' if exclusive else 'shared'
+        if ((self.mode == mode) or (self.mode == 'exclusive')):
+            return
+        if (fcntl is None):
+            self.mode = mode
+            return
+        if (self.fileDescriptor is None):
+            self.fileDescriptor = os.open(self.fileName, os.O_RDWR | os.O_CREAT, 0o666)
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        start = time.perf_counter()
+        waited = (not exclusive) and self.wait_for_writers(start)
+        try:
+            fcntl.flock(self.fileDescriptor, operation | fcntl.LOCK_NB)
+        except BlockingIOError:
+            waited = True
+            if (exclusive):
+                self.count_waiting_writer(1)
+            try:
+                if (threading.current_thread() is threading.main_thread()):
+                    self.wait_with_timer(operation)
+                else:
+                    self.wait_with_retries(operation, start)
+            except TimeoutError:
+                with FileLock.statsLock:
+                    FileLock.stats['timeouts'] += 1
+                self.mode = None # A failed conversion may have released the shared lock
+                logging.warning("Timed out after %.3fs waiting for the %s lock on %s.", time.perf_counter() - start, mode, self.fileName)
+                raise TimeoutError(f"Timed out waiting for the {mode} lock on {self.fileName}") from None
+            finally:
+                if (exclusive):
+                    self.count_waiting_writer(-1)
+        self.mode = mode
+        self.record_wait(time.perf_counter() - start, waited)
+
+
+    '''
+    wait_for_writers() waits until no other thread of this process is waiting to take the lock exclusively, or until the timeout, after which the lock is tried anyway.
+    It takes the float from time.perf_counter() when the wait started for start, and returns True if it had to wait.
+    '''
+    def wait_for_writers(self, start):
+        with FileLock.writersCondition:
+            if (not FileLock.waitingWriters.get(self.fileName)):
+                return False
+            FileLock.writersCondition.wait_for(lambda: not FileLock.waitingWriters.get(self.fileName), max(self.timeout - (time.perf_counter() - start), 0))
+            return True
+
+
+    '''
+    count_waiting_writer() adds change to the number of threads of this process waiting to take the lock exclusively, and wakes the threads waiting for them when it drops.
+    It takes 1 when a thread starts waiting and -1 when it stops.
+    '''
+    def count_waiting_writer(self, change):
+        with FileLock.writersCondition:
+            waitingWriters = FileLock.waitingWriters.get(self.fileName, 0) + change
+            if (waitingWriters):
+                FileLock.waitingWriters[self.fileName] = waitingWriters
+            else:
+                del FileLock.waitingWriters[self.fileName]
+                FileLock.writersCondition.notify_all()
+
+
+    '''
+    wait_with_timer() waits for the lock with a blocking flock(), which a timer signal interrupts with a TimeoutError when the timeout is reached.
+    It takes fcntl.LOCK_SH or fcntl.LOCK_EX for operation.
+    Any timer signal handler that was set before is put back afterwards.
+    '''
+    def wait_with_timer(self, operation):
+        def on_timeout(signalNumber, frame):
+            raise TimeoutError()
+        previousHandler = signal.signal(signal.SIGALRM, on_timeout)
+        try:
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
+            try:
+                fcntl.flock(self.fileDescriptor, operation)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        finally:
+            signal.signal(signal.SIGALRM, previousHandler)
+
+
+    '''
+    wait_with_retries() waits for the lock by trying again with delays that double from FIRST_RETRY_DELAY up to MAX_RETRY_DELAY, and raises a TimeoutError when the timeout is reached.
+    It takes fcntl.LOCK_SH or fcntl.LOCK_EX for operation and the float from time.perf_counter() when the wait started for start.
+    '''
+    def wait_with_retries(self, operation, start):
+        delay = FileLock.FIRST_RETRY_DELAY
+        while (True):
+            elapsed = time.perf_counter() - start
+            if (elapsed >= self.timeout):
+                raise TimeoutError()
+            time.sleep(min(delay, self.timeout - elapsed))
+            delay = min(delay * 2, FileLock.MAX_RETRY_DELAY)
+            try:
+                fcntl.flock(self.fileDescriptor, operation | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                continue
+
+
+    '''
+    release() releases the lock and closes the lock file, if the lock is held.
+    '''
+    def release(self):
+        if (self.fileDescriptor is not None):
+            fcntl.flock(self.fileDescriptor, fcntl.LOCK_UN)
+            os.close(self.fileDescriptor)
+            self.fileDescriptor = None
+        self.mode = None
+
+
+    '''
+    read_generation() returns the generation number stored in the lock file, which is 0 if no exclusive holder has raised it yet.
+    '''
+    def read_generation(self):
+        if (self.fileDescriptor is None):
+            return 0
+        data = os.pread(self.fileDescriptor, FileLock.GENERATION.size, 0)
+        return FileLock.GENERATION.unpack(data)[0] if (len(data) == FileLock.GENERATION.size) else 0
+
+
+    '''
+    bump_generation() raises the generation number in the lock file by one and returns the new number.
+    It must only be called while the lock is held exclusively.
+    '''
+    def bump_generation(self):
+        generation = self.read_generation() + 1
+        if (self.fileDescriptor is not None):
+            os.pwrite(self.fileDescriptor, FileLock.GENERATION.pack(generation), 0)
+        return generation
+
+
+    '''
+    is_supported() is a static method that returns True if this system has the file locking that the lock needs, and False if the lock does nothing.
+    '''
+    @staticmethod
+    def is_supported():
+        return (fcntl is not None)
+
+
+    '''
+    record_wait() is a static method that adds one acquisition of a lock, and the number of seconds it took, to FileLock.stats.
+    It takes a float for seconds and a bool for waited, which is True if the lock was held by another process when it was first tried.
+    '''
+    @staticmethod
+    def record_wait(seconds, waited):
+        with FileLock.statsLock:
+            FileLock.stats['acquired'] += 1
+            if (waited):
+                FileLock.stats['waited'] += 1
+                FileLock.stats['waitSeconds'] += seconds
+                FileLock.stats['maxWaitSeconds'] = max(FileLock.stats['maxWaitSeconds'], seconds)
+
+
+    '''
+    get_stats() is a static method that returns a copy of FileLock.stats.
+    '''
+    @staticmethod
+    def get_stats():
+        with FileLock.statsLock:
+            return dict(FileLock.stats)
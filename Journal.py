@@ -0,0 +1,336 @@
+'''
+    Journal is the write-ahead journal of the shelve storage engine, which sits between the shelf and its dbm file so that every operation is saved in one sequential write.
+    Instead of being written to the dbm file, the keys changed by an operation are held in memory until the operation ends, and are then appended to a journal file next to the address book as one record and flushed to the disk with a single fsync.
+    A record is either in the journal completely or, if the program or computer stopped while it was being written, is left out when the journal is read, so an operation that was cut off is never half saved.
+    The changes in the journal are kept in memory and read in place of the dbm file, until a checkpoint writes them all into the dbm file at once and empties the journal.
+    When the address book is opened, the journal is read back into memory, so the changes saved since the last checkpoint are never lost.
+    Each process remembers the changes it last read from each journal, so opening the address book again only reads the records added since.
+
+    Journal file layout:
+    The file starts with MAGIC and an epoch, a random number that is changed at every checkpoint, so a process can tell whether the records it remembers are still the start of the journal.
+    Each record is the length and CRC-32 checksum of its contents, followed by the contents, which are compressed with zlib.
+    The contents are every changed key in turn, each as the length of the key, the length of the value, the key, and the value.
+    A deleted key has DELETED for its value length and no value.
+
+    The dbm files underneath are always dbm.dumb files, which ShelveAddressStore.open_dbm() opens whatever backends this Python has, since flushing and checkpointing them relies on how dbm.dumb keeps its key list in memory and its data in two files.
+'''
+
+
+import os
+import struct
+import threading
+import zlib
+import logging
+
+from collections.abc import MutableMapping
+from Metrics import Metrics
+
+class Journal(MutableMapping):
+    MAGIC = b'ABJOURNL'
+    FILE_HEADER = struct.Struct('<8s8s') # MAGIC and the epoch
+    RECORD_HEADER = struct.Struct('<II') # Length and CRC-32 checksum of a record's compressed contents
+    ENTRY_HEADER = struct.Struct('<HI') # Length of a key and length of its value
+    DELETED = 0xFFFFFFFF # Value length of a key that was deleted
+    # The epoch, size, record count, and changes of each journal file as this process last read or wrote it, so reopening a journal only reads the records after that size while the epoch is the same
+    replayed = {}
+    replayedLock = threading.RLock() # Held while Journal.replayed is read or changed, and while a journal changes what it saved there, since the async controller's worker threads each open the journal
+
+    def __init__(self, fileName, database):
+        self.fileName = fileName
+        self.database = database # The dbm file that the journal's changes are written into at a checkpoint
+        self.changes = {} # Keys saved in the journal since the last checkpoint, with None for a deleted key
+        self.pending = {} # Keys changed by the operation in progress, which are not in the journal yet
+        self.epoch = None # The epoch in the journal file's header, which is None if the file has no header yet
+        self.size = 0 # Number of bytes of the header and complete records in the journal file
+        self.records = 0 # Number of complete records in the journal file
+        self.tornTail = False # Whether the journal file ends with a record that was cut off, which is cut off the file before the next record is written
+        self.fileDescriptor = os.open(fileName, os.O_RDWR | os.O_CREAT, 0o666)
+        self.replay()
+
+
+    '''
+    __getitem__() returns the value of a key, from the operation in progress or the journal if it was changed since the last checkpoint, and from the dbm file otherwise.
+    It takes bytes for key, and raises a KeyError if the key does not exist or was deleted.
+    '''
+    def __getitem__(self, key):
+        for changes in (self.pending, self.changes):
+            if (key in changes):
+                value = changes[key]
+                if (value is None):
+                    raise KeyError(key)
+                break
+        else:
+            value = self.database[key]
+        if (Metrics.enabled):
+            Metrics.count('shelfKeysRead')
+            Metrics.count('shelfBytesRead', len(value))
+        return value
+
+
+    '''
+    __setitem__() sets the value of a key for the operation in progress.
+    It takes bytes for key and bytes for value.
+    '''
+    def __setitem__(self, key, value):
+        if (Metrics.enabled):
+            Metrics.count('shelfKeysWritten')
+            Metrics.count('shelfBytesWritten', len(value))
+        self.pending[key] = value
+
+
+    '''
+    __delitem__() deletes a key for the operation in progress.
+    It takes bytes for key, and raises a KeyError if the key does not exist.
+    '''
+    def __delitem__(self, key):
+        if (key not in self):
+            raise KeyError(key)
+        if (Metrics.enabled):
+            Metrics.count('shelfKeysWritten')
+        self.pending[key] = None
+
+
+    '''
+    __contains__() returns True if a key exists, taking the operation in progress and the journal into account.
+    '''
+    def __contains__(self, key):
+        for changes in (self.pending, self.changes):
+            if (key in changes):
+                return (changes[key] is not None)
+        return (key in self.database)
+
+
+    '''
+    __iter__() returns an iterator over every key that exists, taking the operation in progress and the journal into account.
+    '''
+    def __iter__(self):
+        changes = {**self.changes, **self.pending}
+        for key in self.database.keys():
+            if (key not in changes):
+                yield key
+        for key, value in changes.items():
+            if (value is not None):
+                yield key
+
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+
+    '''
+    commit() appends the keys changed by the operation in progress to the journal file as one record, and flushes it to the disk with a single fsync.
+    It returns the number of bytes appended, which is 0 if nothing was changed.
+    '''
+    def commit(self):
+        if (not self.pending):
+            return 0
+        contents = bytearray()
+        for key, value in self.pending.items():
+            if (value is None):
+                contents += Journal.ENTRY_HEADER.pack(len(key), Journal.DELETED) + key
+            else:
+                contents += Journal.ENTRY_HEADER.pack(len(key), len(value)) + key + value
+        contents = zlib.compress(contents, 1)
+        record = Journal.RECORD_HEADER.pack(len(contents), zlib.crc32(contents)) + contents
+        if (self.epoch is None):
+            self.start_epoch()
+        if (self.tornTail):
+            logging.info("Cutting the incomplete record off the end of the journal %s.", self.fileName)
+            os.ftruncate(self.fileDescriptor, self.size)
+            self.tornTail = False
+        os.pwrite(self.fileDescriptor, record, self.size)
+        os.fsync(self.fileDescriptor)
+        if (Metrics.enabled):
+            Metrics.count('journalCommits')
+            Metrics.count('journalBytes', len(record))
+        with Journal.replayedLock: # Another thread may be copying self.changes from Journal.replayed
+            self.size += len(record)
+            self.records += 1
+            self.changes.update(self.pending)
+            self.remember()
+        self.pending = {}
+        return len(record)
+
+
+    '''
+    discard() throws away the keys changed by the operation in progress, without writing them to the journal.
+    '''
+    def discard(self):
+        if (self.pending):
+            logging.warning("Discarding %s changed keys of an operation that did not finish.", len(self.pending))
+        self.pending = {}
+
+
+    '''
+    get_size() returns the number of bytes of complete records in the journal file.
+    '''
+    def get_size(self):
+        return max(self.size - Journal.FILE_HEADER.size, 0)
+
+
+    '''
+    sync() saves the operation in progress to the journal, and is called by the shelf when it is synced.
+    '''
+    def sync(self):
+        self.commit()
+
+
+    '''
+    checkpoint() writes every change in the journal into the dbm file, flushes the dbm file to the disk, and then empties the journal.
+    If the program stops part way through, the journal is still complete, so the changes are written again the next time.
+    It returns the number of bytes of records the journal held.
+    '''
+    @Metrics.timed
+    def checkpoint(self):
+        self.commit()
+        if (not self.changes):
+            return 0
+        if (Metrics.enabled):
+            Metrics.count('checkpoints')
+        logging.info("Writing %s keys from %s records in the journal into the address book.", len(self.changes), self.records)
+        deletedKeys = []
+        for key, value in self.changes.items():
+            if (value is not None):
+                self.database[key] = value
+            else:
+                deletedKeys.append(key)
+        Journal.delete_dbm_keys(self.database, deletedKeys)
+        self.flush_database()
+        size = self.get_size()
+        self.changes = {}
+        self.records = 0
+        self.start_epoch()
+        return size
+
+
+    '''
+    start_epoch() empties the journal file and writes its header with a new epoch, so other processes read it again from the start.
+    The header is written before the file is cut short, so a process never finds the epoch it remembers in front of records it has not read.
+    '''
+    def start_epoch(self):
+        self.epoch = os.urandom(8)
+        os.pwrite(self.fileDescriptor, Journal.FILE_HEADER.pack(Journal.MAGIC, self.epoch), 0)
+        os.ftruncate(self.fileDescriptor, Journal.FILE_HEADER.size)
+        os.fsync(self.fileDescriptor)
+        self.size = Journal.FILE_HEADER.size
+        self.tornTail = False
+        self.remember()
+
+
+    '''
+    remember() saves the journal's epoch, size, record count, and changes in Journal.replayed, for the next time this process opens it.
+    '''
+    def remember(self):
+        with Journal.replayedLock:
+            Journal.replayed[self.fileName] = (self.epoch, self.size, self.records, self.changes)
+
+
+    '''
+    flush_database() writes the dbm file's key list and flushes the dbm file to the disk.
+    '''
+    def flush_database(self):
+        Journal.flush_dbm(self.database)
+
+
+    '''
+    flush_dbm() is a static method that writes a dbm.dumb file's key list and flushes the file to the disk.
+    It takes the open dbm.dumb object for database, or a mapping such as ShardFiles that keeps its keys in several dbm.dumb files and flushes each of them from its own sync() method.
+    '''
+    @staticmethod
+    def flush_dbm(database):
+        database.sync()
+        if (not hasattr(database, '_index')): # A mapping over several dbm.dumb files, which its sync() already flushed
+            return
+        database._modified = False # dbm.dumb never clears this itself, so every later close would rewrite its key list, even after another process changed the file
+        for fileName in (database._datfile, database._dirfile): # dbm.dumb does not fsync its own files
+            if (os.path.exists(fileName)):
+                fileDescriptor = os.open(fileName, os.O_RDONLY)
+                try:
+                    os.fsync(fileDescriptor)
+                finally:
+                    os.close(fileDescriptor)
+
+
+    '''
+    delete_dbm_keys() is a static method that deletes keys from a dbm.dumb file, skipping any key that is not in it.
+    It takes the open dbm.dumb object, or a mapping such as ShardFiles that deletes each key from its own dbm.dumb file, for database and a list of bytes for keys.
+    dbm.dumb rewrites its whole key list every time a key is deleted, so the keys are taken out of the key list it keeps in memory instead, which is written once when the file is flushed.
+    '''
+    @staticmethod
+    def delete_dbm_keys(database, keys):
+        if (not hasattr(database, '_index')): # A mapping over several dbm.dumb files
+            for key in keys:
+                if (key in database):
+                    del database[key]
+            return
+        for key in keys:
+            if (database._index.pop(key, None) is not None):
+                database._modified = True
+
+
+    '''
+    replay() reads every complete record in the journal file into memory, stopping at the first record that is cut off or does not match its checksum.
+    If this process already read the start of the journal in the same epoch, only the records after it are read.
+    '''
+    def replay(self):
+        fileSize = os.fstat(self.fileDescriptor).st_size
+        header = os.pread(self.fileDescriptor, Journal.FILE_HEADER.size, 0)
+        if ((len(header) < Journal.FILE_HEADER.size) or (header[:len(Journal.MAGIC)] != Journal.MAGIC)):
+            self.tornTail = (fileSize > 0) # A header that was cut off, which is written again before the next record
+            return
+        self.epoch = header[len(Journal.MAGIC):]
+        offset = Journal.FILE_HEADER.size
+        with Journal.replayedLock:
+            epoch, size, records, changes = Journal.replayed.get(self.fileName, (None, 0, 0, None))
+            if ((epoch == self.epoch) and (size <= fileSize)):
+                self.changes = dict(changes)
+                self.records = records
+                offset = size
+        base = offset
+        data = os.pread(self.fileDescriptor, fileSize - base, base)
+        offset = 0
+        while ((offset + Journal.RECORD_HEADER.size) <= len(data)):
+            length, checksum = Journal.RECORD_HEADER.unpack_from(data, offset)
+            start = offset + Journal.RECORD_HEADER.size
+            contents = data[start:(start + length)]
+            if ((len(contents) != length) or (zlib.crc32(contents) != checksum)):
+                break
+            self.changes.update(Journal.decode(zlib.decompress(contents)))
+            self.records += 1
+            offset = start + length
+        self.size = base + offset
+        self.tornTail = (offset < len(data))
+        if (self.tornTail):
+            logging.warning("The journal %s ends with an incomplete record of %s bytes, which is ignored.", self.fileName, len(data) - offset)
+        if (offset):
+            logging.info("Replayed %s records from the journal %s.", self.records, self.fileName)
+        self.remember()
+
+
+    '''
+    decode() is a static method that returns the changed keys of a record's uncompressed contents as a dictionary, with None for a deleted key.
+    '''
+    @staticmethod
+    def decode(contents):
+        changes = {}
+        offset = 0
+        while (offset < len(contents)):
+            keyLength, valueLength = Journal.ENTRY_HEADER.unpack_from(contents, offset)
+            offset += Journal.ENTRY_HEADER.size
+            key = bytes(contents[offset:(offset + keyLength)])
+            offset += keyLength
+            if (valueLength == Journal.DELETED):
+                changes[key] = None
+            else:
+                changes[key] = bytes(contents[offset:(offset + valueLength)])
+                offset += valueLength
+        return changes
+
+
+    '''
+    close() saves the operation in progress to the journal and closes the journal file and the dbm file.
+    '''
+    def close(self):
+        self.commit()
+        os.close(self.fileDescriptor)
+        self.database.close()
@@ -0,0 +1,196 @@
+'''
+    Metrics is the instrumentation of the address book, which counts the work the storage engines do and times each public operation of Address and the controller.
+    It is off unless the ADDRESS_BOOK_METRICS environment variable is set to 1 or it is turned on with enable(), and while it is off, a timed function only checks Metrics.enabled before calling through and no counter is touched.
+    Each thread keeps its own counters, which get_counters() adds up for the whole process:
+        storeOpens          - times the address book was opened, including reopening it after another process changed it
+        cacheHits           - addresses read by position that were found in the record cache
+        cacheMisses         - addresses read by position that had to be read from the file
+        recordsRead         - addresses decoded from the file
+        recordsWritten      - addresses encoded and written to the file
+        recordBytesRead     - bytes of compact address records read (shelve engine only)
+        recordBytesWritten  - bytes of compact address records written (shelve engine only)
+        shelfKeysRead       - keys read through the shelf, including the order index, indexes, and header (shelve engine only)
+        shelfBytesRead      - bytes of the values of those keys, which are pickled or compact records (shelve engine only)
+        shelfKeysWritten    - keys written or deleted through the shelf (shelve engine only)
+        shelfBytesWritten   - bytes of the values written through the shelf (shelve engine only)
+        journalCommits      - records appended to the journal, each with one fsync (shelve engine only)
+        journalBytes        - bytes appended to the journal (shelve engine only)
+        checkpoints         - times the journal was written into the dbm file (shelve engine only)
+    Each timed operation keeps the number of calls, the total and longest time, a histogram of its latencies in buckets whose upper bounds are BUCKET_BOUNDS_MS, and how much each counter grew during its calls, so a slow operation can be traced to the storage work it did.
+    Only the counters of the thread that made a call are charged to it, so the work of the async controller's other worker threads is never charged to an operation that ran at the same time.
+    snapshot() returns all of it as a dictionary that can be written as JSON.
+'''
+
+
+import os
+import math
+import time
+import bisect
+import functools
+import threading
+
+class Metrics:
+    BUCKET_BOUNDS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000] # Upper bound of each latency bucket, with one more bucket for anything slower
+    enabled = (os.environ.get('ADDRESS_BOOK_METRICS', '0') == '1')
+    threadCounters = [] # The counters dictionary of every thread that counted anything since the last reset, each only changed by its own thread
+    operations = {} # Dictionary of each timed operation's name to its calls, total and longest time, latency buckets, and counter growth
+    generation = 0 # Raised by reset(), so each thread starts new counters
+    local = threading.local() # The calling thread's counters and the generation they belong to
+    lock = threading.Lock() # Held while threadCounters or operations is read or changed
+
+
+    '''
+    enable() is a static method that turns the instrumentation on if enabled is True, and off if it is False.
+    The counters and timings collected so far are kept.
+    '''
+    @staticmethod
+    def enable(enabled = True):
+        Metrics.enabled = enabled
+
+
+    '''
+    reset() is a static method that clears every counter and timing.
+    '''
+    @staticmethod
+    def reset():
+        with Metrics.lock:
+            Metrics.threadCounters = []
+            Metrics.operations = {}
+            Metrics.generation += 1
+
+
+    '''
+    count() is a static method that adds to a counter.
+    It takes a string for name and an optional int for amount.
+    Callers check Metrics.enabled first, so that nothing is counted while the instrumentation is off.
+    '''
+    @staticmethod
+    def count(name, amount = 1):
+        counters = Metrics.get_thread_counters()
+        counters[name] = counters.get(name, 0) + amount
+
+
+    '''
+    get_thread_counters() is a static method that returns the calling thread's counters dictionary, starting a new one if the thread has none since the last reset.
+    '''
+    @staticmethod
+    def get_thread_counters():
+        local = Metrics.local
+        if (getattr(local, 'generation', None) != Metrics.generation):
+            with Metrics.lock:
+                local.counters = {}
+                local.generation = Metrics.generation
+                Metrics.threadCounters.append(local.counters)
+        return local.counters
+
+
+    '''
+    get_counters() is a static method that returns a dictionary of every counter added up over every thread.
+    '''
+    @staticmethod
+    def get_counters():
+        totals = {}
+        with Metrics.lock:
+            threadCounters = [dict(counters) for counters in Metrics.threadCounters]
+        for counters in threadCounters:
+            for name, value in counters.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+
+    '''
+    timed() is a static method used as a decorator, which times every call of a function as an operation while the instrumentation is on.
+    The operation is named after the class and function for a method, such as 'Address.update', and after the module and function otherwise, such as 'controller.update_address'.
+    '''
+    @staticmethod
+    def timed(function):
+        name = function.__qualname__ if ('.' in function.__qualname__) else (function.__module__ + '.' + function.__qualname__)
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            if (not Metrics.enabled):
+                return function(*args, **kwargs)
+            countersBefore = dict(Metrics.get_thread_counters())
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                Metrics.record_operation(name, time.perf_counter() - start, countersBefore)
+        return timed_function
+
+
+    '''
+    record_operation() is a static method that adds one call of an operation to its timings.
+    It takes a string for name, a float for seconds, and the dictionary of the calling thread's counters from when the call started for countersBefore.
+    '''
+    @staticmethod
+    def record_operation(name, seconds, countersBefore):
+        countersAfter = Metrics.get_thread_counters()
+        with Metrics.lock:
+            operation = Metrics.operations.get(name)
+            if (operation is None):
+                operation = Metrics.operations[name] = {
+                    'calls':        0,
+                    'totalSeconds': 0.0,
+                    'maxSeconds':   0.0,
+                    'buckets':      [0] * (len(Metrics.BUCKET_BOUNDS_MS) + 1),
+                    'counters':     {},
+                }
+            operation['calls'] += 1
+            operation['totalSeconds'] += seconds
+            operation['maxSeconds'] = max(operation['maxSeconds'], seconds)
+            operation['buckets'][bisect.bisect_left(Metrics.BUCKET_BOUNDS_MS, seconds * 1000)] += 1
+            for counter, value in countersAfter.items():
+                growth = value - countersBefore.get(counter, 0)
+                if (growth > 0): # The counters start again from nothing if they were reset during the call
+                    operation['counters'][counter] = operation['counters'].get(counter, 0) + growth
+
+
+    '''
+    estimate_percentile() is a static method that returns the upper bound in milliseconds of the latency bucket that holds a percentile of an operation's calls.
+    It takes a dictionary of an operation's timings for operation and a number from 0 to 100 for percent.
+    Calls slower than the last bucket bound are estimated by the longest call.
+    '''
+    @staticmethod
+    def estimate_percentile(operation, percent):
+        rank = max(math.ceil(operation['calls'] * percent / 100), 1)
+        seen = 0
+        for index, count in enumerate(operation['buckets']):
+            seen += count
+            if (seen >= rank):
+                if (index < len(Metrics.BUCKET_BOUNDS_MS)):
+                    return min(Metrics.BUCKET_BOUNDS_MS[index], operation['maxSeconds'] * 1000)
+                break
+        return operation['maxSeconds'] * 1000
+
+
+    '''
+    snapshot() is a static method that returns a dictionary of whether the instrumentation is 'enabled', the 'counters', and the 'operations', which can be written as JSON.
+    Each operation has its 'calls', 'totalMs', 'meanMs', 'maxMs', estimated 'p50Ms' and 'p99Ms', the 'histogram' of calls in each latency bucket, and the growth of each counter per call ('countersPerCall').
+    The operations are sorted by their total time, slowest first.
+    '''
+    @staticmethod
+    def snapshot():
+        operations = {}
+        with Metrics.lock:
+            operationsCopy = {name: {**operation, 'buckets': list(operation['buckets']), 'counters': dict(operation['counters'])} for name, operation in Metrics.operations.items()}
+        for name, operation in sorted(operationsCopy.items(), key = lambda item: item[1]['totalSeconds'], reverse = True):
+            histogram = {}
+            for index, count in enumerate(operation['buckets']):
+                if (count):
+                    label = f"<={Metrics.BUCKET_BOUNDS_MS[index]}ms" if (index < len(Metrics.BUCKET_BOUNDS_MS)) else f">{Metrics.BUCKET_BOUNDS_MS[-1]}ms"
+                    histogram[label] = count
+            operations[name] = {
+                'calls':           operation['calls'],
+                'totalMs':         operation['totalSeconds'] * 1000,
+                'meanMs':          operation['totalSeconds'] * 1000 / operation['calls'],
+                'maxMs':           operation['maxSeconds'] * 1000,
+                'p50Ms':           Metrics.estimate_percentile(operation, 50),
+                'p99Ms':           Metrics.estimate_percentile(operation, 99),
+                'histogram':       histogram,
+                'countersPerCall': {counter: value / operation['calls'] for counter, value in sorted(operation['counters'].items())},
+            }
+        return {
+            'enabled':    Metrics.enabled,
+            'counters':   dict(sorted(Metrics.get_counters().items())),
+            'operations': operations,
+        }
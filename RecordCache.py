@@ -0,0 +1,110 @@
+'''
+    RecordCache is a bounded least recently used cache of decoded Address objects, keyed by position, that an AddressStore keeps while it is open.
+    Operations often read the same few positions more than once, such as reading an address before updating it and then reading it again to confirm the update, and a hit skips finding and decoding the record.
+    Since inserting or removing an address moves every later address by one position, the cache is told about each insert and remove so that it can move or drop only the entries at or after the changed positions, instead of being emptied.
+    The number of hits and misses is counted so that the cache's size can be tuned.
+'''
+
+
+import bisect
+from collections import OrderedDict
+
+class RecordCache:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict() # Each cached position's Address object, from the least to the most recently used
+        self.hits = 0
+        self.misses = 0
+
+
+    '''
+    get() returns a copy of the Address object cached for a position and marks it as the most recently used, or returns None if the position is not cached.
+    It takes an int for position.
+    '''
+    def get(self, position):
+        address = self.entries.get(position)
+        if (address is None):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(position)
+        return address.copy()
+
+
+    '''
+    put() caches a copy of an Address object under its position property, dropping the least recently used entry if the cache is full.
+    It takes an Address object for address.
+    '''
+    def put(self, address):
+        if (self.capacity < 1):
+            return
+        self.entries[address.position] = address.copy()
+        self.entries.move_to_end(address.position)
+        if (len(self.entries) > self.capacity):
+            self.entries.popitem(last = False)
+
+
+    '''
+    shift_for_insert() moves the cached entries that were moved back by inserted addresses.
+    It takes a sorted list of the final positions of the inserted addresses for positions.
+    An entry at position q before the insert is moved back by one for each inserted address that ends up at or before its new position, which is found with a binary search over the positions where each inserted address starts to move it.
+    '''
+    def shift_for_insert(self, positions):
+        thresholds = [position - index for index, position in enumerate(positions)]
+        if (not thresholds):
+            return
+        self.remap(thresholds[0], lambda position: position + bisect.bisect_right(thresholds, position))
+
+
+    '''
+    shift_for_remove() drops the cached entry of a removed address and moves the entries after it forward by one position.
+    It takes an int for position.
+    '''
+    def shift_for_remove(self, position):
+        self.entries.pop(position, None)
+        self.remap(position + 1, lambda oldPosition: oldPosition - 1)
+
+
+    '''
+    remap() moves every cached entry at or after a first position to the position returned by a function, keeping the order in which they were used.
+    Entries before the first position are kept as they are.
+    It takes an int for firstPosition and a function that takes and returns an int for newPosition.
+    '''
+    def remap(self, firstPosition, newPosition):
+        if (not any(position >= firstPosition for position in self.entries)):
+            return
+        entries = OrderedDict()
+        for position, address in self.entries.items():
+            if (position >= firstPosition):
+                position = newPosition(position)
+                address.position = position
+            entries[position] = address
+        self.entries = entries
+
+
+    '''
+    evict_range() drops every cached entry from a first position to a last position.
+    It takes an int for firstPosition and an int for lastPosition.
+    '''
+    def evict_range(self, firstPosition, lastPosition):
+        for position in [position for position in self.entries if (firstPosition <= position <= lastPosition)]:
+            del self.entries[position]
+
+
+    '''
+    clear() drops every cached entry, but keeps the hit and miss counts.
+    '''
+    def clear(self):
+        self.entries.clear()
+
+
+    '''
+    stats() returns a dictionary of the cache's 'capacity', its current 'size', and the number of 'hits' and 'misses' so far.
+    '''
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'size':     len(self.entries),
+            'hits':     self.hits,
+            'misses':   self.misses,
+        }
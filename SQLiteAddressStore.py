@@ -0,0 +1,487 @@
+'''
+    SQLiteAddressStore is the storage engine that stores the address book in an SQLite database.
+
+    Storage layout of the address book:
+    Each address is a row in the addresses table, with a column for each field, and the names stored as a JSON list.
+    The recordId column is an AUTOINCREMENT key, so the id of a deleted address is never handed to a new one, and a page cursor holding it can never point at a different address.
+    The position and section columns have indexes, so looking up an address by position or the addresses in a section does not scan the table.
+    The street and the address number, street, and unit also have indexes, and each resident name is stored as a row of the addressNames table with an index on the name, so addresses can be found by any of them without a scan.
+    For fuzzy search, each word of the names and street is stored as a row of the addressWords table, and the trigrams of every distinct word are stored in the wordTrigrams table.
+    Moving addresses back or forward when an address is inserted or deleted is done with a single UPDATE statement inside SQLite.
+    Every operation runs in one transaction that is committed when the store is synced, so an operation is either saved completely or not at all.
+    The database uses SQLite's write-ahead log, so committing an operation appends the changed pages to the '-wal' file with a single fsync, and SQLite copies them into the database at a checkpoint.
+    The header is not stored in the database, since it is read from the indexes when the store is opened, except for the section runs, which are stored as JSON in the metadata table.
+'''
+
+
+import sqlite3
+import os
+import json
+import logging
+
+from AddressStore import AddressStore
+from Address import Address
+from Metrics import Metrics
+
+class SQLiteAddressStore(AddressStore):
+    ADDRESSES_TABLE = '''
+        CREATE TABLE IF NOT EXISTS addresses (
+            recordId        INTEGER PRIMARY KEY AUTOINCREMENT,
+            addressNumber   INTEGER,
+            street          TEXT,
+            unit            TEXT,
+            names           TEXT,
+            position        INTEGER NOT NULL,
+            section         INTEGER,
+            isBusiness      INTEGER,
+            isCBU           INTEGER,
+            isVacant        INTEGER
+        )
+    '''
+    ADDRESSES_INDEXES = [
+        "CREATE INDEX IF NOT EXISTS addressesByPosition ON addresses (position)",
+        "CREATE INDEX IF NOT EXISTS addressesBySection ON addresses (section)",
+        "CREATE INDEX IF NOT EXISTS addressesByStreet ON addresses (street)",
+        "CREATE INDEX IF NOT EXISTS addressesByNumber ON addresses (addressNumber, street, unit)",
+    ]
+    SCHEMA = ADDRESSES_TABLE + ';' + ';'.join(ADDRESSES_INDEXES) + ''';
+        CREATE TABLE IF NOT EXISTS addressNames (
+            recordId        INTEGER NOT NULL,
+            name            TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS addressNamesByName ON addressNames (name);
+        CREATE INDEX IF NOT EXISTS addressNamesByRecord ON addressNames (recordId);
+        CREATE TABLE IF NOT EXISTS addressWords (
+            recordId        INTEGER NOT NULL,
+            word            TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS addressWordsByWord ON addressWords (word);
+        CREATE INDEX IF NOT EXISTS addressWordsByRecord ON addressWords (recordId);
+        CREATE TABLE IF NOT EXISTS wordTrigrams (
+            trigram         TEXT NOT NULL,
+            word            TEXT NOT NULL,
+            PRIMARY KEY (trigram, word)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS wordTrigramsByWord ON wordTrigrams (word);
+        CREATE TABLE IF NOT EXISTS metadata (
+            key             TEXT PRIMARY KEY,
+            value           TEXT NOT NULL
+        );
+    '''
+    SCHEMA_VERSION = 4 # Stored as the database's user_version, and raised whenever existing databases need their new tables filled in or their addresses table rebuilt
+    CHECKPOINT_PAGES = 256 # Number of pages the write-ahead log can grow to before SQLite copies them into the database at the end of a commit
+
+    COLUMNS = 'addressNumber, street, unit, names, position, section, isBusiness, isCBU, isVacant'
+
+    def __init__(self, fileName, keepOpen = False, cacheSize = 1024, lockTimeout = 10.0):
+        super().__init__(fileName, keepOpen, cacheSize, lockTimeout)
+        self.connection = None
+
+
+    '''
+    open() connects to the database, turns on the write-ahead log, creates the table and indexes if they don't exist, and reads the header from the indexes.
+    '''
+    def open(self):
+        logging.debug("Opening the address book %s.", self.fileName)
+        self.connection = sqlite3.connect(self.fileName, check_same_thread = False) # A store is only used by one thread at a time, but a worker thread's store may be closed by the thread that stopped it
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute(f"PRAGMA wal_autocheckpoint = {SQLiteAddressStore.CHECKPOINT_PAGES}")
+        self.connection.executescript(SQLiteAddressStore.SCHEMA)
+        schemaVersion = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if ((schemaVersion < SQLiteAddressStore.SCHEMA_VERSION) and (self.lock.mode != 'exclusive')):
+            logging.info("Since the schema needs to be upgraded, taking the lock exclusively.")
+            self.lock.acquire(True)
+            schemaVersion = self.connection.execute("PRAGMA user_version").fetchone()[0] # Another process may have upgraded it in between
+        if (schemaVersion < SQLiteAddressStore.SCHEMA_VERSION):
+            self.upgrade_schema(schemaVersion)
+        self.isOpen = True
+        count = self.connection.execute("SELECT COUNT(*) FROM addresses").fetchone()[0]
+        self.header = {
+            'count':        count,
+            'lastPosition': count or None,
+        }
+        sectionsRow = self.connection.execute("SELECT value FROM metadata WHERE key = 'sections'").fetchone()
+        runs = json.loads(sectionsRow[0]) if sectionsRow else None
+        if ((runs is None) or (sum(runCount for section, runCount in runs) != count)):
+            logging.info("Since the section runs are missing or do not match the number of addresses, rebuilding them from the addresses table.")
+            runs = AddressStore.build_section_runs(section for (section,) in self.connection.execute("SELECT section FROM addresses ORDER BY position"))
+            self.set_section_runs(runs)
+        else:
+            self.set_section_runs(runs)
+            self.metadataChanged = False
+
+
+    '''
+    upgrade_schema() fills in the tables that were added to the schema after the database was created, from the addresses table.
+    It takes an int for schemaVersion, which is the version the database was created with.
+    A database from before version 4 has its addresses table copied into a new one whose record ids are never used again, keeping every record id.
+    The whole upgrade runs in one transaction, so it is either done completely or not at all.
+    '''
+    def upgrade_schema(self, schemaVersion):
+        logging.info("Upgrading the database from schema version %s to %s.", schemaVersion, SQLiteAddressStore.SCHEMA_VERSION)
+        if (not self.connection.in_transaction):
+            self.connection.execute("BEGIN")
+        if (schemaVersion < 1):
+            self.connection.execute("INSERT INTO addressNames (recordId, name) SELECT DISTINCT addresses.recordId, names.value FROM addresses, json_each(addresses.names) AS names")
+        if (schemaVersion < 2):
+            words = []
+            for recordId, street, names in self.connection.execute("SELECT recordId, street, names FROM addresses").fetchall():
+                words.extend((recordId, word) for word in AddressStore.words(' '.join([street] + json.loads(names))))
+            self.connection.executemany("INSERT INTO addressWords (recordId, word) VALUES (?, ?)", words)
+            self.connection.executemany("INSERT OR IGNORE INTO wordTrigrams (trigram, word) VALUES (?, ?)", [(trigram, word) for word in set(word for recordId, word in words) for trigram in AddressStore.trigrams(word)])
+        if (schemaVersion < 4):
+            self.connection.execute("ALTER TABLE addresses RENAME TO oldAddresses")
+            self.connection.execute(SQLiteAddressStore.ADDRESSES_TABLE)
+            self.connection.execute(f"INSERT INTO addresses (recordId, {SQLiteAddressStore.COLUMNS}) SELECT recordId, {SQLiteAddressStore.COLUMNS} FROM oldAddresses")
+            self.connection.execute("DROP TABLE oldAddresses") # Drops the old table's indexes along with it
+            for statement in SQLiteAddressStore.ADDRESSES_INDEXES:
+                self.connection.execute(statement)
+        self.connection.execute(f"PRAGMA user_version = {SQLiteAddressStore.SCHEMA_VERSION}")
+        self.connection.commit()
+
+
+    '''
+    sync() writes the section runs, if they were changed, and commits the current transaction.
+    '''
+    def sync(self):
+        if (not self.isOpen):
+            return
+        if (self.metadataChanged):
+            self.connection.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES ('sections', ?)", (json.dumps(self.header['sections']),))
+            self.metadataChanged = False
+        self.connection.commit()
+
+
+    '''
+    checkpoint() commits the current transaction and has SQLite copy every page in the write-ahead log into the database and empty the log.
+    '''
+    def checkpoint(self):
+        logging.debug("Beginning function execution.")
+        self.sync()
+        journalSize = self.get_journal_size()
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return journalSize
+
+
+    '''
+    get_journal_size() returns the number of bytes in the write-ahead log file.
+    '''
+    def get_journal_size(self):
+        try:
+            return os.path.getsize(self.fileName + '-wal')
+        except OSError:
+            return 0
+
+
+    '''
+    abort() rolls back the current transaction and closes the connection, so the header is read again from the database the next time it is opened.
+    '''
+    def abort(self):
+        if (not self.isOpen):
+            return
+        self.connection.rollback()
+        self.metadataChanged = False
+        self.close()
+
+
+    '''
+    close() syncs and closes the connection.
+    '''
+    def close(self):
+        if (not self.isOpen):
+            return
+        logging.debug("Closing the address book %s.", self.fileName)
+        self.sync()
+        self.connection.close()
+        self.connection = None
+        self.isOpen = False
+        self.header = None
+        self.sectionBounds = None
+        self.sectionRunEnds = None
+        self.recordCache.clear()
+        self.depth = 0
+
+
+    '''
+    row_to_address() converts a row of the addresses table, with the columns in the order of COLUMNS, to an Address object.
+    '''
+    @staticmethod
+    def row_to_address(row):
+        if (Metrics.enabled):
+            Metrics.count('recordsRead')
+        return Address(
+            row[0],
+            row[1],
+            row[2],
+            json.loads(row[3]),
+            row[4],
+            row[5],
+            bool(row[6]),
+            bool(row[7]),
+            bool(row[8])
+        )
+
+
+    '''
+    address_to_row() converts an Address object to a tuple of values for the columns in the order of COLUMNS.
+    '''
+    @staticmethod
+    def address_to_row(address):
+        if (Metrics.enabled):
+            Metrics.count('recordsWritten')
+        return (
+            address.addressNumber,
+            address.street,
+            address.unit,
+            json.dumps(address.names),
+            address.position,
+            address.section,
+            address.isBusiness,
+            address.isCBU,
+            address.isVacant,
+        )
+
+
+    '''
+    read_record_at() returns the address at a position as an Address object, looked up with the position index, or None if no address is there.
+    '''
+    def read_record_at(self, position):
+        row = self.connection.execute(f"SELECT {SQLiteAddressStore.COLUMNS} FROM addresses WHERE position = ?", (position,)).fetchone()
+        return SQLiteAddressStore.row_to_address(row) if row else None
+
+
+    '''
+    iter_records() yields every address as an Address object in position order, reading the rows from one query as they are needed.
+    '''
+    def iter_records(self):
+        for row in self.connection.execute(f"SELECT {SQLiteAddressStore.COLUMNS} FROM addresses ORDER BY position"):
+            yield SQLiteAddressStore.row_to_address(row)
+
+
+    '''
+    iter_range() yields the addresses from firstPosition to lastPosition as Address objects in position order, reading only those rows with the position index.
+    '''
+    def iter_range(self, firstPosition, lastPosition):
+        for row in self.connection.execute(f"SELECT {SQLiteAddressStore.COLUMNS} FROM addresses WHERE position BETWEEN ? AND ? ORDER BY position", (firstPosition, lastPosition)):
+            yield SQLiteAddressStore.row_to_address(row)
+
+
+    '''
+    get_record_id_at() returns the record id of the address at a position, or None if no address is there.
+    '''
+    def get_record_id_at(self, position):
+        row = self.connection.execute("SELECT recordId FROM addresses WHERE position = ?", (position,)).fetchone()
+        return row[0] if row else None
+
+
+    '''
+    get_record_position() returns the current position of the address with a record id, or None if it has been deleted.
+    '''
+    def get_record_position(self, recordId):
+        row = self.connection.execute("SELECT position FROM addresses WHERE recordId = ?", (recordId,)).fetchone()
+        return row[0] if row else None
+
+
+    '''
+    insert_address() moves every address at or after the new address's position back by one with a single UPDATE statement, and then inserts the address and its names and words.
+    It returns the record id of the new row.
+    '''
+    def insert_address(self, address):
+        logging.debug("Beginning function execution with address = %s.", address)
+        self.connection.execute("UPDATE addresses SET position = position + 1 WHERE position >= ?", (address.position,))
+        cursor = self.connection.execute(f"INSERT INTO addresses ({SQLiteAddressStore.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", SQLiteAddressStore.address_to_row(address))
+        self.index_addresses([(cursor.lastrowid, address)])
+        self.update_metadata_for_insert([address])
+        return cursor.lastrowid
+
+
+    '''
+    insert_addresses() moves every existing address back by the number of batch addresses inserted at or before it with one UPDATE statement, and then inserts the batch.
+    '''
+    def insert_addresses(self, addresses):
+        logging.debug("Beginning function execution with %s addresses.", len(addresses))
+        if (not addresses):
+            return
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS batchPositions (position INTEGER)")
+        self.connection.execute("DELETE FROM batchPositions")
+        self.connection.executemany("INSERT INTO batchPositions (position) VALUES (?)", [(address.position,) for address in addresses])
+        self.connection.execute("CREATE INDEX IF NOT EXISTS temp.batchPositionsByPosition ON batchPositions (position)")
+        self.connection.execute("""
+            UPDATE addresses
+            SET position = position + (SELECT COUNT(*) FROM batchPositions WHERE batchPositions.position <= addresses.position)
+            WHERE position >= ?
+        """, (addresses[0].position,))
+        for order, address in enumerate(addresses):
+            address.position += order # Every address before it in the batch was inserted at or before its position
+        insertedAddresses = []
+        for address in addresses:
+            cursor = self.connection.execute(f"INSERT INTO addresses ({SQLiteAddressStore.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", SQLiteAddressStore.address_to_row(address))
+            insertedAddresses.append((cursor.lastrowid, address))
+        self.index_addresses(insertedAddresses)
+        self.connection.execute("DELETE FROM batchPositions")
+        self.update_metadata_for_insert(addresses)
+
+
+    '''
+    index_addresses() adds the names and words of newly inserted addresses to the addressNames and addressWords tables.
+    It takes a list of tuples of a record id and an Address object for insertedAddresses.
+    The trigrams are only added for words that no address had before.
+    '''
+    def index_addresses(self, insertedAddresses):
+        names = []
+        words = []
+        for recordId, address in insertedAddresses:
+            names.extend((recordId, name) for name in dict.fromkeys(address.names))
+            words.extend((recordId, word) for word in AddressStore.address_words(address))
+        newWords = [word for word in set(word for recordId, word in words) if not self.connection.execute("SELECT 1 FROM addressWords WHERE word = ?", (word,)).fetchone()]
+        self.connection.executemany("INSERT INTO addressNames (recordId, name) VALUES (?, ?)", names)
+        self.connection.executemany("INSERT INTO addressWords (recordId, word) VALUES (?, ?)", words)
+        self.connection.executemany("INSERT OR IGNORE INTO wordTrigrams (trigram, word) VALUES (?, ?)", [(trigram, word) for word in newWords for trigram in AddressStore.trigrams(word)])
+
+
+    '''
+    unindex_address() removes the names and words of a deleted address from the addressNames and addressWords tables.
+    It takes an int for recordId.
+    The trigrams of any word that no address has anymore are removed.
+    '''
+    def unindex_address(self, recordId):
+        words = [word for (word,) in self.connection.execute("SELECT DISTINCT word FROM addressWords WHERE recordId = ?", (recordId,))]
+        self.connection.execute("DELETE FROM addressNames WHERE recordId = ?", (recordId,))
+        self.connection.execute("DELETE FROM addressWords WHERE recordId = ?", (recordId,))
+        for word in words:
+            if (not self.connection.execute("SELECT 1 FROM addressWords WHERE word = ?", (word,)).fetchone()):
+                self.connection.execute("DELETE FROM wordTrigrams WHERE word = ?", (word,))
+
+
+    '''
+    remove_address() deletes the address at a position along with its names and words, and moves every address after it forward by one with a single UPDATE statement.
+    It returns the deleted address as an Address object, or None if no address is at the position.
+    '''
+    def remove_address(self, position):
+        logging.debug("Beginning function execution with position = %s.", position)
+        row = self.connection.execute(f"SELECT recordId, {SQLiteAddressStore.COLUMNS} FROM addresses WHERE position = ?", (position,)).fetchone()
+        if (not row):
+            logging.info("Since no address exists at the position, returning None.")
+            return None
+        self.connection.execute("DELETE FROM addresses WHERE recordId = ?", (row[0],))
+        self.unindex_address(row[0])
+        self.connection.execute("UPDATE addresses SET position = position - 1 WHERE position > ?", (position,))
+        self.update_metadata_for_remove(position)
+        return SQLiteAddressStore.row_to_address(row[1:])
+
+
+    '''
+    move_address() replaces the address at fromPosition with an Address object, which may have a different position, keeping its record id.
+    The addresses between the old and new positions are moved by one with a single UPDATE statement, and the names and words are only indexed again if the names or street changed.
+    It returns the old address as an Address object, or None if no address is at fromPosition.
+    '''
+    def move_address(self, fromPosition, address):
+        logging.debug("Beginning function execution with fromPosition = %s, address = %s.", fromPosition, address)
+        row = self.connection.execute(f"SELECT recordId, {SQLiteAddressStore.COLUMNS} FROM addresses WHERE position = ?", (fromPosition,)).fetchone()
+        if (not row):
+            logging.info("Since no address exists at the position, returning None.")
+            return None
+        if (address.position > fromPosition):
+            self.connection.execute("UPDATE addresses SET position = position - 1 WHERE position BETWEEN ? AND ?", (fromPosition + 1, address.position))
+        elif (address.position < fromPosition):
+            self.connection.execute("UPDATE addresses SET position = position + 1 WHERE position BETWEEN ? AND ?", (address.position, fromPosition - 1))
+        columns = SQLiteAddressStore.COLUMNS.split(', ')
+        self.connection.execute(f"UPDATE addresses SET {', '.join(column + ' = ?' for column in columns)} WHERE recordId = ?", SQLiteAddressStore.address_to_row(address) + (row[0],))
+        oldAddress = SQLiteAddressStore.row_to_address(row[1:])
+        if ((oldAddress.names != address.names) or (oldAddress.street != address.street)):
+            self.unindex_address(row[0])
+            self.index_addresses([(row[0], address)])
+        self.update_metadata_for_move(fromPosition, address)
+        return oldAddress
+
+
+    '''
+    move_range() moves the addresses from startPosition to endPosition so that they follow the address at targetPosition, with a single UPDATE statement that also moves the addresses they pass over.
+    '''
+    def move_range(self, startPosition, endPosition, targetPosition):
+        logging.debug("Beginning function execution with startPosition = %s, endPosition = %s, targetPosition = %s.", startPosition, endPosition, targetPosition)
+        runs = self.moved_section_runs(startPosition, endPosition, targetPosition)
+        blockLength = endPosition - startPosition + 1
+        if (targetPosition > endPosition):
+            firstPosition, lastPosition = startPosition, targetPosition
+            self.connection.execute(
+                "UPDATE addresses SET position = CASE WHEN position <= ? THEN position + ? ELSE position - ? END WHERE position BETWEEN ? AND ?",
+                (endPosition, targetPosition - endPosition, blockLength, firstPosition, lastPosition)
+            )
+        else:
+            firstPosition, lastPosition = targetPosition + 1, endPosition
+            self.connection.execute(
+                "UPDATE addresses SET position = CASE WHEN position >= ? THEN position - ? ELSE position + ? END WHERE position BETWEEN ? AND ?",
+                (startPosition, startPosition - firstPosition, blockLength, firstPosition, lastPosition)
+            )
+        self.update_metadata_for_reorder(firstPosition, lastPosition, runs)
+
+
+    '''
+    reorder() writes the new position of every address whose position changes to a temporary table, and then moves them all with one UPDATE statement.
+    '''
+    def reorder(self, firstPosition, oldPositions):
+        logging.debug("Beginning function execution with firstPosition = %s, %s positions.", firstPosition, len(oldPositions))
+        runs = self.reordered_section_runs(firstPosition, oldPositions)
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS reorderPositions (oldPosition INTEGER PRIMARY KEY, newPosition INTEGER)")
+        self.connection.execute("DELETE FROM reorderPositions")
+        self.connection.executemany("INSERT INTO reorderPositions (oldPosition, newPosition) VALUES (?, ?)", [(oldPosition, firstPosition + order) for order, oldPosition in enumerate(oldPositions) if (oldPosition != (firstPosition + order))])
+        self.connection.execute("""
+            UPDATE addresses
+            SET position = (SELECT newPosition FROM reorderPositions WHERE reorderPositions.oldPosition = addresses.position)
+            WHERE position IN (SELECT oldPosition FROM reorderPositions)
+        """)
+        self.connection.execute("DELETE FROM reorderPositions")
+        self.update_metadata_for_reorder(firstPosition, firstPosition + len(oldPositions) - 1, runs)
+
+
+    '''
+    find_records() returns a list of the Address objects that match every given field, in position order, looked up with the indexes on the addresses and addressNames tables.
+    An address number is only matched together with the street and unit, and if no field is given, it returns an empty list.
+    '''
+    def find_records(self, street = None, addressNumber = None, unit = None, name = None):
+        logging.debug("Beginning function execution with street = %s, addressNumber = %s, unit = %s, name = %s.", street, addressNumber, unit, name)
+        conditions = []
+        values = []
+        if (addressNumber is not None):
+            conditions.append("addressNumber = ? AND street = ? AND unit IS ?")
+            values.extend([addressNumber, street, unit])
+        elif (street is not None):
+            conditions.append("street = ?")
+            values.append(street)
+        if (name is not None):
+            conditions.append("recordId IN (SELECT recordId FROM addressNames WHERE name = ?)")
+            values.append(name)
+        if (not conditions):
+            return []
+        rows = self.connection.execute(f"SELECT {SQLiteAddressStore.COLUMNS} FROM addresses WHERE {' AND '.join(conditions)} ORDER BY position", values)
+        return [SQLiteAddressStore.row_to_address(row) for row in rows]
+
+
+    '''
+    count_shared_trigrams() returns a dictionary of each indexed word that has any of the trigrams, mapped to the number of them it has, counted by SQLite from the wordTrigrams table.
+    '''
+    def count_shared_trigrams(self, trigrams):
+        trigrams = list(trigrams)
+        rows = self.connection.execute(f"SELECT word, COUNT(*) FROM wordTrigrams WHERE trigram IN ({', '.join('?' * len(trigrams))}) GROUP BY word", trigrams)
+        return dict(rows.fetchall())
+
+
+    '''
+    get_word_record_ids() returns a list of the record ids of the addresses whose names or street contain a word.
+    '''
+    def get_word_record_ids(self, word):
+        return [recordId for (recordId,) in self.connection.execute("SELECT recordId FROM addressWords WHERE word = ?", (word,))]
+
+
+    '''
+    get_records_by_ids() returns a dictionary of each record id that still exists mapped to its address as an Address object, looked up in batches of 500 ids.
+    '''
+    def get_records_by_ids(self, recordIds):
+        recordIds = list(recordIds)
+        addresses = {}
+        for start in range(0, len(recordIds), 500): # Stays well under SQLite's limit on the number of values in one statement
+            batch = list(recordIds[start:(start + 500)])
+            for row in self.connection.execute(f"SELECT recordId, {SQLiteAddressStore.COLUMNS} FROM addresses WHERE recordId IN ({', '.join('?' * len(batch))})", batch):
+                addresses[row[0]] = SQLiteAddressStore.row_to_address(row[1:])
+        return addresses
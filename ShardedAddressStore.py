@@ -0,0 +1,839 @@
+'''
+    ShardedAddressStore is an optional storage engine that splits the address book by section into separate shelve files, called shards, so that a change only rewrites the file of the sections it is in.
+
+    Storage layout of the address book:
+    Each shard holds a run of consecutive positions that covers one section, or a range of neighboring sections, and is stored as a complete shelve address book with the ShelveAddressStore layout in '<fileName>.shard<shardId>', with its positions counted from the start of the shard.
+    The main file '<fileName>' holds the header, the manifest ('manifest'), which is the list of [shardId, count] pairs of every shard in route order, and the cross-shard index.
+    The position where each shard starts is worked out from the counts when the manifest is loaded, so a position is routed to its shard with a binary search of the shard ends, and inserting or deleting an address only rewrites its own shard and the manifest's counts.
+    An address inserted where one shard ends and the next begins goes into whichever of the two has its section, and an address that starts a new section there gets a new shard, so building a route section by section gives every section its own shard.
+    A shard that grows beyond MAX_SHARD_SIZE addresses is split at the section boundary nearest its middle, and a shard that becomes empty is dropped from the manifest and kept as a spare, which is used again for the next new shard instead of leaving its file unused.
+    Every file is a dbm.dumb file opened with ShelveAddressStore.open_dbm(), for the same reasons as in ShelveAddressStore.
+    Every file is written through one Journal ('<fileName>.journal'), so an operation that changes several shards is still saved with a single fsync and is never half saved, and a checkpoint only rewrites the key lists of the files that changed.
+    A record id is the shard's own record id followed by SHARD_ID_BITS bits of the shard id, so an address keeps its record id unless it moves to another shard, which happens when it is moved between sections that are in different shards or its shard is split.
+    The cross-shard index maps each secondary index entry of the shards (a street, an address number, a name, or a word, as in ShelveAddressStore) to the list of ids of the shards that have it, spread by a checksum across INDEX_BUCKETS keys ('index:<bucket>') of the main file.
+    A shard reports an entry to the sharded store when it gets its first address and when it loses its last one, so the cross-shard index only changes when an entry is first used or no longer used in a shard.
+    A search reads the cross-shard index first and only opens the shards that have every entry it looks for, so finding an address does not open every shard of the address book.
+    The trigram entries ('trigram:<trigram>') that map each trigram to the words that have it are kept in the same buckets of the main file instead of in the shards, since a word has the same trigrams in every shard it is in, so fuzzy search only opens the shards that have the words it matched.
+'''
+
+
+import bisect
+import shelve
+import zlib
+import logging
+import itertools
+
+from collections.abc import MutableMapping
+from AddressStore import AddressStore
+from ShelveAddressStore import ShelveAddressStore
+from Journal import Journal
+
+
+'''
+ShardFiles is the mapping underneath the journal of a sharded address book, which keeps each key in the dbm file it belongs to.
+A key that starts with 'shard<shardId>/' is kept without that prefix in the shard's file, and any other key is kept in the main file.
+A shard's file is opened the first time it is used, and sync() only flushes the files that were changed since the last sync.
+'''
+class ShardFiles(MutableMapping):
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.databases = {None: ShelveAddressStore.open_dbm(fileName)} # Each open dbm file by its shard id, with None for the main file
+        self.changed = set() # Shard ids of the files written since the last sync
+
+
+    '''
+    get_database() returns the open dbm file of a shard, opening it if it is not open yet.
+    It takes an int for shardId, or None for the main file.
+    '''
+    def get_database(self, shardId):
+        if (shardId not in self.databases):
+            self.databases[shardId] = ShelveAddressStore.open_dbm(f"{self.fileName}.shard{shardId}")
+        return self.databases[shardId]
+
+
+    '''
+    split_key() returns a tuple of the shard id that a key belongs to, or None for the main file, and the key within that file.
+    It takes bytes for key.
+    '''
+    @staticmethod
+    def split_key(key):
+        if (not key.startswith(b'shard')):
+            return (None, key)
+        prefix, separator, fileKey = key.partition(b'/')
+        return (int(prefix[len(b'shard'):]), fileKey)
+
+
+    def __getitem__(self, key):
+        shardId, fileKey = ShardFiles.split_key(key)
+        return self.get_database(shardId)[fileKey]
+
+
+    def __setitem__(self, key, value):
+        shardId, fileKey = ShardFiles.split_key(key)
+        self.get_database(shardId)[fileKey] = value
+        self.changed.add(shardId)
+
+
+    def __delitem__(self, key):
+        shardId, fileKey = ShardFiles.split_key(key)
+        if (fileKey not in self.get_database(shardId)):
+            raise KeyError(key)
+        Journal.delete_dbm_keys(self.get_database(shardId), [fileKey])
+        self.changed.add(shardId)
+
+
+    def __contains__(self, key):
+        shardId, fileKey = ShardFiles.split_key(key)
+        return (fileKey in self.get_database(shardId))
+
+
+    '''
+    __iter__() returns an iterator over the keys of every file that is open, with their shard's prefix.
+    '''
+    def __iter__(self):
+        for shardId, database in list(self.databases.items()):
+            prefix = b'' if (shardId is None) else f"shard{shardId}/".encode('utf-8')
+            for fileKey in database.keys():
+                yield prefix + fileKey
+
+
+    def __len__(self):
+        return sum(len(database) for database in self.databases.values())
+
+
+    '''
+    sync() writes the key list of every file that was changed since the last sync and flushes it to the disk.
+    '''
+    def sync(self):
+        for shardId in self.changed:
+            Journal.flush_dbm(self.databases[shardId])
+        self.changed = set()
+
+
+    '''
+    close() closes every open dbm file.
+    '''
+    def close(self):
+        for database in self.databases.values():
+            database.close()
+        self.databases = {}
+
+
+'''
+ShardView is the part of a sharded address book's journal that belongs to one shard, which the shard's shelf reads and writes as if it were the shard's own journal.
+It adds the shard's prefix to every key that it is given and takes it off every key that it returns.
+'''
+class ShardView(MutableMapping):
+    def __init__(self, journal, shardId):
+        self.journal = journal
+        self.prefix = f"shard{shardId}/".encode('utf-8')
+        self.database = journal.database.get_database(shardId)
+
+
+    def __getitem__(self, key):
+        return self.journal[self.prefix + key]
+
+
+    def __setitem__(self, key, value):
+        self.journal[self.prefix + key] = value
+
+
+    def __delitem__(self, key):
+        del self.journal[self.prefix + key]
+
+
+    def __contains__(self, key):
+        return ((self.prefix + key) in self.journal)
+
+
+    '''
+    __iter__() returns an iterator over every key of the shard that exists, taking the journal into account, without reading the keys of any other shard.
+    '''
+    def __iter__(self):
+        changes = {**self.journal.changes, **self.journal.pending}
+        for fileKey in self.database.keys():
+            if ((self.prefix + fileKey) not in changes):
+                yield fileKey
+        for key, value in changes.items():
+            if (key.startswith(self.prefix) and (value is not None)):
+                yield key[len(self.prefix):]
+
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+
+'''
+ShelveShard is one shard of a sharded address book, which is a ShelveAddressStore whose keys are kept in the sharded address book's journal under the shard's prefix.
+It shares the lock and journal of the ShardedAddressStore that opened it, so it is never synced to the journal or checkpointed on its own.
+It has no record cache, since the sharded store caches addresses by their position in the whole address book.
+It keeps no trigram entries of its own, since it reports its new and unused index entries to the sharded store, which keeps the trigrams of every shard's words in the main file.
+'''
+class ShelveShard(ShelveAddressStore):
+    INDEX_BUCKETS = 128 # A shard normally holds one section, so its index entries are spread across far fewer keys than a whole address book's
+
+    def __init__(self, store, shardId):
+        super().__init__(f"{store.fileName}.shard{shardId}", cacheSize = 0)
+        self.shardId = shardId
+        self.store = store
+        self.lock = store.lock
+        self.journal = store.journal
+
+
+    '''
+    open_shelf() wraps the shard's part of the sharded store's journal in a shelf.
+    '''
+    def open_shelf(self):
+        self.addressBook = shelve.Shelf(ShardView(self.journal, self.shardId))
+
+
+    '''
+    index_entries_added() adds the shard to the cross-shard index entries that the shard has just started using.
+    '''
+    def index_entries_added(self, entries):
+        self.store.add_shard_to_entries(self.shardId, entries)
+
+
+    '''
+    index_entries_removed() removes the shard from the cross-shard index entries that the shard no longer uses.
+    '''
+    def index_entries_removed(self, entries):
+        self.store.remove_shard_from_entries(self.shardId, entries)
+
+
+    '''
+    sync() writes the shard's header and directory to the shelf, if they were changed, and leaves saving them to the sharded store.
+    '''
+    def sync(self):
+        if (self.isOpen):
+            self.write_metadata()
+
+
+    '''
+    abort() closes the shard without writing its header and directory, since the sharded store throws away the operation's changes to every shard at once.
+    '''
+    def abort(self):
+        self.metadataChanged = False
+        self.close()
+
+
+class ShardedAddressStore(AddressStore):
+    LAYOUT_VERSION = 1 # Version of the storage layout described above
+    MAX_SHARD_SIZE = 4096 # Number of addresses a shard can hold before it is split at the section boundary nearest its middle
+    SHARD_ID_BITS = 16 # Number of low bits of a record id that hold the id of the shard the record is in
+    INDEX_BUCKETS = 1024 # Number of keys of the main file that the cross-shard index and trigram entries are spread across
+
+    def __init__(self, fileName, keepOpen = False, cacheSize = 1024, lockTimeout = 10.0):
+        super().__init__(fileName, keepOpen, cacheSize, lockTimeout)
+        self.addressBook = None
+        self.journal = None
+        self.manifest = None
+        self.shardEnds = None # List of the last position of each shard in the manifest, for finding the shard of a position with a binary search
+        self.shardIndexes = None # Dictionary of each shard id to its index in the manifest
+        self.shards = None # Dictionary of each shard id to its ShelveShard, which is opened the first time it is used
+
+
+    '''
+    open() opens the main file and the journal, and loads the header and manifest into memory.
+    If the address book has not been set up yet, the lock is converted to an exclusive lock and the address book is set up with no shards.
+    If the main file holds a shelve address book that is not sharded, it raises a ValueError, since migrate.py must be used to copy it instead.
+    '''
+    def open(self):
+        logging.debug("Opening the address book %s.", self.fileName)
+        self.open_shelf()
+        if ((self.lock.mode != 'exclusive') and ('manifest' not in self.addressBook)):
+            logging.info("Since the address book needs to be set up, taking the lock exclusively.")
+            self.addressBook.close()
+            self.lock.acquire(True)
+            self.open_shelf()
+        if (('manifest' not in self.addressBook) and ('header' in self.addressBook)):
+            self.addressBook.close()
+            raise ValueError(f"{self.fileName} is a shelve address book that is not sharded, which must be copied with migrate.py first.")
+        self.isOpen = True
+        self.shards = {}
+        if ('manifest' not in self.addressBook):
+            self.initialize_layout()
+            return
+        self.header = self.addressBook['header']
+        self.set_manifest(self.addressBook['manifest'])
+        self.metadataChanged = False
+
+
+    '''
+    open_shelf() opens the main file and the journal, and wraps the journal in a shelf for the header and manifest.
+    '''
+    def open_shelf(self):
+        self.journal = Journal(self.fileName + '.journal', ShardFiles(self.fileName))
+        self.addressBook = shelve.Shelf(self.journal)
+
+
+    '''
+    initialize_layout() sets up the header and an empty manifest in the open address book.
+    '''
+    def initialize_layout(self):
+        logging.info("Setting up the sharded storage layout.")
+        self.header = {
+            'layoutVersion': ShardedAddressStore.LAYOUT_VERSION,
+            'nextShardId':   1,
+            'spareShards':   [], # Ids of the shards that became empty, which are used again before any new shard id
+            'count':         0,
+            'lastPosition':  None,
+        }
+        self.set_section_runs([])
+        self.set_manifest([])
+
+
+    '''
+    sync() writes the header and directory of every open shard and the header and manifest, if they were changed, and saves every key changed by the operation to the journal as one record.
+    If the lock is held exclusively and the journal has grown past MAX_JOURNAL_SIZE, the journal's changes are then written into the files.
+    '''
+    def sync(self):
+        if (not self.isOpen):
+            return
+        for shard in self.shards.values():
+            shard.sync()
+        if (self.metadataChanged):
+            self.addressBook['header'] = self.header
+            self.addressBook['manifest'] = self.manifest
+            self.metadataChanged = False
+        self.addressBook.sync()
+        if ((self.lock.mode == 'exclusive') and (self.journal.get_size() >= ShelveAddressStore.MAX_JOURNAL_SIZE)):
+            logging.info("Since the journal has grown past %s bytes without being checkpointed while idle, checkpointing it now.", ShelveAddressStore.MAX_JOURNAL_SIZE)
+            self.journal.checkpoint()
+
+
+    '''
+    checkpoint() saves the operation in progress, writes every change in the journal into the files, and empties the journal.
+    '''
+    def checkpoint(self):
+        logging.debug("Beginning function execution.")
+        self.sync()
+        return self.journal.checkpoint()
+
+
+    '''
+    get_journal_size() returns the number of bytes in the journal that every shard shares.
+    '''
+    def get_journal_size(self):
+        return self.journal.get_size()
+
+
+    '''
+    needs_checkpoint() returns True if the shared journal has grown past CHECKPOINT_SIZE bytes, the same as in ShelveAddressStore.
+    '''
+    def needs_checkpoint(self):
+        return (self.journal.get_size() >= ShelveAddressStore.CHECKPOINT_SIZE)
+
+
+    '''
+    abort() throws away the keys changed by the operation in progress in every shard and closes the address book, so everything is loaded again from the journal the next time it is opened.
+    '''
+    def abort(self):
+        if (not self.isOpen):
+            return
+        for shard in self.shards.values():
+            shard.abort()
+        self.journal.discard()
+        self.metadataChanged = False
+        self.close()
+
+
+    '''
+    close() closes every open shard, then syncs and closes the address book files.
+    '''
+    def close(self):
+        if (not self.isOpen):
+            return
+        logging.debug("Closing the address book %s.", self.fileName)
+        for shard in self.shards.values():
+            shard.close()
+        self.sync()
+        self.addressBook.close()
+        self.addressBook = None
+        self.journal = None
+        self.isOpen = False
+        self.header = None
+        self.manifest = None
+        self.shardEnds = None
+        self.shardIndexes = None
+        self.shards = None
+        self.sectionBounds = None
+        self.sectionRunEnds = None
+        self.recordCache.clear()
+        self.depth = 0
+
+
+    '''
+    set_manifest() replaces the manifest and works out the last position of each shard from its counts.
+    It takes a list of [shardId, count] pairs for manifest, in route order.
+    '''
+    def set_manifest(self, manifest):
+        self.manifest = manifest
+        self.shardEnds = list(itertools.accumulate(count for shardId, count in manifest))
+        self.shardIndexes = {shardId: index for index, (shardId, count) in enumerate(manifest)}
+        self.metadataChanged = True
+
+
+    '''
+    get_shard_start() returns the first position of the shard at an index of the manifest.
+    '''
+    def get_shard_start(self, index):
+        return (self.shardEnds[index - 1] + 1) if index else 1
+
+
+    '''
+    locate_position() finds the shard that holds a position with a binary search of the shard ends.
+    It takes an int for position.
+    It returns a tuple of the index of the shard in the manifest and the position within that shard, or None if the position does not exist.
+    '''
+    def locate_position(self, position):
+        if ((position < 1) or (position > self.header['count'])):
+            return None
+        index = bisect.bisect_left(self.shardEnds, position)
+        return (index, position - self.get_shard_start(index) + 1)
+
+
+    '''
+    open_shard() returns the ShelveShard with a shard id, opening it if it is not open yet.
+    '''
+    def open_shard(self, shardId):
+        shard = self.shards.get(shardId)
+        if (shard is None):
+            shard = self.shards[shardId] = ShelveShard(self, shardId)
+            shard.open()
+        return shard
+
+
+    '''
+    get_shard() returns the ShelveShard at an index of the manifest, opening it if it is not open yet.
+    '''
+    def get_shard(self, index):
+        return self.open_shard(self.manifest[index][0])
+
+
+    '''
+    allocate_shard() returns the id of an empty shard for addresses that need a new shard, which is a spare shard if there is one.
+    If every shard id is used, it raises a RuntimeError.
+    '''
+    def allocate_shard(self):
+        self.metadataChanged = True
+        if (self.header['spareShards']):
+            return self.header['spareShards'].pop()
+        shardId = self.header['nextShardId']
+        if (shardId >= (1 << ShardedAddressStore.SHARD_ID_BITS)):
+            raise RuntimeError(f"The address book {self.fileName} has run out of shard ids.")
+        self.header['nextShardId'] += 1
+        return shardId
+
+
+    '''
+    encode_record_id() is a static method that returns the record id in the whole address book of a record id within a shard.
+    It takes an int for shardId and an int for recordId.
+    '''
+    @staticmethod
+    def encode_record_id(shardId, recordId):
+        return (recordId << ShardedAddressStore.SHARD_ID_BITS) | shardId
+
+
+    '''
+    decode_record_id() is a static method that returns a tuple of the shard id and the record id within the shard of a record id from encode_record_id().
+    '''
+    @staticmethod
+    def decode_record_id(recordId):
+        return (recordId & ((1 << ShardedAddressStore.SHARD_ID_BITS) - 1), recordId >> ShardedAddressStore.SHARD_ID_BITS)
+
+
+    '''
+    read_record_at() reads the address at a position from the shard that holds it, and returns it as an Address object with its position in the whole address book, or None if the position does not exist.
+    '''
+    def read_record_at(self, position):
+        location = self.locate_position(position)
+        if (not location):
+            return None
+        index, shardPosition = location
+        address = self.get_shard(index).read_record_at(shardPosition)
+        address.position = position
+        return address
+
+
+    '''
+    iter_records() returns a generator of every Address object in position order, reading one shard at a time.
+    '''
+    def iter_records(self):
+        return self.iter_range(1, self.header['count'])
+
+
+    '''
+    iter_range() is a generator that yields every Address object from a first position to a last position, in position order, with its position property set.
+    It starts at the shard that holds the first position and only opens the shards that hold the range.
+    '''
+    def iter_range(self, firstPosition, lastPosition):
+        firstPosition = max(firstPosition, 1)
+        lastPosition = min(lastPosition, self.header['count'])
+        index = bisect.bisect_left(self.shardEnds, firstPosition)
+        while ((firstPosition <= lastPosition) and (index < len(self.manifest)) and (self.get_shard_start(index) <= lastPosition)):
+            offset = self.get_shard_start(index) - 1
+            for address in self.get_shard(index).iter_range(firstPosition - offset, lastPosition - offset):
+                address.position += offset
+                yield address
+            index += 1
+
+
+    '''
+    get_record_id_at() returns the record id in the whole address book of the address at a position, or None if the position does not exist.
+    '''
+    def get_record_id_at(self, position):
+        location = self.locate_position(position)
+        if (not location):
+            return None
+        index, shardPosition = location
+        return ShardedAddressStore.encode_record_id(self.manifest[index][0], self.get_shard(index).get_record_id_at(shardPosition))
+
+
+    '''
+    get_record_position() returns the position in the whole address book of the address with a record id, or None if its shard no longer holds it.
+    Only the shard in the record id is opened.
+    '''
+    def get_record_position(self, recordId):
+        shardId, shardRecordId = ShardedAddressStore.decode_record_id(recordId)
+        index = self.shardIndexes.get(shardId)
+        if (index is None):
+            return None
+        shardPosition = self.get_shard(index).get_record_position(shardRecordId)
+        return (self.get_shard_start(index) - 1 + shardPosition) if (shardPosition is not None) else None
+
+
+    '''
+    insert_address() inserts an Address object into the shard that holds its position, the same as a batch of one address.
+    It returns the new record id.
+    '''
+    def insert_address(self, address):
+        logging.debug("Beginning function execution with address = %s.", address)
+        self.insert_addresses([address])
+        return self.get_record_id_at(address.position)
+
+
+    '''
+    insert_addresses() inserts a batch of Address objects into the shards that hold their positions, with one batch insert into each shard, and updates the counts in the manifest once.
+    An address inside a shard goes into that shard, and an address where one shard ends and the next begins goes into the earlier shard if its section is the earlier shard's last section, or into the later shard if its section is the later shard's first section.
+    Otherwise it goes into a new shard between the two, along with the addresses after it in the batch at the same position and with the same section.
+    The batch keeps its order at each boundary, so once an address went into a new shard or the later shard, the addresses after it at the same position never go into an earlier one.
+    Any shard that grows beyond MAX_SHARD_SIZE is split afterwards.
+    '''
+    def insert_addresses(self, addresses):
+        logging.debug("Beginning function execution with %s addresses.", len(addresses))
+        if (not addresses):
+            return
+        positions = [address.position for address in addresses]
+        groups = {} # The addresses going into each shard, by ('shard', index in the manifest) or ('new', number of the new shard)
+        newShards = [] # The index in the manifest that each new shard goes in front of, in the order they were created
+        boundary = None
+        for address in addresses:
+            index = bisect.bisect_left(self.shardEnds, address.position)
+            if ((index < len(self.manifest)) and (address.position > self.get_shard_start(index))):
+                groups.setdefault(('shard', index), []).append(address)
+                continue
+            if (address.position != boundary):
+                boundary, stage, newKey, newSection = address.position, 'before', None, None
+            if ((stage == 'before') and (index > 0) and (address.section == self.get_section_at(address.position - 1))):
+                key = ('shard', index - 1)
+            elif ((stage != 'after') and (index < len(self.manifest)) and (address.section == self.get_section_at(address.position))):
+                stage, key = 'after', ('shard', index)
+            elif (stage == 'after'):
+                key = ('shard', index)
+            elif ((stage == 'new') and (address.section == newSection)):
+                key = newKey
+            else:
+                logging.debug("Since the address starts section %s between two shards, putting it in a new shard.", address.section)
+                stage, newKey, newSection = 'new', ('new', len(newShards)), address.section
+                newShards.append(index)
+                key = newKey
+            groups.setdefault(key, []).append(address)
+        added = [0] * len(self.manifest)
+        newShardIds = {}
+        for key, group in groups.items():
+            if (key[0] == 'shard'):
+                offset = self.get_shard_start(key[1]) - 1
+                for address in group:
+                    address.position -= offset
+                self.get_shard(key[1]).insert_addresses(group)
+                added[key[1]] += len(group)
+            else:
+                newShardIds[key[1]] = self.allocate_shard()
+                for address in group:
+                    address.position = 1 # The shard is empty, so every address is inserted in the order given
+                self.open_shard(newShardIds[key[1]]).insert_addresses(group)
+        for order, address in enumerate(addresses):
+            address.position = positions[order] + order # Every address before it in the batch was inserted at or before its position
+        manifest = []
+        for index in range(len(self.manifest) + 1):
+            for number, newIndex in enumerate(newShards):
+                if (newIndex == index):
+                    manifest.append([newShardIds[number], len(groups[('new', number)])])
+            if (index < len(self.manifest)):
+                manifest.append([self.manifest[index][0], self.manifest[index][1] + added[index]])
+        self.set_manifest(manifest)
+        self.update_metadata_for_insert(addresses)
+        for index in reversed(range(len(self.manifest))):
+            if (self.manifest[index][1] > ShardedAddressStore.MAX_SHARD_SIZE):
+                self.split_shard(index)
+
+
+    '''
+    split_shard() moves the addresses after the section boundary nearest the middle of the shard at an index of the manifest into a new shard right after it.
+    A shard that holds only one section is not split, so a section is never spread across shards by a split.
+    The positions in the whole address book do not change, but the moved addresses get new record ids.
+    '''
+    def split_shard(self, index):
+        shard = self.get_shard(index)
+        count = self.manifest[index][1]
+        boundaries = shard.get_section_run_ends()[:-1]
+        if (not boundaries):
+            logging.debug("Since the shard holds only one section, not splitting it.")
+            return
+        splitAfter = min(boundaries, key = lambda boundary: abs(boundary - (count // 2)))
+        logging.info("Splitting shard %s of %s addresses after position %s.", self.manifest[index][0], count, splitAfter)
+        addresses = list(shard.iter_range(splitAfter + 1, count))
+        for position in range(count, splitAfter, -1):
+            shard.remove_address(position)
+        shardId = self.allocate_shard()
+        for address in addresses:
+            address.position = 1
+        self.open_shard(shardId).insert_addresses(addresses)
+        self.manifest[index][1] = splitAfter
+        self.manifest.insert(index + 1, [shardId, len(addresses)])
+        self.set_manifest(self.manifest)
+
+
+    '''
+    remove_address() deletes the address at a position from the shard that holds it, and lowers the shard's count in the manifest.
+    A shard that becomes empty is dropped from the manifest and kept as a spare.
+    '''
+    def remove_address(self, position):
+        logging.debug("Beginning function execution with position = %s.", position)
+        location = self.locate_position(position)
+        if (not location):
+            logging.info("Since the position does not exist, returning None.")
+            return None
+        index, shardPosition = location
+        address = self.get_shard(index).remove_address(shardPosition)
+        address.position = position
+        self.manifest[index][1] -= 1
+        if (not self.manifest[index][1]):
+            logging.debug("Since the shard is now empty, dropping it from the manifest.")
+            self.header['spareShards'].append(self.manifest.pop(index)[0])
+        self.set_manifest(self.manifest)
+        self.update_metadata_for_remove(position)
+        return address
+
+
+    '''
+    move_address() moves an address within its shard if its final position is in the same shard, which only rewrites that shard.
+    Otherwise it is removed from its shard and inserted at its final position like a new address, so it gets a new record id.
+    '''
+    def move_address(self, fromPosition, address):
+        logging.debug("Beginning function execution with fromPosition = %s, address = %s.", fromPosition, address)
+        location = self.locate_position(fromPosition)
+        if (not location):
+            logging.info("Since the position does not exist, returning None.")
+            return None
+        index, shardPosition = location
+        offset = self.get_shard_start(index) - 1
+        if ((address.position > self.shardEnds[index]) or (address.position <= offset)):
+            logging.debug("Since the address moves to another shard, removing it and inserting it at its new position.")
+            oldAddress = self.remove_address(fromPosition)
+            self.insert_addresses([address])
+            return oldAddress
+        address.position -= offset
+        oldAddress = self.get_shard(index).move_address(shardPosition, address)
+        address.position += offset
+        oldAddress.position = fromPosition
+        self.update_metadata_for_move(fromPosition, address)
+        return oldAddress
+
+
+    '''
+    move_range() moves the block within its shard if the block and the target are in the same shard.
+    Otherwise the block is removed and inserted again after the target, which only touches the block's addresses, each once, and gives them new record ids.
+    '''
+    def move_range(self, startPosition, endPosition, targetPosition):
+        logging.debug("Beginning function execution with startPosition = %s, endPosition = %s, targetPosition = %s.", startPosition, endPosition, targetPosition)
+        firstPosition, lastPosition = min(startPosition, targetPosition + 1), max(endPosition, targetPosition)
+        index = bisect.bisect_left(self.shardEnds, firstPosition)
+        if (lastPosition <= self.shardEnds[index]):
+            runs = self.moved_section_runs(startPosition, endPosition, targetPosition)
+            offset = self.get_shard_start(index) - 1
+            self.get_shard(index).move_range(startPosition - offset, endPosition - offset, targetPosition - offset)
+            self.update_metadata_for_reorder(firstPosition, lastPosition, runs)
+            return
+        logging.debug("Since the block moves to another shard, removing it and inserting it after the target.")
+        block = list(self.iter_range(startPosition, endPosition))
+        for position in range(endPosition, startPosition - 1, -1):
+            self.remove_address(position)
+        if (targetPosition > endPosition):
+            targetPosition -= len(block)
+        for address in block:
+            address.position = targetPosition + 1
+        self.insert_addresses(block)
+
+
+    '''
+    reorder() reorders the run within its shard if the whole run is in one shard.
+    Otherwise the run is removed and inserted again in its new order, which gives its addresses new record ids.
+    '''
+    def reorder(self, firstPosition, oldPositions):
+        logging.debug("Beginning function execution with firstPosition = %s, %s positions.", firstPosition, len(oldPositions))
+        lastPosition = firstPosition + len(oldPositions) - 1
+        index = bisect.bisect_left(self.shardEnds, firstPosition)
+        if (lastPosition <= self.shardEnds[index]):
+            runs = self.reordered_section_runs(firstPosition, oldPositions)
+            offset = self.get_shard_start(index) - 1
+            self.get_shard(index).reorder(firstPosition - offset, [position - offset for position in oldPositions])
+            self.update_metadata_for_reorder(firstPosition, lastPosition, runs)
+            return
+        logging.debug("Since the run spans more than one shard, removing it and inserting it again in its new order.")
+        addresses = list(self.iter_range(firstPosition, lastPosition))
+        for position in range(lastPosition, firstPosition - 1, -1):
+            self.remove_address(position)
+        reordered = [addresses[position - firstPosition] for position in oldPositions]
+        for address in reordered:
+            address.position = firstPosition
+        self.insert_addresses(reordered)
+
+
+    '''
+    index_bucket_key() returns the key of the bucket of the main file that holds a cross-shard index or trigram entry.
+    '''
+    def index_bucket_key(self, entry):
+        return 'index:' + str(zlib.crc32(entry.encode('utf-8')) % ShardedAddressStore.INDEX_BUCKETS)
+
+
+    '''
+    get_index_entry() returns the list of values listed under a cross-shard index entry, which are shard ids, or words for a trigram entry.
+    '''
+    def get_index_entry(self, entry):
+        return self.addressBook.get(self.index_bucket_key(entry), {}).get(entry, [])
+
+
+    '''
+    change_index_entries() adds values to, or removes them from, the cross-shard index and trigram entries.
+    It takes a dictionary for indexEntries, which maps each entry to the list of values to add or remove, so each bucket is read and written only once, and a bool for add.
+    An entry that no longer lists any values is removed from its bucket, and a bucket is deleted once it holds no entries.
+    It returns the list of the entries that had no values before they were added to, or that no longer list any values after they were removed from.
+    '''
+    def change_index_entries(self, indexEntries, add):
+        buckets = {}
+        for entry, values in indexEntries.items():
+            buckets.setdefault(self.index_bucket_key(entry), {})[entry] = values
+        changedEntries = []
+        for key, bucketEntries in buckets.items():
+            bucket = self.addressBook.get(key, {})
+            for entry, values in bucketEntries.items():
+                listed = bucket.get(entry, [])
+                if (add):
+                    if (not listed):
+                        changedEntries.append(entry)
+                    bucket[entry] = listed + [value for value in values if value not in listed]
+                    continue
+                remaining = [value for value in listed if value not in values]
+                if (remaining):
+                    bucket[entry] = remaining
+                elif (entry in bucket):
+                    del bucket[entry]
+                    changedEntries.append(entry)
+            if (bucket):
+                self.addressBook[key] = bucket
+            elif (key in self.addressBook):
+                del self.addressBook[key]
+        return changedEntries
+
+
+    '''
+    add_shard_to_entries() lists a shard under the cross-shard index entries that it has just started using.
+    It takes an int for shardId and a list of strings for entries.
+    Any word that no shard had before is added to the entries of its trigrams.
+    '''
+    def add_shard_to_entries(self, shardId, entries):
+        newEntries = self.change_index_entries({entry: [shardId] for entry in entries}, True)
+        newWords = [entry[len('word:'):] for entry in newEntries if entry.startswith('word:')]
+        if (newWords):
+            logging.debug("Adding the trigrams of the new words %s.", newWords)
+            self.change_index_entries(ShelveAddressStore.trigram_entries(newWords), True)
+
+
+    '''
+    remove_shard_from_entries() takes a shard off the cross-shard index entries that it no longer uses.
+    It takes an int for shardId and a list of strings for entries.
+    Any word that no shard has anymore is removed from the entries of its trigrams.
+    '''
+    def remove_shard_from_entries(self, shardId, entries):
+        oldEntries = self.change_index_entries({entry: [shardId] for entry in entries}, False)
+        oldWords = [entry[len('word:'):] for entry in oldEntries if entry.startswith('word:')]
+        if (oldWords):
+            logging.debug("Removing the trigrams of the words %s, which no shard has anymore.", oldWords)
+            self.change_index_entries(ShelveAddressStore.trigram_entries(oldWords), False)
+
+
+    '''
+    find_records() looks up the shards that have every entry searched for in the cross-shard index, and then looks in the indexes of only those shards, in route order, so the addresses found are already sorted by position.
+    '''
+    def find_records(self, street = None, addressNumber = None, unit = None, name = None):
+        logging.debug("Beginning function execution with street = %s, addressNumber = %s, unit = %s, name = %s.", street, addressNumber, unit, name)
+        shardIds = None
+        for entry in ShelveAddressStore.query_entries(street, addressNumber, unit, name):
+            entryShardIds = set(self.get_index_entry(entry))
+            shardIds = entryShardIds if (shardIds is None) else (shardIds & entryShardIds)
+        if (not shardIds):
+            return []
+        addresses = []
+        for index, (shardId, count) in enumerate(self.manifest):
+            if (shardId not in shardIds):
+                continue
+            offset = self.get_shard_start(index) - 1
+            for address in self.get_shard(index).find_records(street, addressNumber, unit, name):
+                address.position += offset
+                addresses.append(address)
+        return addresses
+
+
+    '''
+    count_shared_trigrams() counts the words of the trigram entries in the main file, without opening any shard.
+    '''
+    def count_shared_trigrams(self, trigrams):
+        counts = {}
+        for trigram in trigrams:
+            for word in self.get_index_entry('trigram:' + trigram):
+                counts[word] = counts.get(word, 0) + 1
+        return counts
+
+
+    '''
+    get_word_record_ids() returns the list of record ids of the addresses whose names or street contain a word, from only the shards that the cross-shard index lists for the word.
+    '''
+    def get_word_record_ids(self, word):
+        recordIds = []
+        for shardId in self.get_index_entry('word:' + word):
+            index = self.shardIndexes.get(shardId)
+            if (index is not None):
+                recordIds.extend(ShardedAddressStore.encode_record_id(shardId, recordId) for recordId in self.get_shard(index).get_word_record_ids(word))
+        return recordIds
+
+
+    '''
+    get_records_by_ids() groups the record ids by shard, and reads each group from its shard at once.
+    '''
+    def get_records_by_ids(self, recordIds):
+        shardRecordIds = {}
+        for recordId in recordIds:
+            shardId, shardRecordId = ShardedAddressStore.decode_record_id(recordId)
+            shardRecordIds.setdefault(shardId, []).append(shardRecordId)
+        addresses = {}
+        for shardId, recordIdsInShard in shardRecordIds.items():
+            index = self.shardIndexes.get(shardId)
+            if (index is None):
+                continue
+            offset = self.get_shard_start(index) - 1
+            for shardRecordId, address in self.get_shard(index).get_records_by_ids(recordIdsInShard).items():
+                address.position += offset
+                addresses[ShardedAddressStore.encode_record_id(shardId, shardRecordId)] = address
+        return addresses
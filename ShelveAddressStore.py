@@ -0,0 +1,973 @@
+'''
+    ShelveAddressStore is the default storage engine, which stores the address book in a shelve file.
+
+    Storage layout of the address book:
+    Each address is stored under a stable record id (a numeric string key) that never changes when addresses are inserted, deleted, or moved.
+    The route order is kept separately in an order index, which is a list of chunks ('chunk:<id>'), each holding the record ids of a run of consecutive positions.
+    The 'directory' key holds the [chunkId, count] pair of every chunk in route order, so a position can be found by walking the counts instead of reading any records.
+    Inserting or deleting an address rewrites only the address's record, the one chunk that holds it, and the directory, no matter how many addresses come after it.
+    The 'header' key holds the layout version, the counters used to hand out new record and chunk ids, and the metadata of the address book: the number of addresses, the last position, the last section, and the section runs.
+    The header and directory are kept in memory while the store is open and are written once when the operation ends, so looking up the last position or last section never touches the file.
+    Each record is stored as the compact bytes of Address.to_record() instead of a pickled Address object, so it is written to the underlying dbm file directly, bypassing shelve's pickling.
+    Records pickled by older versions are still read, and are only replaced with compact records when they are written again.
+    Secondary indexes map a street ('street:<street>'), an address number, street, and unit ('number:<addressNumber>|<street>|<unit>'), and each resident name ('name:<name>') to the list of record ids with that value, so addresses can be found without reading every record.
+    For fuzzy search, each word of the names and street ('word:<word>') is also mapped to the list of record ids with that word, and each trigram ('trigram:<trigram>') is mapped to the list of words that have it.
+    A word is added to its trigrams when the first address with it is created, and removed when the last address with it is deleted.
+    The index entries are spread by a checksum across INDEX_BUCKETS keys ('index:<bucket>'), since every key in the file makes opening it slower and deleting a key rewrites the file's whole key list.
+    An entry that lists more than POSTING_CHUNK_SIZE record ids, such as a common street or word, is split into posting chunks ('postings:<id>') that each hold the sorted record ids of a range of record ids, and its bucket then only holds the [firstRecordId, postingId] pair of each chunk, so adding or removing a record id rewrites one chunk instead of every record id listed under the entry.
+    Locators ('locators:<recordId // LOCATOR_BUCKET_SIZE>') map each record id to the chunk that holds it, grouped into buckets so that the file does not need a key for every address.
+    A record's position is found from its locator by reading only that one chunk, and since record ids never change, inserting, deleting, or moving other addresses never touches the secondary indexes.
+    The dbm file is always opened with dbm.dumb, whatever dbm backends this Python has, since other backends such as dbm.gnu lock the file against every other process that opens it, while the FileLock lets several processes read it at once, and the Journal relies on how dbm.dumb keeps its key list.
+    An address book that was written with another backend is refused with a ValueError instead of being opened as a new, empty dbm.dumb file next to it.
+    Older address books used the position number as the key, so they are converted the first time they are opened by keeping each old key as the address's record id and building the order index from them.
+    Every key an operation changes is saved in a Journal as one record appended to '<fileName>.journal' with a single fsync, instead of being written to the dbm file, so an operation is never half saved if the program stops part way through it.
+    A checkpoint writes the journal's changes into the dbm file at once and empties the journal, which rewrites the dbm file's whole key list, so it is kept off the path of the operations themselves.
+    Once the journal grows past CHECKPOINT_SIZE bytes, needs_checkpoint() tells a long-running process to checkpoint it while it is idle, such as between requests, and an operation only checkpoints it itself if it grows past MAX_JOURNAL_SIZE bytes because the process was never idle.
+'''
+
+
+# shelve is the module that allows the program to store the address data in a permanent database location
+import shelve
+import dbm
+import dbm.dumb
+import pickle
+import zlib
+import bisect
+import logging
+
+from AddressStore import AddressStore
+from Address import Address
+from Journal import Journal
+from Metrics import Metrics
+
+class ShelveAddressStore(AddressStore):
+    LAYOUT_VERSION = 6 # Version of the storage layout described above
+    INDEXED_LAYOUT_VERSION = 5 # First layout version that has the current set of secondary indexes, which are rebuilt for older address books
+    CHUNK_SIZE = 256 # Maximum number of record ids in one chunk of the order index before the chunk is split in half
+    LOCATOR_BUCKET_SIZE = 256 # Number of consecutive record ids whose locators are stored under the same key
+    INDEX_BUCKETS = 1024 # Number of keys that the secondary index entries are spread across
+    POSTING_CHUNK_SIZE = 256 # Maximum number of record ids that a secondary index entry lists in its bucket, or in one of its posting chunks, before they are split into half-full posting chunks
+    CHECKPOINT_SIZE = 256 * 1024 # Number of bytes the journal can grow to before needs_checkpoint() asks for it to be checkpointed while the process is idle
+    MAX_JOURNAL_SIZE = 4 * 1024 * 1024 # Number of bytes the journal can grow to before the operation that crosses it checkpoints it, which is about 500 creates or deletes in an address book of 100,000 addresses
+
+    def __init__(self, fileName, keepOpen = False, cacheSize = 1024, lockTimeout = 10.0):
+        super().__init__(fileName, keepOpen, cacheSize, lockTimeout)
+        self.addressBook = None
+        self.journal = None
+        self.directory = None
+
+
+    '''
+    open() opens the address book file, replays its journal, and loads the header and directory into memory.
+    If the address book has not been set up with the current storage layout yet, it sets it up, converting any addresses stored in the older layout.
+    If the address book was written before the header held its metadata, the metadata is rebuilt from a scan of the order index.
+    If it was written before the secondary indexes existed, they are built from a scan of every record.
+    Since setting up or converting the address book writes to it, the lock is converted to an exclusive lock first, and the file is opened again in case another process set it up in between.
+    '''
+    def open(self):
+        logging.debug("Opening the address book %s.", self.fileName)
+        self.open_shelf()
+        if ((self.lock.mode != 'exclusive') and self.needs_setup()):
+            logging.info("Since the address book needs to be set up or converted, taking the lock exclusively.")
+            self.addressBook.close()
+            self.lock.acquire(True)
+            self.open_shelf()
+        self.isOpen = True
+        if ('header' not in self.addressBook):
+            self.initialize_layout()
+            return
+        self.header = self.addressBook['header']
+        self.directory = self.addressBook['directory']
+        if (self.header['layoutVersion'] < ShelveAddressStore.INDEXED_LAYOUT_VERSION):
+            self.build_indexes()
+        if (self.header['layoutVersion'] < ShelveAddressStore.LAYOUT_VERSION):
+            self.rebuild_metadata()
+
+
+    '''
+    open_shelf() opens the dbm file and its journal, and wraps them in a shelf so that every key is read and written through the journal.
+    '''
+    def open_shelf(self):
+        self.journal = Journal(self.fileName + '.journal', ShelveAddressStore.open_dbm(self.fileName))
+        self.addressBook = shelve.Shelf(self.journal)
+
+
+    '''
+    open_dbm() is a static method that opens a dbm file with dbm.dumb, creating it if it does not exist.
+    It takes a string for fileName, and raises a ValueError if the file was written with another dbm backend.
+    '''
+    @staticmethod
+    def open_dbm(fileName):
+        backend = dbm.whichdb(fileName)
+        if (backend and (backend != 'dbm.dumb')):
+            raise ValueError(f"{fileName} was written with {backend}, but the address book is only ever opened with dbm.dumb.")
+        return dbm.dumb.open(fileName, 'c')
+
+
+    '''
+    needs_setup() returns True if the open address book has not been set up with the current storage layout yet.
+    '''
+    def needs_setup(self):
+        return (('header' not in self.addressBook) or (self.addressBook['header']['layoutVersion'] < ShelveAddressStore.LAYOUT_VERSION))
+
+
+    '''
+    sync() writes the header and directory, if they were changed, and saves every key changed by the operation to the journal as one record.
+    If the lock is held exclusively and the journal has grown past MAX_JOURNAL_SIZE, the journal's changes are then written into the dbm file.
+    '''
+    def sync(self):
+        if (not self.isOpen):
+            return
+        self.write_metadata()
+        self.addressBook.sync()
+        if ((self.lock.mode == 'exclusive') and (self.journal.get_size() >= ShelveAddressStore.MAX_JOURNAL_SIZE)):
+            logging.info("Since the journal has grown past %s bytes without being checkpointed while idle, checkpointing it now.", ShelveAddressStore.MAX_JOURNAL_SIZE)
+            self.journal.checkpoint()
+
+
+    '''
+    write_metadata() writes the header and directory to the shelf as part of the operation in progress, if they were changed.
+    '''
+    def write_metadata(self):
+        if (self.metadataChanged):
+            self.addressBook['header'] = self.header
+            self.addressBook['directory'] = self.directory
+            self.metadataChanged = False
+
+
+    '''
+    checkpoint() saves the operation in progress, writes every change in the journal into the dbm file, and empties the journal.
+    '''
+    def checkpoint(self):
+        logging.debug("Beginning function execution.")
+        self.sync()
+        return self.journal.checkpoint()
+
+
+    '''
+    get_journal_size() returns the number of bytes in the journal.
+    '''
+    def get_journal_size(self):
+        return self.journal.get_size()
+
+
+    '''
+    needs_checkpoint() returns True if the journal has grown past CHECKPOINT_SIZE.
+    '''
+    def needs_checkpoint(self):
+        return (self.journal.get_size() >= ShelveAddressStore.CHECKPOINT_SIZE)
+
+
+    '''
+    abort() throws away the keys changed by the operation in progress and closes the address book, so the header and directory are loaded again from the journal the next time it is opened.
+    '''
+    def abort(self):
+        if (not self.isOpen):
+            return
+        self.journal.discard()
+        self.metadataChanged = False
+        self.close()
+
+
+    '''
+    close() syncs and closes the address book file.
+    '''
+    def close(self):
+        if (not self.isOpen):
+            return
+        logging.debug("Closing the address book %s.", self.fileName)
+        self.sync()
+        self.addressBook.close()
+        self.addressBook = None
+        self.journal = None
+        self.isOpen = False
+        self.header = None
+        self.directory = None
+        self.sectionBounds = None
+        self.sectionRunEnds = None
+        self.recordCache.clear()
+        self.depth = 0
+
+
+    '''
+    initialize_layout() sets up the header, directory, and order index in the open address book.
+    Any addresses stored in the older layout, where the key was the position number, keep their key as their record id, so converting them only writes the order index and never moves an address.
+    The chunks are only filled halfway so that inserts after the conversion don't immediately need to split them.
+    '''
+    def initialize_layout(self):
+        logging.debug("Beginning function execution.")
+        legacyRecordIds = sorted(int(key) for key in self.addressBook.keys() if key.isdigit())
+        logging.info("Setting up the storage layout, converting %s addresses from the older layout.", len(legacyRecordIds))
+        self.directory = []
+        for start in range(0, len(legacyRecordIds), ShelveAddressStore.CHUNK_SIZE // 2):
+            chunk = legacyRecordIds[start:(start + (ShelveAddressStore.CHUNK_SIZE // 2))]
+            self.addressBook['chunk:' + str(len(self.directory) + 1)] = chunk
+            self.directory.append([len(self.directory) + 1, len(chunk)])
+        self.header = {
+            'layoutVersion': ShelveAddressStore.LAYOUT_VERSION,
+            'nextRecordId':  (max(legacyRecordIds) + 1) if legacyRecordIds else 1,
+            'nextChunkId':   len(self.directory) + 1,
+            'nextPostingId': 1,
+        }
+        self.build_indexes()
+        self.rebuild_metadata()
+
+
+    '''
+    build_indexes() builds the secondary indexes and locators of every address in the order index with one scan of the records.
+    This is used when an address book is set up or upgraded from a layout that did not have them.
+    '''
+    def build_indexes(self):
+        logging.debug("Beginning function execution.")
+        indexEntries = {}
+        locators = {}
+        for chunkId, count in self.directory:
+            for recordId in self.addressBook['chunk:' + str(chunkId)]:
+                locators[recordId] = chunkId
+                for entry in ShelveAddressStore.index_entries(self.read_record(recordId)):
+                    indexEntries.setdefault(entry, []).append(recordId)
+        logging.info("Built %s secondary index entries for %s addresses.", len(indexEntries), len(locators))
+        buckets = {}
+        for entry, recordIds in indexEntries.items():
+            if (len(recordIds) > ShelveAddressStore.POSTING_CHUNK_SIZE):
+                recordIds = {'postings': self.write_postings(sorted(recordIds))}
+            buckets.setdefault(self.index_bucket_key(entry), {})[entry] = recordIds
+        for key, bucket in buckets.items():
+            self.addressBook[key] = bucket
+        self.index_entries_added(list(indexEntries))
+        self.set_locators(locators)
+
+
+    '''
+    index_entries() is a static method that returns the list of secondary index entries that an Address object is listed under.
+    '''
+    @staticmethod
+    def index_entries(address):
+        entries = [
+            'street:' + address.street,
+            'number:' + f"{address.addressNumber}|{address.street}|{address.unit or ''}",
+        ]
+        entries.extend('name:' + name for name in dict.fromkeys(address.names)) # A name listed twice on one address is only indexed once
+        entries.extend('word:' + word for word in AddressStore.address_words(address))
+        return entries
+
+
+    '''
+    index_bucket_key() returns the key of the bucket that holds a secondary index entry.
+    A checksum of the entry is used instead of hash(), since hash() of a string changes every time Python is started.
+    The number of buckets is read from the store's class, so a subclass for smaller address books can spread its entries across fewer keys.
+    '''
+    def index_bucket_key(self, entry):
+        return 'index:' + str(zlib.crc32(entry.encode('utf-8')) % self.INDEX_BUCKETS)
+
+
+    '''
+    get_index_entry() returns the list of record ids listed under a secondary index entry, which is empty if no address is listed under it.
+    An entry that was split into posting chunks is put back together from its chunks.
+    '''
+    def get_index_entry(self, entry):
+        values = self.addressBook.get(self.index_bucket_key(entry), {}).get(entry, [])
+        if (isinstance(values, dict)):
+            return [recordId for firstRecordId, postingId in values['postings'] for recordId in self.addressBook['postings:' + str(postingId)]]
+        return values
+
+
+    '''
+    add_to_indexes() adds values to the secondary indexes.
+    It takes a dictionary for indexEntries, which maps each index entry to the list of values (record ids, or words for trigram entries) to add to it, so each bucket is read and written only once.
+    An entry that grows beyond POSTING_CHUNK_SIZE record ids is split into posting chunks, and the record ids added to an entry that already was are only written to the chunks that cover them, so the bucket is only written if a chunk was added.
+    The trigram entries list words instead of record ids, and are always kept in their bucket, since they only change when a word is first used or no longer used.
+    The entries that had no values before are passed to index_entries_added() once they are written.
+    '''
+    def add_to_indexes(self, indexEntries):
+        buckets = {}
+        for entry, values in indexEntries.items():
+            buckets.setdefault(self.index_bucket_key(entry), {})[entry] = values
+        newEntries = []
+        for key, bucketEntries in buckets.items():
+            bucket = self.addressBook.get(key, {})
+            bucketChanged = False
+            for entry, values in bucketEntries.items():
+                if (entry not in bucket):
+                    newEntries.append(entry)
+                listed = bucket.get(entry, [])
+                if (isinstance(listed, dict)):
+                    if (self.add_to_postings(listed['postings'], values)):
+                        bucketChanged = True
+                    continue
+                listed = listed + values
+                if ((len(listed) > ShelveAddressStore.POSTING_CHUNK_SIZE) and not entry.startswith('trigram:')):
+                    logging.debug("Since the entry %s lists more than %s record ids, splitting it into posting chunks.", entry, ShelveAddressStore.POSTING_CHUNK_SIZE)
+                    listed = {'postings': self.write_postings(sorted(listed))}
+                bucket[entry] = listed
+                bucketChanged = True
+            if (bucketChanged):
+                self.addressBook[key] = bucket
+        if (newEntries):
+            self.index_entries_added(newEntries)
+
+
+    '''
+    remove_from_indexes() removes values from the secondary indexes.
+    It takes a dictionary for indexEntries, which maps each index entry to the list of values to remove from it.
+    The record ids removed from an entry that was split into posting chunks are only removed from the chunks that cover them, so the bucket is only written if a chunk became empty, and an entry left with a single chunk lists its record ids in its bucket again.
+    An entry that no longer lists any values is removed from its bucket, and a bucket is only deleted once it holds no entries.
+    The entries that no longer list any values are passed to index_entries_removed() once they are removed.
+    '''
+    def remove_from_indexes(self, indexEntries):
+        buckets = {}
+        for entry, values in indexEntries.items():
+            buckets.setdefault(self.index_bucket_key(entry), {})[entry] = values
+        oldEntries = []
+        for key, bucketEntries in buckets.items():
+            bucket = self.addressBook.get(key, {})
+            bucketChanged = False
+            for entry, values in bucketEntries.items():
+                listed = bucket.get(entry, [])
+                if (isinstance(listed, dict)):
+                    if (not self.remove_from_postings(listed['postings'], values)):
+                        continue
+                    remaining = listed if (len(listed['postings']) > 1) else self.inline_postings(listed['postings'])
+                else:
+                    remaining = [value for value in listed if value not in values]
+                bucketChanged = True
+                if (remaining):
+                    bucket[entry] = remaining
+                else:
+                    bucket.pop(entry, None)
+                    oldEntries.append(entry)
+            if (not bucketChanged):
+                continue
+            if (bucket):
+                self.addressBook[key] = bucket
+            elif (key in self.addressBook):
+                del self.addressBook[key]
+        if (oldEntries):
+            self.index_entries_removed(oldEntries)
+
+
+    '''
+    index_entries_added() is called with the list of secondary index entries that had no values before an addition, and adds every new word among them to the entries of its trigrams.
+    '''
+    def index_entries_added(self, entries):
+        newWords = [entry[len('word:'):] for entry in entries if entry.startswith('word:')]
+        if (newWords):
+            logging.debug("Adding the trigrams of the new words %s.", newWords)
+            self.add_to_indexes(ShelveAddressStore.trigram_entries(newWords))
+
+
+    '''
+    index_entries_removed() is called with the list of secondary index entries that no longer list any values after a removal, and removes every word among them, which no longer has any addresses, from the entries of its trigrams.
+    '''
+    def index_entries_removed(self, entries):
+        oldWords = [entry[len('word:'):] for entry in entries if entry.startswith('word:')]
+        if (oldWords):
+            logging.debug("Removing the trigrams of the words %s, which no longer have any addresses.", oldWords)
+            self.remove_from_indexes(ShelveAddressStore.trigram_entries(oldWords))
+
+
+    '''
+    write_postings() writes a sorted list of record ids as new half-full posting chunks, and returns the list of the [firstRecordId, postingId] pair of each chunk.
+    '''
+    def write_postings(self, recordIds):
+        postings = []
+        for start in range(0, len(recordIds), ShelveAddressStore.POSTING_CHUNK_SIZE // 2):
+            chunk = recordIds[start:(start + (ShelveAddressStore.POSTING_CHUNK_SIZE // 2))]
+            postingId = self.header.get('nextPostingId', 1) # Address books written before posting chunks existed have no counter yet
+            self.header['nextPostingId'] = postingId + 1
+            self.addressBook['postings:' + str(postingId)] = chunk
+            postings.append([chunk[0], postingId])
+        self.metadataChanged = True
+        return postings
+
+
+    '''
+    add_to_postings() adds record ids to an entry that was split into posting chunks.
+    It takes the entry's list of [firstRecordId, postingId] pairs for postings, which is changed in place, and a list of ints for recordIds.
+    Each record id goes into the last chunk whose first record id is not above it, so a new address, which always has the highest record id, is added to the last chunk.
+    A chunk that grows beyond POSTING_CHUNK_SIZE is split into half-full chunks.
+    It returns True if any chunk was added to postings.
+    '''
+    def add_to_postings(self, postings, recordIds):
+        firstRecordIds = [firstRecordId for firstRecordId, postingId in postings]
+        groups = {}
+        for recordId in recordIds:
+            groups.setdefault(max(bisect.bisect_right(firstRecordIds, recordId) - 1, 0), []).append(recordId)
+        split = False
+        for index in sorted(groups, reverse = True): # Chunks are handled from the last to the first, so splitting one does not move the ones still to be handled
+            postingKey = 'postings:' + str(postings[index][1])
+            chunk = sorted(self.addressBook[postingKey] + groups[index])
+            if (len(chunk) > ShelveAddressStore.POSTING_CHUNK_SIZE):
+                logging.debug("Since the posting chunk has grown beyond %s record ids, splitting it into half-full chunks.", ShelveAddressStore.POSTING_CHUNK_SIZE)
+                postings[(index + 1):(index + 1)] = self.write_postings(chunk[(ShelveAddressStore.POSTING_CHUNK_SIZE // 2):])
+                chunk = chunk[:(ShelveAddressStore.POSTING_CHUNK_SIZE // 2)]
+                split = True
+            self.addressBook[postingKey] = chunk
+        return split
+
+
+    '''
+    remove_from_postings() removes record ids from an entry that was split into posting chunks.
+    It takes the entry's list of [firstRecordId, postingId] pairs for postings, which is changed in place, and a list of ints for recordIds.
+    A chunk that becomes empty is deleted and taken out of postings.
+    It returns True if any chunk was taken out of postings.
+    '''
+    def remove_from_postings(self, postings, recordIds):
+        firstRecordIds = [firstRecordId for firstRecordId, postingId in postings]
+        groups = {}
+        for recordId in recordIds:
+            groups.setdefault(max(bisect.bisect_right(firstRecordIds, recordId) - 1, 0), set()).add(recordId)
+        emptied = []
+        for index, removed in groups.items():
+            postingKey = 'postings:' + str(postings[index][1])
+            chunk = [recordId for recordId in self.addressBook[postingKey] if (recordId not in removed)]
+            if (chunk):
+                self.addressBook[postingKey] = chunk
+            else:
+                del self.addressBook[postingKey]
+                emptied.append(index)
+        for index in sorted(emptied, reverse = True):
+            del postings[index]
+        return bool(emptied)
+
+
+    '''
+    inline_postings() returns the record ids in an entry's remaining posting chunks and deletes the chunks, so that the entry can list them in its bucket again.
+    It takes the entry's list of [firstRecordId, postingId] pairs for postings.
+    '''
+    def inline_postings(self, postings):
+        recordIds = []
+        for firstRecordId, postingId in postings:
+            recordIds.extend(self.addressBook['postings:' + str(postingId)])
+            del self.addressBook['postings:' + str(postingId)]
+        return recordIds
+
+
+    '''
+    trigram_entries() is a static method that returns a dictionary that maps the trigram entry of every trigram of the given words to the list of those words that have it.
+    It takes a list of strings for words.
+    '''
+    @staticmethod
+    def trigram_entries(words):
+        entries = {}
+        for word in words:
+            for trigram in AddressStore.trigrams(word):
+                entries.setdefault('trigram:' + trigram, []).append(word)
+        return entries
+
+
+    '''
+    set_locators() records which chunk of the order index holds each of the given record ids.
+    It takes a dictionary for locators, which maps each record id to its chunk id, or to None to remove the record id's locator.
+    Each bucket of locators is read and written only once.
+    '''
+    def set_locators(self, locators):
+        buckets = {}
+        for recordId, chunkId in locators.items():
+            buckets.setdefault(recordId // ShelveAddressStore.LOCATOR_BUCKET_SIZE, {})[recordId] = chunkId
+        for bucketId, bucketLocators in buckets.items():
+            key = 'locators:' + str(bucketId)
+            bucket = self.addressBook.get(key, {})
+            for recordId, chunkId in bucketLocators.items():
+                if (chunkId is None):
+                    bucket.pop(recordId, None)
+                else:
+                    bucket[recordId] = chunkId
+            self.addressBook[key] = bucket
+
+
+    '''
+    locate_record_ids() finds the positions of a set of record ids from their locators, reading each chunk that holds any of them only once.
+    It takes a set of ints for recordIds.
+    It returns a dictionary that maps each record id to its position.
+    '''
+    def locate_record_ids(self, recordIds):
+        chunkIds = {}
+        for recordId in recordIds:
+            bucket = self.addressBook.get('locators:' + str(recordId // ShelveAddressStore.LOCATOR_BUCKET_SIZE), {})
+            if (recordId in bucket):
+                chunkIds.setdefault(bucket[recordId], set()).add(recordId)
+        positions = {}
+        chunkStart = 1
+        for chunkId, count in self.directory:
+            if (chunkId in chunkIds):
+                for offset, recordId in enumerate(self.addressBook['chunk:' + str(chunkId)]):
+                    if (recordId in chunkIds[chunkId]):
+                        positions[recordId] = chunkStart + offset
+            chunkStart += count
+        return positions
+
+
+    '''
+    query_entries() is a static method that returns the list of secondary index entries that an address must be listed under to match every given value of a search.
+    An address number is only matched together with the street and unit, so the street alone is only looked up without one.
+    '''
+    @staticmethod
+    def query_entries(street = None, addressNumber = None, unit = None, name = None):
+        entries = []
+        if (addressNumber is not None):
+            entries.append('number:' + f"{addressNumber}|{street}|{unit or ''}")
+        elif (street is not None):
+            entries.append('street:' + street)
+        if (name is not None):
+            entries.append('name:' + name)
+        return entries
+
+
+    '''
+    find_records() returns a list of the Address objects that match every given value, sorted by position, with their position properties set.
+    The record ids are looked up in the secondary indexes, and only the matching records and the chunks that hold them are read.
+    '''
+    def find_records(self, street = None, addressNumber = None, unit = None, name = None):
+        logging.debug("Beginning function execution with street = %s, addressNumber = %s, unit = %s, name = %s.", street, addressNumber, unit, name)
+        recordIds = None
+        for entry in ShelveAddressStore.query_entries(street, addressNumber, unit, name):
+            entryRecordIds = set(self.get_index_entry(entry))
+            recordIds = entryRecordIds if (recordIds is None) else (recordIds & entryRecordIds)
+        if (not recordIds):
+            return []
+        return sorted(self.get_records_by_ids(recordIds).values(), key = lambda address: address.position)
+
+
+    '''
+    count_shared_trigrams() returns a dictionary of every indexed word that has any of the given trigrams, mapped to the number of the trigrams it has.
+    '''
+    def count_shared_trigrams(self, trigrams):
+        counts = {}
+        for trigram in trigrams:
+            for word in self.get_index_entry('trigram:' + trigram):
+                counts[word] = counts.get(word, 0) + 1
+        return counts
+
+
+    '''
+    get_word_record_ids() returns the list of record ids of the addresses whose names or street contain a word.
+    '''
+    def get_word_record_ids(self, word):
+        return self.get_index_entry('word:' + word)
+
+
+    '''
+    get_records_by_ids() returns a dictionary that maps each of the given record ids to its Address object, with its position property set.
+    Only the records and the chunks that hold them are read.
+    '''
+    def get_records_by_ids(self, recordIds):
+        addresses = {}
+        for recordId, position in self.locate_record_ids(set(recordIds)).items():
+            addresses[recordId] = self.read_record(recordId)
+            addresses[recordId].position = position
+        return addresses
+
+
+    '''
+    rebuild_metadata() recalculates the metadata in the header by scanning the order index and the section of every address.
+    This is the fallback for address books that were written before the header held its metadata, and it also upgrades the header to the current layout version.
+    '''
+    def rebuild_metadata(self):
+        logging.debug("Beginning function execution.")
+        self.header['count'] = sum(count for chunkId, count in self.directory)
+        self.header['lastPosition'] = self.header['count'] or None
+        self.set_section_runs(AddressStore.build_section_runs(address.section for address in self.iter_records()))
+        self.header['layoutVersion'] = ShelveAddressStore.LAYOUT_VERSION
+        logging.info("Rebuilt the address book metadata: %s", self.header)
+        self.metadataChanged = True
+
+
+    '''
+    locate_position() finds where a position is stored in the order index.
+    It takes an int for position.
+    It returns a tuple of the index of the chunk in the directory and the offset of the position within that chunk.
+    If the position does not exist, it returns None.
+    '''
+    def locate_position(self, position):
+        if (position < 1):
+            return None
+        offset = position - 1
+        for index, (chunkId, count) in enumerate(self.directory):
+            if (offset < count):
+                return (index, offset)
+            offset -= count
+        return None
+
+
+    '''
+    read_record_at() reads the Address object stored at a position, with its position property set to that position.
+    It takes an int for position.
+    If no address exists at the position, it returns None.
+    '''
+    def read_record_at(self, position):
+        location = self.locate_position(position)
+        if (not location):
+            return None
+        index, offset = location
+        address = self.read_record(self.addressBook['chunk:' + str(self.directory[index][0])][offset])
+        address.position = position
+        return address
+
+
+    '''
+    iter_records() is a generator that yields every Address object in position order, with its position property set.
+    Each chunk of the order index is read only once.
+    '''
+    def iter_records(self):
+        position = 0
+        for chunkId, count in self.directory:
+            for recordId in self.addressBook['chunk:' + str(chunkId)]:
+                position += 1
+                address = self.read_record(recordId)
+                address.position = position
+                yield address
+
+
+    '''
+    read_record() returns the Address object stored under a record id, with its position property set to None.
+    It takes an int for recordId.
+    Compact records are decoded with Address.from_record(), and records pickled by older versions are unpickled.
+    '''
+    def read_record(self, recordId):
+        record = self.addressBook.dict[str(recordId).encode(self.addressBook.keyencoding)]
+        if (Metrics.enabled):
+            Metrics.count('recordsRead')
+            Metrics.count('recordBytesRead', len(record))
+        if (record[0] == Address.RECORD_VERSION):
+            return Address.from_record(record)
+        address = pickle.loads(record)
+        address.position = None
+        return address
+
+
+    '''
+    write_record() stores an Address object under a record id as a compact record.
+    It takes an int for recordId and an Address object for address.
+    '''
+    def write_record(self, recordId, address):
+        record = address.to_record()
+        if (Metrics.enabled):
+            Metrics.count('recordsWritten')
+            Metrics.count('recordBytesWritten', len(record))
+        self.addressBook.dict[str(recordId).encode(self.addressBook.keyencoding)] = record
+
+
+    '''
+    iter_range() is a generator that yields every Address object from a first position to a last position, in position order, with its position property set.
+    It starts at the chunk that holds the first position and stops after the last position, so only the chunks and records in the range are read.
+    '''
+    def iter_range(self, firstPosition, lastPosition):
+        firstPosition = max(firstPosition, 1)
+        lastPosition = min(lastPosition, self.header['count'])
+        if (firstPosition > lastPosition):
+            return
+        index, offset = self.locate_position(firstPosition)
+        position = firstPosition
+        for chunkId, count in self.directory[index:]:
+            for recordId in self.addressBook['chunk:' + str(chunkId)][offset:]:
+                if (position > lastPosition):
+                    return
+                address = self.read_record(recordId)
+                address.position = position
+                yield address
+                position += 1
+            offset = 0
+
+
+    '''
+    get_record_id_at() returns the record id of the address at a position from the order index, or None if the position does not exist.
+    '''
+    def get_record_id_at(self, position):
+        location = self.locate_position(position)
+        if (not location):
+            return None
+        index, offset = location
+        return self.addressBook['chunk:' + str(self.directory[index][0])][offset]
+
+
+    '''
+    get_record_position() returns the current position of the address with a record id from its locator, or None if the address no longer exists.
+    '''
+    def get_record_position(self, recordId):
+        return self.locate_record_ids({recordId}).get(recordId)
+
+
+    '''
+    insert_address() stores an Address object as a new record and inserts its record id into the order index at its position property, without rewriting any other address.
+    It takes an Address object for address, whose position must be between 1 and 1 after the last position.
+    It updates the header and returns the new record id.
+    '''
+    def insert_address(self, address):
+        logging.debug("Beginning function execution with address = %s.", address)
+        recordId = self.header['nextRecordId']
+        self.header['nextRecordId'] += 1
+        self.write_record(recordId, address)
+        self.insert_record_id(address.position, recordId)
+        self.add_to_indexes({entry: [recordId] for entry in ShelveAddressStore.index_entries(address)})
+        self.update_metadata_for_insert([address])
+        self.metadataChanged = True
+        return recordId
+
+
+    '''
+    insert_addresses() stores a batch of Address objects as new records and merges them into the order index in one pass.
+    It takes a list of Address objects for addresses, sorted by their position property, where each position is where the address goes in the address book as it was before the batch (between 1 and 1 after the last position).
+    Addresses with the same position are inserted in the order they were given, before the address that was at that position.
+    Each chunk that receives addresses is read and written only once, and it is split into half-full chunks if it grows beyond CHUNK_SIZE.
+    Each address's position property is set to its final position, and the header is updated once at the end.
+    '''
+    def insert_addresses(self, addresses):
+        logging.debug("Beginning function execution with %s addresses.", len(addresses))
+        if (not addresses):
+            return
+        recordIds = []
+        indexEntries = {}
+        locators = {}
+        for address in addresses:
+            recordIds.append(self.header['nextRecordId'])
+            self.write_record(self.header['nextRecordId'], address)
+            for entry in ShelveAddressStore.index_entries(address):
+                indexEntries.setdefault(entry, []).append(self.header['nextRecordId'])
+            self.header['nextRecordId'] += 1
+        oldDirectory = self.directory if self.directory else [[None, 0]] # An empty address book is treated as one empty chunk that everything is appended to
+        self.directory = []
+        nextInsert = 0
+        chunkStart = 1
+        for index, (chunkId, count) in enumerate(oldDirectory):
+            isLastChunk = (index == (len(oldDirectory) - 1))
+            chunkEnd = chunkStart + count # Positions in this chunk are chunkStart up to, but not including, chunkEnd
+            if ((nextInsert == len(addresses)) or ((addresses[nextInsert].position >= chunkEnd) and not isLastChunk)):
+                self.directory.append([chunkId, count])
+                chunkStart = chunkEnd
+                continue
+            chunk = self.addressBook['chunk:' + str(chunkId)] if count else []
+            merged = []
+            for offset, recordId in enumerate(chunk):
+                while ((nextInsert < len(addresses)) and (addresses[nextInsert].position == (chunkStart + offset))):
+                    merged.append(recordIds[nextInsert])
+                    nextInsert += 1
+                merged.append(recordId)
+            while ((nextInsert < len(addresses)) and (isLastChunk or (addresses[nextInsert].position < chunkEnd))):
+                merged.append(recordIds[nextInsert])
+                nextInsert += 1
+            if (len(merged) <= ShelveAddressStore.CHUNK_SIZE):
+                pieces = [merged]
+            else:
+                logging.debug("Since the chunk has grown beyond %s record ids, splitting it into half-full chunks.", ShelveAddressStore.CHUNK_SIZE)
+                pieces = [merged[start:(start + (ShelveAddressStore.CHUNK_SIZE // 2))] for start in range(0, len(merged), ShelveAddressStore.CHUNK_SIZE // 2)]
+            for pieceIndex, piece in enumerate(pieces):
+                if ((pieceIndex > 0) or (chunkId is None)):
+                    chunkId = self.header['nextChunkId']
+                    self.header['nextChunkId'] += 1
+                self.addressBook['chunk:' + str(chunkId)] = piece
+                self.directory.append([chunkId, len(piece)])
+                locators.update(dict.fromkeys(piece, chunkId))
+            chunkStart = chunkEnd
+        for order, address in enumerate(addresses):
+            address.position += order # Every address before it in the batch was inserted at or before its position
+        self.add_to_indexes(indexEntries)
+        self.set_locators(locators)
+        self.update_metadata_for_insert(addresses)
+        self.metadataChanged = True
+
+
+    '''
+    remove_address() deletes the record at a position and removes it from the order index, which moves every later address forward one position.
+    It takes an int for position.
+    It updates the header and returns the deleted Address object with its position property set.
+    If no address exists at the position, it returns None.
+    '''
+    def remove_address(self, position):
+        logging.debug("Beginning function execution with position = %s.", position)
+        recordId = self.remove_record_id(position)
+        if (recordId is None):
+            logging.info("Since the position does not exist in the order index, returning None.")
+            return None
+        address = self.read_record(recordId)
+        del self.addressBook[str(recordId)]
+        self.remove_from_indexes({entry: [recordId] for entry in ShelveAddressStore.index_entries(address)})
+        address.position = position
+        self.update_metadata_for_remove(position)
+        self.metadataChanged = True
+        return address
+
+
+    '''
+    move_address() rewrites the record at a position under the same record id and moves its record id in the order index to the new address's position property.
+    Only the secondary index entries that differ between the old and new address are changed, and an address that stays at the same position does not touch the order index.
+    '''
+    def move_address(self, fromPosition, address):
+        logging.debug("Beginning function execution with fromPosition = %s, address = %s.", fromPosition, address)
+        location = self.locate_position(fromPosition)
+        if (not location):
+            logging.info("Since the position does not exist in the order index, returning None.")
+            return None
+        index, offset = location
+        recordId = self.addressBook['chunk:' + str(self.directory[index][0])][offset]
+        oldAddress = self.read_record(recordId)
+        oldAddress.position = fromPosition
+        self.write_record(recordId, address)
+        oldEntries = set(ShelveAddressStore.index_entries(oldAddress))
+        newEntries = set(ShelveAddressStore.index_entries(address))
+        if (oldEntries != newEntries):
+            self.remove_from_indexes({entry: [recordId] for entry in (oldEntries - newEntries)})
+            self.add_to_indexes({entry: [recordId] for entry in (newEntries - oldEntries)})
+        if (address.position != fromPosition):
+            self.move_record_id(fromPosition, address.position)
+        self.update_metadata_for_move(fromPosition, address)
+        return oldAddress
+
+
+    '''
+    move_record_id() moves the record id at a position in the order index to a new position.
+    It takes an int for fromPosition and an int for toPosition, which is the record id's position after the move.
+    If both positions are in the same chunk, the chunk is rewritten once, and otherwise the record id is removed from one chunk and inserted into the other.
+    '''
+    def move_record_id(self, fromPosition, toPosition):
+        logging.debug("Beginning function execution with fromPosition = %s, toPosition = %s.", fromPosition, toPosition)
+        fromIndex, fromOffset = self.locate_position(fromPosition)
+        toIndex, toOffset = self.locate_position(toPosition)
+        if (fromIndex == toIndex):
+            chunkKey = 'chunk:' + str(self.directory[fromIndex][0])
+            chunk = self.addressBook[chunkKey]
+            chunk.insert(toOffset, chunk.pop(fromOffset))
+            self.addressBook[chunkKey] = chunk
+        else:
+            self.insert_record_id(toPosition, self.remove_record_id(fromPosition))
+
+
+    '''
+    move_range() moves the record ids of a block in the order index by rotating the record ids from the block to the target, without reading or writing any record.
+    '''
+    def move_range(self, startPosition, endPosition, targetPosition):
+        logging.debug("Beginning function execution with startPosition = %s, endPosition = %s, targetPosition = %s.", startPosition, endPosition, targetPosition)
+        runs = self.moved_section_runs(startPosition, endPosition, targetPosition)
+        blockLength = endPosition - startPosition + 1
+        if (targetPosition > endPosition):
+            firstPosition, lastPosition = startPosition, targetPosition
+            recordIds = self.get_record_ids(firstPosition, lastPosition)
+            recordIds = recordIds[blockLength:] + recordIds[:blockLength]
+        else:
+            firstPosition, lastPosition = targetPosition + 1, endPosition
+            recordIds = self.get_record_ids(firstPosition, lastPosition)
+            recordIds = recordIds[-blockLength:] + recordIds[:-blockLength]
+        self.write_record_ids(firstPosition, recordIds)
+        self.update_metadata_for_reorder(firstPosition, lastPosition, runs)
+
+
+    '''
+    reorder() puts the record ids of a run of positions in the order index in a new order, without reading or writing any record.
+    '''
+    def reorder(self, firstPosition, oldPositions):
+        logging.debug("Beginning function execution with firstPosition = %s, %s positions.", firstPosition, len(oldPositions))
+        runs = self.reordered_section_runs(firstPosition, oldPositions)
+        lastPosition = firstPosition + len(oldPositions) - 1
+        recordIds = self.get_record_ids(firstPosition, lastPosition)
+        self.write_record_ids(firstPosition, [recordIds[position - firstPosition] for position in oldPositions])
+        self.update_metadata_for_reorder(firstPosition, lastPosition, runs)
+
+
+    '''
+    get_record_ids() returns the list of record ids in the order index from a first position to a last position, reading only the chunks that hold them.
+    It takes an int for firstPosition and an int for lastPosition, which must both exist.
+    '''
+    def get_record_ids(self, firstPosition, lastPosition):
+        index, offset = self.locate_position(firstPosition)
+        length = lastPosition - firstPosition + 1
+        recordIds = []
+        for chunkId, count in self.directory[index:]:
+            recordIds.extend(self.addressBook['chunk:' + str(chunkId)][offset:(offset + length - len(recordIds))])
+            if (len(recordIds) == length):
+                break
+            offset = 0
+        return recordIds
+
+
+    '''
+    write_record_ids() replaces the record ids in the order index from a first position with a list of record ids, keeping every chunk the same size.
+    It takes an int for firstPosition and a list of ints for recordIds, which must be the same record ids that were in those positions, in a new order.
+    Each chunk is written once, and only if its record ids changed, and the locators are only changed for the record ids that moved to a different chunk.
+    '''
+    def write_record_ids(self, firstPosition, recordIds):
+        index, offset = self.locate_position(firstPosition)
+        written = 0
+        locators = {}
+        for chunkId, count in self.directory[index:]:
+            if (written == len(recordIds)):
+                break
+            chunkKey = 'chunk:' + str(chunkId)
+            chunk = self.addressBook[chunkKey]
+            length = min(count - offset, len(recordIds) - written)
+            piece = recordIds[written:(written + length)]
+            if (chunk[offset:(offset + length)] != piece):
+                oldRecordIds = set(chunk[offset:(offset + length)])
+                locators.update((recordId, chunkId) for recordId in piece if (recordId not in oldRecordIds))
+                chunk[offset:(offset + length)] = piece
+                self.addressBook[chunkKey] = chunk
+            written += length
+            offset = 0
+        self.set_locators(locators)
+
+
+    '''
+    insert_record_id() inserts a record id into the order index at a position.
+    It takes an int for position and an int for recordId.
+    The position may be 1 after the last position to append the record id to the end of the order index.
+    If the chunk that receives the record id grows beyond CHUNK_SIZE, it is split in half, so only the chunk and the new chunk are written, along with the locators of the record ids that moved to the new chunk.
+    '''
+    def insert_record_id(self, position, recordId):
+        logging.debug("Beginning function execution with position = %s, recordId = %s.", position, recordId)
+        if (not self.directory):
+            logging.debug("Since the order index is empty, creating its first chunk.")
+            self.directory.append([self.header['nextChunkId'], 0])
+            self.header['nextChunkId'] += 1
+        location = self.locate_position(position)
+        if (location):
+            index, offset = location
+            chunk = self.addressBook['chunk:' + str(self.directory[index][0])]
+        else:
+            logging.debug("Since the position is 1 after the last position, appending to the last chunk.")
+            index = len(self.directory) - 1
+            offset = self.directory[index][1]
+            chunk = self.addressBook['chunk:' + str(self.directory[index][0])] if offset else []
+        chunk.insert(offset, recordId)
+        if (len(chunk) > ShelveAddressStore.CHUNK_SIZE):
+            logging.debug("Since the chunk has grown beyond %s record ids, splitting it in half.", ShelveAddressStore.CHUNK_SIZE)
+            newChunkId = self.header['nextChunkId']
+            self.header['nextChunkId'] += 1
+            half = len(chunk) // 2
+            self.addressBook['chunk:' + str(newChunkId)] = chunk[half:]
+            self.directory.insert(index + 1, [newChunkId, len(chunk) - half])
+            locators = dict.fromkeys(chunk[half:], newChunkId)
+            chunk = chunk[:half]
+        else:
+            locators = {}
+        if (offset < len(chunk)):
+            locators[recordId] = self.directory[index][0]
+        self.set_locators(locators)
+        self.addressBook['chunk:' + str(self.directory[index][0])] = chunk
+        self.directory[index][1] = len(chunk)
+        self.metadataChanged = True
+
+
+    '''
+    remove_record_id() removes the record id at a position from the order index.
+    It takes an int for position.
+    If the chunk that held the record id becomes empty, it is deleted, so at most one chunk is written.
+    It returns the removed record id, or None if the position does not exist.
+    '''
+    def remove_record_id(self, position):
+        logging.debug("Beginning function execution with position = %s.", position)
+        location = self.locate_position(position)
+        if (not location):
+            return None
+        index, offset = location
+        chunkKey = 'chunk:' + str(self.directory[index][0])
+        chunk = self.addressBook[chunkKey]
+        recordId = chunk.pop(offset)
+        self.set_locators({recordId: None})
+        if (chunk):
+            self.addressBook[chunkKey] = chunk
+            self.directory[index][1] = len(chunk)
+        else:
+            logging.debug("Since the chunk is now empty, deleting it.")
+            del self.addressBook[chunkKey]
+            del self.directory[index]
+        self.metadataChanged = True
+        return recordId
@@ -0,0 +1,181 @@
+'''
+    async_controller is an asyncio version of the controller's main functions, so that a network front end can serve many clients from one process without blocking its event loop.
+    Each function runs the matching controller function on a worker thread and returns the same dictionary, where 'success' is True with a 'result', or False with an 'errorType' from the view's errorOutputs.
+    Reads run concurrently on a bounded pool of reader threads, alongside the change being applied, and the file lock keeps them from seeing a change that is half done and lets a waiting change in ahead of new reads.
+    Changes are put on a single queue and applied one at a time, in the order they were made, by one writer task on its own thread, so they never compete with each other for the file lock.
+    Whenever the writer finds the queue empty after a change, it checkpoints the journal on its thread if it has grown large, so the checkpoint does not hold up a change that a client is waiting for.
+    Every worker thread keeps its own handle to the address book open, since a store can only be used by one thread at a time, and the file lock still keeps the readers, the writer, and other processes from seeing a change that is half done.
+    If another process holds the address book for longer than the lock timeout, the errorType is 'ADDRESS_BOOK_BUSY' instead of a TimeoutError being raised.
+    Usage:
+        await async_controller.open_address_book()
+        response = await async_controller.read_single_address(3)
+        await async_controller.close_address_book()
+'''
+
+
+import asyncio
+import logging
+import threading
+import concurrent.futures
+
+import controller
+from Address import Address
+
+DEFAULT_READERS = 4
+MAX_QUEUED_CHANGES = 1000 # Changes waiting for the writer beyond this make the callers wait before queueing theirs
+readExecutor = None # The pool of threads that run reads
+writeExecutor = None # The single thread that runs changes
+writeQueue = None # The asyncio.Queue of changes waiting for the writer task, each a tuple of the controller function, its arguments, and the future for its response
+writerTask = None
+threadStores = [] # The store each worker thread opened, which are closed by close_address_book() once the threads have stopped
+threadStoresLock = threading.Lock()
+
+
+'''
+open_thread_store() opens the address book for the calling worker thread and remembers its store, so that it can be closed when the workers stop.
+It is run by each worker thread when it starts.
+'''
+def open_thread_store():
+    store = Address.open_shared_store()
+    with threadStoresLock:
+        threadStores.append(store)
+
+
+'''
+call_controller() calls a controller function and returns its response, or a failure response with the errorType 'ADDRESS_BOOK_BUSY' if the address book could not be locked within the lock timeout.
+It takes a function for function and a tuple for arguments, and is run on a worker thread.
+'''
+def call_controller(function, arguments):
+    try:
+        return function(*arguments)
+    except TimeoutError as err:
+        logging.warning("Returning failure response since the address book was busy: %s", err)
+        return {
+            'success':   False,
+            'errorType': 'ADDRESS_BOOK_BUSY'
+        }
+
+
+'''
+open_address_book() starts the reader threads, the writer thread, and the writer task, on the running event loop.
+It takes an optional int for readers, which is the number of reads that can run at the same time.
+'''
+async def open_address_book(readers = DEFAULT_READERS):
+    global readExecutor, writeExecutor, writeQueue, writerTask
+    logging.debug("Beginning function execution with readers = %s.", readers)
+    if (writerTask is not None):
+        return
+    readExecutor = concurrent.futures.ThreadPoolExecutor(readers, 'address-book-reader', open_thread_store)
+    writeExecutor = concurrent.futures.ThreadPoolExecutor(1, 'address-book-writer', open_thread_store)
+    writeQueue = asyncio.Queue(MAX_QUEUED_CHANGES)
+    writerTask = asyncio.create_task(apply_changes())
+
+
+'''
+close_address_book() waits for every queued change to be applied, stops the writer task and the worker threads, and closes each thread's handle to the address book.
+'''
+async def close_address_book():
+    global readExecutor, writeExecutor, writeQueue, writerTask
+    logging.debug("Beginning function execution.")
+    if (writerTask is None):
+        return
+    await writeQueue.join()
+    writerTask.cancel()
+    try:
+        await writerTask
+    except asyncio.CancelledError:
+        pass
+    loop = asyncio.get_running_loop()
+    for executor in (readExecutor, writeExecutor):
+        await loop.run_in_executor(None, executor.shutdown)
+    with threadStoresLock:
+        for store in threadStores:
+            store.close()
+        threadStores.clear()
+    readExecutor = writeExecutor = writeQueue = writerTask = None
+
+
+'''
+apply_changes() is the writer task, which takes each change off the queue in turn, runs it on the writer thread, and sets the response on its future.
+A change is applied even if its caller stopped waiting for it, since it was already accepted.
+When no change is left on the queue, the journal is checkpointed if it has grown large.
+'''
+async def apply_changes():
+    loop = asyncio.get_running_loop()
+    while (True):
+        function, arguments, future = await writeQueue.get()
+        try:
+            response = await loop.run_in_executor(writeExecutor, call_controller, function, arguments)
+        except Exception as err:
+            if (not future.done()):
+                future.set_exception(err)
+        else:
+            if (not future.done()):
+                future.set_result(response)
+        finally:
+            writeQueue.task_done()
+        if (writeQueue.empty()):
+            await loop.run_in_executor(writeExecutor, controller.checkpoint_if_needed)
+
+
+'''
+run_read() runs a controller function that only reads the address book on a reader thread, and returns its response.
+It takes the controller function for function, followed by its arguments.
+It raises a RuntimeError if open_address_book() has not been called.
+'''
+async def run_read(function, *arguments):
+    if (readExecutor is None):
+        raise RuntimeError("The address book must be opened with open_address_book() first.")
+    return await asyncio.get_running_loop().run_in_executor(readExecutor, call_controller, function, arguments)
+
+
+'''
+run_change() queues a controller function that changes the address book for the writer task, and returns its response once it has been applied.
+It takes the controller function for function, followed by its arguments.
+It raises a RuntimeError if open_address_book() has not been called.
+'''
+async def run_change(function, *arguments):
+    if (writeQueue is None):
+        raise RuntimeError("The address book must be opened with open_address_book() first.")
+    future = asyncio.get_running_loop().create_future()
+    await writeQueue.put((function, arguments, future))
+    return await future
+
+
+'''
+read_all_addresses() is the asyncio version of controller.read_all_addresses().
+'''
+async def read_all_addresses():
+    return await run_read(controller.read_all_addresses)
+
+
+'''
+read_single_address() is the asyncio version of controller.read_single_address().
+It takes an int for positionToRead.
+'''
+async def read_single_address(positionToRead):
+    return await run_read(controller.read_single_address, positionToRead)
+
+
+'''
+create_address() is the asyncio version of controller.create_address(), which is applied by the writer task.
+It takes a dictionary for addressData.
+'''
+async def create_address(addressData):
+    return await run_change(controller.create_address, addressData)
+
+
+'''
+update_address() is the asyncio version of controller.update_address(), which is applied by the writer task.
+It takes a dictionary for addressData and an int for initialPosition.
+'''
+async def update_address(addressData, initialPosition):
+    return await run_change(controller.update_address, addressData, initialPosition)
+
+
+'''
+delete_address() is the asyncio version of controller.delete_address(), which is applied by the writer task.
+It takes an int for positionToDelete.
+'''
+async def delete_address(positionToDelete):
+    return await run_change(controller.delete_address, positionToDelete)
@@ -0,0 +1,181 @@
+'''
+    This script times building the address book with a batch insert, reading the entire address book, and inserting, moving, and deleting an address at the front of the route, at different address book sizes.
+    Every timing is taken with each storage engine, so the engines can be compared side by side.
+    It also counts how many keys (shelve) or rows (SQLite) each insert, move, and delete writes, and the peak memory it allocates, which should stay the same as the address book grows.
+    The inserts, moves, and deletes are timed both with a new store opened for each operation and with a shared store that stays open between operations.
+    It builds a synthetic address book of each size in a temporary directory, so the real address book is never touched.
+    Usage: python benchmark.py [size ...]   (the default sizes are 1000, 10000, and 100000)
+'''
+
+
+import sys
+import os
+import tempfile
+import time
+import tracemalloc
+import logging
+
+from Address import Address
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+ENGINES = ['shelve', 'sqlite']
+
+
+'''
+CountingMapping wraps the dbm mapping underneath a shelve file and counts the keys written or deleted through it.
+'''
+class CountingMapping:
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+        self.writes = 0
+
+    def __getitem__(self, key):
+        return self.mapping[key]
+
+    def __setitem__(self, key, value):
+        self.writes += 1
+        self.mapping[key] = value
+
+    def __delitem__(self, key):
+        self.writes += 1
+        del self.mapping[key]
+
+    def __contains__(self, key):
+        return key in self.mapping
+
+    def __getattr__(self, name):
+        return getattr(self.mapping, name)
+
+
+'''
+build_address_book() writes a synthetic address book containing the given number of addresses to Address.DB_FILE with a single batch insert.
+It takes an int for size.
+It returns the number of seconds the batch insert took.
+'''
+def build_address_book(size):
+    addresses = []
+    for position in range(1, size + 1):
+        addresses.append(Address(
+            position,
+            'Main St',
+            None,
+            ['Resident ' + str(position)],
+            position,
+            (position // 100) + 1,
+            False,
+            False,
+            False
+        ))
+    start = time.perf_counter()
+    Address.create_batch(addresses)
+    return time.perf_counter() - start
+
+
+'''
+time_read_all() returns the number of seconds it takes to read the entire address book with Address.read().
+'''
+def time_read_all():
+    start = time.perf_counter()
+    addresses = Address.read()
+    elapsed = time.perf_counter() - start
+    assert len(addresses) == len(set(address['position'] for address in addresses))
+    return elapsed
+
+
+'''
+time_create_and_delete_at_front() returns a tuple of the number of seconds it takes to insert an address at position 1, and then to delete it again.
+Both operations move every other address in the address book by one position.
+'''
+def time_create_and_delete_at_front():
+    address = Address(0, 'Front St', None, ['Front'], 1, 1, False, False, False)
+    start = time.perf_counter()
+    address.create()
+    createElapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    Address.delete(1)
+    deleteElapsed = time.perf_counter() - start
+    return (createElapsed, deleteElapsed)
+
+
+'''
+time_move_to_end() returns the number of seconds it takes to move the address at position 1 to the end of the route with update(), which moves every other address forward by one position.
+'''
+def time_move_to_end():
+    lastPosition = Address.get_last_position()
+    address = Address(**Address.read_single(1))
+    address.position = lastPosition
+    address.section = Address.get_last_section()
+    start = time.perf_counter()
+    address.update(1)
+    return time.perf_counter() - start
+
+
+'''
+measure_writes_and_memory() returns a tuple of the number of keys or rows written by an operation and the peak memory in bytes allocated while it runs.
+It takes a function for operation, which is called with no arguments while the shared store is open.
+'''
+def measure_writes_and_memory(operation):
+    store = Address.open_shared_store()
+    if (Address.ENGINE == 'sqlite'):
+        writesBefore = store.connection.total_changes
+    else:
+        store.addressBook.dict = CountingMapping(store.addressBook.dict)
+    tracemalloc.start()
+    operation()
+    store.sync()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if (Address.ENGINE == 'sqlite'):
+        writes = store.connection.total_changes - writesBefore
+    else:
+        writes = store.addressBook.dict.writes
+        store.addressBook.dict = store.addressBook.dict.mapping
+    Address.close_shared_store()
+    return (writes, peak)
+
+
+'''
+measure_operations() prints the number of keys or rows written and the peak memory of inserting an address at the front of the route, deleting the address 3 positions before the end, moving the address at position 1 to the end, updating the address at position 2 without moving it, and moving a block of 60 addresses near the front to after position 1000.
+It takes a string for label, which is added to each line to tell the measurements apart.
+'''
+def measure_operations(label):
+    operations = [
+        ('create at position 1', lambda: Address(0, 'Front St', None, ['Front'], 1, 1, False, False, False).create()),
+        ('delete 3 before the end', lambda: Address.delete(Address.get_last_position() - 3)),
+        ('move position 1 to the end', time_move_to_end),
+        ('update position 2 in place', lambda: Address(**Address.read_single(2)).update(2)),
+        ('move positions 2 to 61 after position 1000', lambda: Address.move_range(2, 61, 1000)),
+    ]
+    for name, operation in operations:
+        writes, peak = measure_writes_and_memory(operation)
+        print(f"{label} {name}: {writes} written, {peak / 1024:.1f} KiB peak memory")
+
+
+'''
+time_operations() prints the timings of creating, moving, and deleting an address at the front of the route.
+It takes a string for label, which is added to each line to tell the timings apart.
+'''
+def time_operations(label):
+    createElapsed, deleteElapsed = time_create_and_delete_at_front()
+    print(f"{label} create at position 1: {createElapsed:.3f}s")
+    print(f"{label} move position 1 to the end: {time_move_to_end():.3f}s")
+    print(f"{label} delete at position 1: {deleteElapsed:.3f}s")
+
+
+if (__name__ == '__main__'):
+    logging.disable(logging.CRITICAL) # Logging every record read would dominate the timings
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        for engine in ENGINES:
+            with tempfile.TemporaryDirectory() as directory:
+                Address.ENGINE = engine
+                Address.DB_FILE = os.path.join(directory, 'address_book.sqlite3' if engine == 'sqlite' else 'address_book.db')
+                label = f"[{engine:<6} {size:>7}]"
+                print(f"{label} batch create: {build_address_book(size):.3f}s")
+                print(f"{label} read all: {time_read_all():.3f}s")
+                time_operations(label)
+                Address.open_shared_store()
+                time_operations(label + ' (shared store)')
+                Address.close_shared_store()
+                measure_operations(label)
@@ -14,8 +14,11 @@ academic integrity.
 
 
 import sys
+import json
 import logging
 
+from Metrics import Metrics
+
 try:
     from Address import Address
     logging.debug('Address.py loaded successfully.')
@@ -25,11 +28,117 @@ except:
     sys.exit(1)
 
 
+'''
+open_address_book() keeps the address book open until close_address_book() is called, so that every following operation reuses the same open handle instead of reopening the file.
+This is meant for long-running processes, such as the interactive view or a server, where many operations happen one after another.
+The handle belongs to the calling thread, so each thread that runs operations opens and closes its own.
+'''
+def open_address_book():
+    logging.debug("Beginning function execution.")
+    Address.open_shared_store()
+
+
+'''
+close_address_book() closes the address book that the calling thread kept open with open_address_book().
+The journal is checkpointed first if it has grown large, since the process has nothing else to do at that point.
+'''
+def close_address_book():
+    logging.debug("Beginning function execution.")
+    checkpoint_if_needed()
+    Address.close_shared_store()
+
+
+'''
+checkpoint_address_book() writes every change saved in the address book's journal into the main address book file and empties the journal.
+Changes are checkpointed by themselves whenever the journal grows large, by checkpoint_if_needed() while the process is idle or at the end of an operation if it never is, so this is only needed to empty the journal, such as before backing up the address book file.
+It returns a dictionary where the value for 'success' is True, and 'result' is the number of bytes the journal held.
+'''
+@Metrics.timed
+def checkpoint_address_book():
+    logging.debug("Beginning function execution.")
+    journalSize = Address.checkpoint()
+    logging.info("Checkpointed %s bytes of the journal - returning success response.", journalSize)
+    return {
+        'success': True,
+        'result':  journalSize
+    }
+
+
+'''
+checkpoint_if_needed() checkpoints the address book's journal if it has grown large, and is meant to be called while the process is idle, such as while the view waits for the user's next choice, so that no operation has to wait for the checkpoint.
+It returns a dictionary where the value for 'success' is True, and 'result' is the number of bytes the journal held, or 0 if it did not need a checkpoint.
+If another process held the address book for longer than the lock timeout, the checkpoint is left for the next time, and the errorType is 'ADDRESS_BOOK_BUSY'.
+'''
+@Metrics.timed
+def checkpoint_if_needed():
+    logging.debug("Beginning function execution.")
+    try:
+        journalSize = Address.checkpoint_if_needed()
+    except TimeoutError as err:
+        logging.warning("Returning failure response since the address book was busy: %s", err)
+        return {
+            'success':   False,
+            'errorType': 'ADDRESS_BOOK_BUSY'
+        }
+    logging.info("Checkpointed %s bytes of the journal - returning success response.", journalSize)
+    return {
+        'success': True,
+        'result':  journalSize
+    }
+
+
+'''
+set_instrumentation() turns the timing of operations and the counting of storage work on if enabled is True, and off if it is False.
+'''
+def set_instrumentation(enabled):
+    logging.debug("Beginning function execution with enabled = %s.", enabled)
+    Metrics.enable(enabled)
+
+
+'''
+read_stats() returns a dictionary where the value for 'success' is always True, and 'result' is a dictionary of the performance statistics of this process.
+'result' has whether the instrumentation is 'enabled', the storage 'counters', the timings of each 'operations', slowest first, and the file lock statistics ('lockStats').
+'''
+def read_stats():
+    logging.debug("Beginning function execution.")
+    stats = Metrics.snapshot()
+    stats['lockStats'] = Address.get_lock_stats()
+    return {
+        'success': True,
+        'result':  stats
+    }
+
+
+'''
+save_stats() writes the performance statistics from read_stats() to a JSON file.
+It takes a string for fileName, and returns a dictionary where 'result' is the statistics written, or where the errorType is 'EXPORT_FAILED' if the file cannot be written.
+'''
+def save_stats(fileName):
+    logging.debug("Beginning function execution with fileName = %s.", fileName)
+    stats = read_stats()['result']
+    try:
+        with open(fileName, 'w', encoding = 'utf-8') as file:
+            json.dump(stats, file, indent = 2)
+            file.write('\n')
+    except OSError as err:
+        logging.warning("Returning failure response since the file %s could not be written: %s", fileName, err)
+        return {
+            'success':   False,
+            'errorType': 'EXPORT_FAILED'
+        }
+    logging.info("Saved the performance statistics to %s - returning success response.", fileName)
+    return {
+        'success': True,
+        'result':  stats
+    }
+
+
 '''
 read_all_addresses() returns a dictionary where the value for 'success' is True if the address book is not empty and False if it is empty.
 The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
 'result' is a list of dictionaries, each containing an address's data, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
 '''
+@Metrics.timed
 def read_all_addresses():
     logging.debug("Beginning function execution.")
     addresses = Address.read()
@@ -47,18 +156,40 @@ def read_all_addresses():
         }
 
 
+'''
+stream_all_addresses() works like read_all_addresses(), except that 'result' is a generator that yields each address's data in position order as it is read, instead of a list of the whole address book.
+This lets the caller print or write each address as soon as it is read, with only one address in memory at a time.
+The generator keeps the address book open and locked until it is finished, so if the caller stops early, it should call the generator's close() method.
+Since no other process can change the address book until then, a caller that waits for the user between addresses should read them a page at a time with read_page() instead.
+'''
+def stream_all_addresses():
+    logging.debug("Beginning function execution.")
+    if (not Address.get_last_position()):
+        logging.info("Since the address book is empty, returning failure response.")
+        return {
+            'success':  False,
+            'errorType': 'ADDRESS_BOOK_EMPTY'
+        }
+    logging.info("Since the address book is not empty, returning success response with the address generator.")
+    return {
+        'success': True,
+        'result':  Address.read_stream()
+    }
+
+
 '''
 read_single_address() returns a dictionary where the value for 'success' is True if the address is found and False if not.
 The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
 'result' is a dictionary containing the address's data, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
 It takes an int for positionToRead which is the position value of the address that will be read from the address book.
 '''
+@Metrics.timed
 def read_single_address(positionToRead):
-    logging.debug(f"Beginning function execution with positionToRead = {positionToRead}.")
+    logging.debug("Beginning function execution with positionToRead = %s.", positionToRead)
     try:
         positionToRead = int(positionToRead)
     except ValueError as err:
-        logging.warning(f"Returning failure response since an error occurred when attempting to convert {positionToRead} to an int: {err}")
+        logging.warning("Returning failure response since an error occurred when attempting to convert %s to an int: %s", positionToRead, err)
         return {
             'success': False,
             'errorType': 'INVALID_INPUT'
@@ -82,10 +213,11 @@ def read_single_address(positionToRead):
 create_address() returns a dictionary where the value for 'success' is True if the address is created successfully and False if not.
 The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
 'result' is a dictionary containing the created address's data, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
-It takes a dictionary containing the address's data for addressData.
+It takes a dictionary containing the address's data for addressData, and an optional AddressStore for store if the creation is part of a larger operation.
 '''
-def create_address(addressData):
-    logging.debug(f"Beginning function execution with addressData = {addressData}.")
+@Metrics.timed
+def create_address(addressData, store = None):
+    logging.debug("Beginning function execution with addressData = %s.", addressData)
     try:
         address = Address(
             addressData['addressNumber'],
@@ -104,7 +236,7 @@ def create_address(addressData):
             'success':     False,
             'errorType':   'MISSING_FIELD'
         }
-    createdAddress = address.create()
+    createdAddress = address.create(store)
     logging.info("The address entry was inserted into the database - returning success response.")
     return {
         'success': True,
@@ -112,14 +244,59 @@ def create_address(addressData):
     }
 
 
+'''
+create_addresses() creates a batch of address entries in a single pass over the address book, which is much faster than calling create_address() once for each address when loading a route.
+It takes a list of dictionaries, each containing an address's data, for addressDataList.
+Each address's data is checked with validate_address_data() first, and each position is the position the address should have after the batch, where addresses with the same position are placed one after another in the order they were given.
+It returns a list with one dictionary for each address, in the same order, where each dictionary is in the same form that create_address() returns.
+'''
+@Metrics.timed
+def create_addresses(addressDataList):
+    logging.debug("Beginning function execution with %s addresses.", len(addressDataList))
+    results = [None] * len(addressDataList)
+    addressesToCreate = []
+    indexesToCreate = []
+    with Address.session(exclusive = True) as store:
+        for index, addressData in enumerate(addressDataList):
+            errorType = validate_address_data(addressData, store, len(addressDataList))
+            if (errorType):
+                logging.info("The address at index %s of the batch failed validation with %s - adding failure response.", index, errorType)
+                results[index] = {
+                    'success':   False,
+                    'errorType': errorType
+                }
+                continue
+            addressesToCreate.append(Address(
+                addressData['addressNumber'],
+                addressData['street'],
+                addressData['unit'],
+                addressData['names'],
+                addressData['position'],
+                addressData['section'],
+                addressData['isBusiness'],
+                addressData['isCBU'],
+                addressData['isVacant']
+            ))
+            indexesToCreate.append(index)
+        createdAddresses = Address.create_batch(addressesToCreate, store)
+    logging.info("%s of the %s address entries were inserted into the database - adding success responses.", len(createdAddresses), len(addressDataList))
+    for index, createdAddress in zip(indexesToCreate, createdAddresses):
+        results[index] = {
+            'success': True,
+            'result':  createdAddress
+        }
+    return results
+
+
 '''
 update_address() returns a dictionary where the value for 'success' is True if the address is updated successfully and False if not.
 The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
 'result' is a dictionary containing the updated address's data, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
-It takes a dictionary containing the address's data for addressData and an int for initialPosition.
+It takes a dictionary containing the address's data for addressData, an int for initialPosition, and an optional AddressStore for store if the update is part of a larger operation.
 '''
-def update_address(addressData, initialPosition):
-    logging.debug(f"Beginning function execution with addressData = {addressData}, initialPosition = {initialPosition}.")
+@Metrics.timed
+def update_address(addressData, initialPosition, store = None):
+    logging.debug("Beginning function execution with addressData = %s, initialPosition = %s.", addressData, initialPosition)
     try:
         address = Address(
             addressData['addressNumber'],
@@ -141,12 +318,12 @@ def update_address(addressData, initialPosition):
     try:
         initialPosition = int(initialPosition)
     except ValueError as err:
-        logging.warning("Returning the failure response since an error occurred when attempting to convert {positionToDelete} to the an int: {err}")
+        logging.warning("Returning the failure response since an error occurred when attempting to convert %s to an int: %s", initialPosition, err)
         return {
             'success': False,
             'errorType': 'INVALID_INPUT'
         }
-    updatedAddress = address.update(initialPosition)
+    updatedAddress = address.update(initialPosition, store)
     logging.info("The address entry was updated in the database - returning success response.")
     return {
         'success': True,
@@ -160,12 +337,13 @@ The other item in the returned dictionary is either 'result' if 'success' is Tru
 'result' is a dictionary containing the deleted address's data, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
 It takes an int for positionToDelete.
 '''
+@Metrics.timed
 def delete_address(positionToDelete):
-    logging.debug(f"Beginning function execution with positionToDelete = {positionToDelete}.")
+    logging.debug("Beginning function execution with positionToDelete = %s.", positionToDelete)
     try:
         positionToDelete = int(positionToDelete)
     except ValueError as err:
-        logging.warning("Returning the failure response since an error occurred when attempting to convert {positionToDelete} to the an int: {err}")
+        logging.warning("Returning the failure response since an error occurred when attempting to convert %s to an int: %s", positionToDelete, err)
         return {
             'success': False,
             'errorType': 'INVALID_INPUT'
@@ -185,19 +363,427 @@ def delete_address(positionToDelete):
         }
 
 
+'''
+create_checked_address() creates an address entry from data that did not come through the view's input prompts, such as a request to the server, after checking it the way the view would.
+It takes a dictionary of the address's data for addressData, and returns a dictionary in the same form as create_address().
+The data is checked with validate_address_data() and validate_section_context_create() and the address is created in one exclusive session, so no other change can come between the checks and the creation.
+'''
+@Metrics.timed
+def create_checked_address(addressData):
+    logging.debug("Beginning function execution with addressData = %s.", addressData)
+    with Address.session(exclusive = True) as store:
+        errorType = validate_address_data(addressData, store)
+        if ((errorType is None) and (not validate_section_context_create(addressData, store))):
+            errorType = 'INVALID_SECTION'
+        if (errorType):
+            logging.info("The address data failed validation with %s - returning failure response.", errorType)
+            return {
+                'success':   False,
+                'errorType': errorType
+            }
+        return create_address(addressData, store)
+
+
+'''
+update_checked_address() updates an address entry from data that did not come through the view's input prompts, such as a request to the server, after checking it the way the view would.
+It takes a dictionary of the address's data for addressData and an int for initialPosition, and returns a dictionary in the same form as update_address().
+Unlike update_address(), it does not create the address if there is none at initialPosition, and returns the errorType 'ADDRESS_NOT_FOUND' instead.
+The data is checked and the address is updated in one exclusive session, so no other change can come between the checks and the update.
+'''
+@Metrics.timed
+def update_checked_address(addressData, initialPosition):
+    logging.debug("Beginning function execution with addressData = %s, initialPosition = %s.", addressData, initialPosition)
+    with Address.session(exclusive = True) as store:
+        if (Address.read_single(initialPosition, store) is None):
+            logging.info("There is no address at position %s - returning failure response.", initialPosition)
+            return {
+                'success':   False,
+                'errorType': 'ADDRESS_NOT_FOUND'
+            }
+        errorType = validate_address_data(addressData, store)
+        if ((errorType is None) and (not validate_section_context_update(addressData, initialPosition, store))):
+            errorType = 'INVALID_SECTION'
+        if (errorType):
+            logging.info("The address data failed validation with %s - returning failure response.", errorType)
+            return {
+                'success':   False,
+                'errorType': errorType
+            }
+        return update_address(addressData, initialPosition, store)
+
+
+'''
+read_generation() returns a dictionary where the value for 'success' is always True, and 'result' is a number that changes every time any process changes the address book, or None if this system cannot keep one.
+It is meant for telling whether the address book changed since it was last read, without reading it again.
+'''
+def read_generation():
+    logging.debug("Beginning function execution.")
+    return {
+        'success': True,
+        'result':  Address.get_generation()
+    }
+
+
+'''
+move_range() returns a dictionary where the value for 'success' is True if the block of addresses is moved successfully and False if not.
+The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
+'result' is a dictionary with the 'firstPosition' and 'lastPosition' of the block after the move, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
+It takes an int for startPosition and an int for endPosition, which are the first and last position of the block, and an int for targetPosition, which is the position of the address the block is moved after, counted before the move, or 0 to move the block to the front.
+Every position must exist and the target must not be inside the block, or the errorType is 'INVALID_INPUT'.
+If the move would split a section into more runs of positions than it has now, the errorType is 'INVALID_SECTION'.
+'''
+@Metrics.timed
+def move_range(startPosition, endPosition, targetPosition):
+    logging.debug("Beginning function execution with startPosition = %s, endPosition = %s, targetPosition = %s.", startPosition, endPosition, targetPosition)
+    if (not all(isinstance(value, int) and not isinstance(value, bool) for value in (startPosition, endPosition, targetPosition))):
+        logging.warning("Returning failure response since a position is not an int.")
+        return {
+            'success':   False,
+            'errorType': 'INVALID_INPUT'
+        }
+    with Address.session(exclusive = True) as store:
+        lastPosition = Address.get_last_position(store)
+        if (not lastPosition):
+            logging.info("Since the address book is empty, returning failure response.")
+            return {
+                'success':   False,
+                'errorType': 'ADDRESS_BOOK_EMPTY'
+            }
+        if ((not (1 <= startPosition <= endPosition <= lastPosition)) or (not (0 <= targetPosition <= lastPosition)) or (startPosition <= targetPosition <= endPosition)):
+            logging.info("Returning failure response since the block or target is outside of the existing positions, or the target is inside the block.")
+            return {
+                'success':   False,
+                'errorType': 'INVALID_INPUT'
+            }
+        if (not validate_section_continuity(Address.get_section_runs(store), Address.get_moved_section_runs(startPosition, endPosition, targetPosition, store))):
+            logging.info("Returning failure response since the move would split a section.")
+            return {
+                'success':   False,
+                'errorType': 'INVALID_SECTION'
+            }
+        firstPosition, lastPosition = Address.move_range(startPosition, endPosition, targetPosition, store)
+    logging.info("The block was moved to positions %s to %s - returning success response.", firstPosition, lastPosition)
+    return {
+        'success': True,
+        'result':  {
+            'firstPosition': firstPosition,
+            'lastPosition':  lastPosition
+        }
+    }
+
+
+'''
+reorder_addresses() returns a dictionary where the value for 'success' is True if the addresses are reordered successfully and False if not.
+The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
+'result' is a dictionary with the 'firstPosition' and 'lastPosition' of the reordered run, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
+It takes a list of ints for positions, which holds every position of a run of consecutive existing positions exactly once, in the new order, so the address at positions[0] moves to the first position of the run, and so on.
+If the positions are not such a run, the errorType is 'INVALID_INPUT', and if the new order would split a section into more runs of positions than it has now, the errorType is 'INVALID_SECTION'.
+'''
+@Metrics.timed
+def reorder_addresses(positions):
+    logging.debug("Beginning function execution with %s positions.", len(positions) if isinstance(positions, list) else positions)
+    if ((not isinstance(positions, list)) or (not positions) or (not all(isinstance(position, int) and not isinstance(position, bool) for position in positions))):
+        logging.warning("Returning failure response since positions is not a non-empty list of ints.")
+        return {
+            'success':   False,
+            'errorType': 'INVALID_INPUT'
+        }
+    with Address.session(exclusive = True) as store:
+        lastPosition = Address.get_last_position(store)
+        if (not lastPosition):
+            logging.info("Since the address book is empty, returning failure response.")
+            return {
+                'success':   False,
+                'errorType': 'ADDRESS_BOOK_EMPTY'
+            }
+        firstPosition = min(positions)
+        if ((firstPosition < 1) or (max(positions) > lastPosition) or (sorted(positions) != list(range(firstPosition, firstPosition + len(positions))))):
+            logging.info("Returning failure response since the positions are not every position of a run of existing positions exactly once.")
+            return {
+                'success':   False,
+                'errorType': 'INVALID_INPUT'
+            }
+        if (not validate_section_continuity(Address.get_section_runs(store), Address.get_reordered_section_runs(positions, store))):
+            logging.info("Returning failure response since the new order would split a section.")
+            return {
+                'success':   False,
+                'errorType': 'INVALID_SECTION'
+            }
+        firstPosition, lastPosition = Address.reorder(positions, store)
+    logging.info("Positions %s to %s were reordered - returning success response.", firstPosition, lastPosition)
+    return {
+        'success': True,
+        'result':  {
+            'firstPosition': firstPosition,
+            'lastPosition':  lastPosition
+        }
+    }
+
+
+'''
+find_addresses() returns a dictionary where the value for 'success' is True if any address matches the given values and False if not.
+The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
+'result' is a list of dictionaries, each containing a matching address's data in position order, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
+It takes an optional string for street, an optional int for addressNumber, an optional string for unit, and an optional string for name, which matches any one of an address's names.
+At least a street or a name must be given, an addressNumber must be given with a street, and a unit must be given with an addressNumber.
+When an addressNumber is given, only the address with exactly that number, street, and unit (or no unit, if unit is not given) matches.
+'''
+@Metrics.timed
+def find_addresses(street = None, addressNumber = None, unit = None, name = None):
+    logging.debug("Beginning function execution with street = %s, addressNumber = %s, unit = %s, name = %s.", street, addressNumber, unit, name)
+    if ((not street and not name) or ((addressNumber is not None) and not street) or (unit and (addressNumber is None))):
+        logging.warning("Returning failure response since the values given do not match any of the indexes.")
+        return {
+            'success':   False,
+            'errorType': 'INVALID_INPUT'
+        }
+    if (addressNumber is not None):
+        try:
+            addressNumber = int(addressNumber)
+        except ValueError as err:
+            logging.warning("Returning failure response since an error occurred when attempting to convert %s to an int: %s", addressNumber, err)
+            return {
+                'success':   False,
+                'errorType': 'INVALID_INPUT'
+            }
+    addresses = Address.find(street or None, addressNumber, unit or None, name or None)
+    if (addresses):
+        logging.info("Since %s addresses matched, returning success response.", len(addresses))
+        return {
+            'success': True,
+            'result':  addresses
+        }
+    else:
+        logging.info("Since no addresses matched, returning failure response.")
+        return {
+            'success':   False,
+            'errorType': 'NO_MATCHES'
+        }
+
+
+'''
+search_addresses() returns a dictionary where the value for 'success' is True if any address's names or street are similar to the search text and False if not.
+The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
+'result' is a list of dictionaries from the best match to the worst, each containing the match's 'score' between 0 and 1 and the 'address' data, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
+It takes a string for text, which may be misspelled, and an optional int for limit, which is the largest number of matches returned.
+'''
+@Metrics.timed
+def search_addresses(text, limit = 10):
+    logging.debug("Beginning function execution with text = %s, limit = %s.", text, limit)
+    if ((not isinstance(text, str)) or (not text.strip()) or (not isinstance(limit, int)) or (limit < 1)):
+        logging.warning("Returning failure response since the search text is empty or the limit is not a positive int.")
+        return {
+            'success':   False,
+            'errorType': 'INVALID_INPUT'
+        }
+    matches = Address.find_similar(text, limit)
+    if (matches):
+        logging.info("Since %s addresses matched, returning success response.", len(matches))
+        return {
+            'success': True,
+            'result':  matches
+        }
+    else:
+        logging.info("Since no addresses matched, returning failure response.")
+        return {
+            'success':   False,
+            'errorType': 'NO_MATCHES'
+        }
+
+
+'''
+read_range() returns a dictionary where the value for 'success' is True if an address is at startPosition and False if not.
+The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
+It takes an int for startPosition and an int for count, and 'result' is a list of the data for at most count addresses starting at startPosition, in position order.
+Only those addresses are read, so a page of a large address book can be shown without reading the rest of it.
+'''
+@Metrics.timed
+def read_range(startPosition, count):
+    logging.debug("Beginning function execution with startPosition = %s, count = %s.", startPosition, count)
+    if ((not isinstance(startPosition, int)) or (not isinstance(count, int)) or (startPosition < 1) or (count < 1)):
+        logging.warning("Returning failure response since startPosition or count is not a positive int.")
+        return {
+            'success':   False,
+            'errorType': 'INVALID_INPUT'
+        }
+    addresses = Address.read_range(startPosition, count)
+    if (addresses):
+        logging.info("Since %s addresses were read, returning success response.", len(addresses))
+        return {
+            'success': True,
+            'result':  addresses
+        }
+    else:
+        logging.info("Since no address is at the start position, returning failure response.")
+        return {
+            'success':   False,
+            'errorType': 'ADDRESS_NOT_FOUND'
+        }
+
+
+'''
+read_page() returns a dictionary where the value for 'success' is True if the page has addresses and False if not.
+The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
+It takes an optional string for cursor, which is the 'nextCursor' of the previous page or None for the first page, and an optional int for pageSize.
+'result' is a dictionary with 'addresses', a list of the data for the addresses on the page, and 'nextCursor', the cursor for the next page or None if this is the last page.
+The next page continues after the last address of this page even if addresses are inserted or deleted in between.
+If the cursor is not valid, the errorType is 'INVALID_INPUT', and if the page is empty, the errorType is 'ADDRESS_BOOK_EMPTY'.
+'''
+@Metrics.timed
+def read_page(cursor = None, pageSize = 20):
+    logging.debug("Beginning function execution with cursor = %s, pageSize = %s.", cursor, pageSize)
+    if ((not isinstance(pageSize, int)) or (pageSize < 1)):
+        logging.warning("Returning failure response since pageSize is not a positive int.")
+        return {
+            'success':   False,
+            'errorType': 'INVALID_INPUT'
+        }
+    try:
+        addresses, nextCursor = Address.read_page(cursor, pageSize)
+    except ValueError as err:
+        logging.warning("Returning failure response since the cursor could not be decoded: %s", err)
+        return {
+            'success':   False,
+            'errorType': 'INVALID_INPUT'
+        }
+    if (addresses):
+        logging.info("Since %s addresses were read, returning success response.", len(addresses))
+        return {
+            'success': True,
+            'result':  {
+                'addresses':  addresses,
+                'nextCursor': nextCursor
+            }
+        }
+    else:
+        logging.info("Since the page is empty, returning failure response.")
+        return {
+            'success':   False,
+            'errorType': 'ADDRESS_BOOK_EMPTY'
+        }
+
+
+'''
+read_section_numbers() returns a dictionary where the value for 'success' is True if the address book is not empty and False if it is empty.
+The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
+'result' is a list of every section number in route order, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
+'''
+@Metrics.timed
+def read_section_numbers():
+    logging.debug("Beginning function execution.")
+    sections = Address.get_sections()
+    if (sections):
+        logging.info("Since the address book is not empty, returning success response.")
+        return {
+            'success': True,
+            'result':  sections
+        }
+    else:
+        logging.info("Since the address book is empty, returning failure response.")
+        return {
+            'success':   False,
+            'errorType': 'ADDRESS_BOOK_EMPTY'
+        }
+
+
+'''
+read_sections() returns a dictionary where the value for 'success' is True if any address is in the given range of sections and False if not.
+The other item in the returned dictionary is either 'result' if 'success' is True, or 'errorType' if 'success' is False.
+'result' is a list of dictionaries, each containing an address's data in position order, and 'errorType' is a key from the errorOutputs dictionary defined in the view file.
+It takes an int for firstSection and an int for lastSection.
+'''
+@Metrics.timed
+def read_sections(firstSection, lastSection):
+    logging.debug("Beginning function execution with firstSection = %s, lastSection = %s.", firstSection, lastSection)
+    try:
+        firstSection = int(firstSection)
+        lastSection = int(lastSection)
+    except ValueError as err:
+        logging.warning("Returning failure response since an error occurred when attempting to convert the sections to ints: %s", err)
+        return {
+            'success':   False,
+            'errorType': 'INVALID_INPUT'
+        }
+    addresses = Address.read_sections(firstSection, lastSection)
+    if (addresses):
+        logging.info("Since addresses were found in the sections, returning success response.")
+        return {
+            'success': True,
+            'result':  addresses
+        }
+    else:
+        logging.info("Since no addresses were found in the sections, returning failure response.")
+        return {
+            'success':   False,
+            'errorType': 'SECTION_NOT_FOUND'
+        }
+
+
+'''
+read_section() works like read_sections() for a single section.
+It takes an int for section.
+'''
+@Metrics.timed
+def read_section(section):
+    logging.debug("Beginning function execution with section = %s.", section)
+    return read_sections(section, section)
+
+
+'''
+validate_address_data() checks a dictionary of an address's data that did not come through the view's input prompts, such as data for create_addresses().
+It receives a dictionary containing the address's data for addressData, an optional AddressStore for store if the check is part of a larger operation, and an optional int for batchSize, which is the number of addresses being created together.
+It checks that every field is present, that each value has the type in fieldTypes, that the simple constraints the view would have checked are met, and that the fieldValidators pass.
+It returns None if the data is valid, and otherwise it returns the errorType that describes the problem.
+'''
+@Metrics.timed
+def validate_address_data(addressData, store = None, batchSize = 1):
+    logging.debug("Beginning function execution with addressData = %s.", addressData)
+    for key, dataType in fieldTypes.items():
+        if (key not in addressData):
+            logging.info("The %s field is missing - returning MISSING_FIELD.", key)
+            return 'MISSING_FIELD'
+        value = addressData[key]
+        if (value is None):
+            if (key in optionalFields):
+                continue
+            logging.info("The required %s field is empty - returning MISSING_FIELD.", key)
+            return 'MISSING_FIELD'
+        if ((not isinstance(value, dataType)) or ((dataType is int) and isinstance(value, bool))):
+            logging.info("The %s field is not of type %s - returning INVALID_INPUT.", key, dataType)
+            return 'INVALID_INPUT'
+        if (((dataType is int) and (value < 1)) or ((dataType in (str, list)) and (len(value) == 0))):
+            logging.info("The %s field is not positive or is empty - returning INVALID_INPUT.", key)
+            return 'INVALID_INPUT'
+        if ((dataType is list) and not all(isinstance(item, str) and (len(item) > 0) for item in value)):
+            logging.info("The %s field contains an item that is not a non-empty string - returning INVALID_INPUT.", key)
+            return 'INVALID_INPUT'
+        validator = fieldValidators[key]
+        if (key in ('position', 'section')):
+            isValid = validator(value, store, batchSize)
+        elif (validator):
+            isValid = validator(value)
+        else:
+            isValid = True
+        if (not isValid):
+            logging.info("The %s field failed its controller validator - returning INVALID_INPUT.", key)
+            return 'INVALID_INPUT'
+    logging.info("The address data was successfully validated - returning None.")
+    return None
+
+
 '''
 names_validator() is the controller's more specific validator function for the names field, which is a list of strings.
 It receives a list of strings for names.
 If the list of names contains more than 10 names, or if any of the names are longer than 30 characters, it returns False, otherwise it returns True.
 '''
 def names_validator(names):
-    logging.debug(f"Beginning function execution with names = {names}.")
+    logging.debug("Beginning function execution with names = %s.", names)
     if (len(names) > 10):
-        logging.info(f"The names array has more than 10 items - returning False.")
+        logging.info("The names array has more than 10 items - returning False.")
         return False
     for item in names:
         if (len(item) > 30):
-            logging.info(f"The name {item} has more than 30 characters - returning False.")
+            logging.info("The name %s has more than 30 characters - returning False.", item)
             return False
     logging.info("The names array's length and length of the individual names was successfully validated - returning True.")
     return True
@@ -205,96 +791,121 @@ def names_validator(names):
 
 '''
 position_validator() is the controller's more specific validator function for the position field, which is an int.
-It receives an int for position.
-If the address book is not empty, then it returns True if position is less than or equal to the position number after the last existing position, False otherwise.
-If the address book is empty, then it returns True if position is equal to 1, False otherwise.
+It receives an int for position, an optional AddressStore for store if the check is part of a larger operation, and an optional int for batchSize, which is the number of addresses being created together.
+If the address book is not empty, then it returns True if position is less than or equal to the last position the address book will have after the creation, False otherwise.
+If the address book is empty, then it returns True if position is at most batchSize (so for a single address, equal to 1), False otherwise.
 '''
-def position_validator(position):
-    logging.debug(f"Beginning function execution with position = {position}.")
-    lastPosition = Address.get_last_position()
+def position_validator(position, store = None, batchSize = 1):
+    logging.debug("Beginning function execution with position = %s, batchSize = %s.", position, batchSize)
+    lastPosition = Address.get_last_position(store)
     if (lastPosition):
-        logging.info(f"The address book is not empty - returning bool of {position} <= ({lastPosition} + 1).")
-        return (position <= (lastPosition + 1))
+        logging.info("The address book is not empty - returning bool of %s <= (%s + %s).", position, lastPosition, batchSize)
+        return (position <= (lastPosition + batchSize))
     else:
-        logging.info(f"The address book is empty - returning bool of {position} == 1.")
-        return (position == 1)
+        logging.info("The address book is empty - returning bool of %s <= %s.", position, batchSize)
+        return (position <= batchSize)
 
 
 '''
 section_validator() is the controller's more specific validator function for the section field, which is an int.
-It receives an int for section.
-If the address book is not empty, then it returns True if section is less than or equal to the section number after the last existing section, False otherwise.
-If the address book is empty, then it returns True if section is equal to 1, False otherwise.
+It receives an int for section, an optional AddressStore for store if the check is part of a larger operation, and an optional int for batchSize, which is the number of addresses being created together.
+If the address book is not empty, then it returns True if section is less than or equal to the last section plus batchSize (so for a single address, the section number after the last existing section), False otherwise.
+If the address book is empty, then it returns True if section is at most batchSize (so for a single address, equal to 1), False otherwise.
 '''
-def section_validator(section):
-    logging.debug(f"Beginning function execution with section = {section}.")
-    lastSection = Address.get_last_section()
+def section_validator(section, store = None, batchSize = 1):
+    logging.debug("Beginning function execution with section = %s, batchSize = %s.", section, batchSize)
+    lastSection = Address.get_last_section(store)
     if (lastSection):
-        logging.info(f"The address book is not empty - returning bool of {section} <= ({lastSection} + 1).")
-        return (section <= (lastSection + 1))
+        logging.info("The address book is not empty - returning bool of %s <= (%s + %s).", section, lastSection, batchSize)
+        return (section <= (lastSection + batchSize))
     else:
-        logging.info(f"The address book is empty - returning bool of {section} == 1.")
-        return (section == 1)
+        logging.info("The address book is empty - returning bool of %s <= %s.", section, batchSize)
+        return (section <= batchSize)
 
 
 '''
 validate_section_context_create() checks if the given section number is within the section numbers of the addresses in the positions before and after the address being created.
 It accounts for the new address being the only address, being the first address, being the last address, and being inserted between 2 existing addresses.
-It receives a dictionary of the address's data, just before it is actually created, for data.
+The sections of the neighboring positions are looked up in the section index, so no address is read.
+It receives a dictionary of the address's data, just before it is actually created, for data, and an optional AddressStore for store if the check is part of a larger operation.
 It returns True if the section number is valid, and False if not.
 '''
-def validate_section_context_create(data):
-    logging.debug(f"Beginning function execution with data = {data}.")
+@Metrics.timed
+def validate_section_context_create(data, store = None):
+    logging.debug("Beginning function execution with data = %s.", data)
     sectionInput = data['section']
-    lastSection = Address.get_last_section()
-    if (not lastSection):
-        logging.info(f"Since address book is empty, we are inserting into the first section - returning bool of {sectionInput} == 1.")
-        return (sectionInput == 1)
-    previousAddress = Address.read_single(data['position'] - 1)
-    nextAddress = Address.read_single(data['position']) # For create, the address that WILL be next is the one in the current position to insert
-    if (not previousAddress):
-        logging.info(f"Since there is no address in the position below our insert, we are inserting into the first section - returning bool of {sectionInput} == 1.")
+    with Address.session(store) as store:
+        lastSection = Address.get_last_section(store)
+        if (not lastSection):
+            logging.info("Since address book is empty, we are inserting into the first section - returning bool of %s == 1.", sectionInput)
+            return (sectionInput == 1)
+        previousSection = Address.get_section_at(data['position'] - 1, store)
+        nextSection = Address.get_section_at(data['position'], store) # For create, the address that WILL be next is the one in the current position to insert
+    if (previousSection is None):
+        logging.info("Since there is no address in the position below our insert, we are inserting into the first section - returning bool of %s == 1.", sectionInput)
         return (sectionInput == 1)
-    if (not nextAddress):
-        logging.info(f"Since we are inserting after the last address, {sectionInput} must be either the last section or 1 after the last section - returning {(sectionInput == lastSection) or (sectionInput == (lastSection + 1))}.")
-        return ((sectionInput == lastSection) or (sectionInput == (lastSection + 1)))
+    if (nextSection is None):
+        isValid = ((sectionInput == lastSection) or (sectionInput == (lastSection + 1)))
+        logging.info("Since we are inserting after the last address, %s must be either the last section or 1 after the last section - returning %s.", sectionInput, isValid)
+        return isValid
     # At this point, we know that address is being inserted between 2 existing addresses (for create)
-    logging.info(f"Since address is being inserted between 2 existing addresses, {sectionInput} must be equal to the section of either the previous address or the next address - returning {(sectionInput == previousAddress['section']) or (sectionInput == nextAddress['section'])}.")
-    return ((sectionInput == previousAddress['section']) or (sectionInput == nextAddress['section']))
+    isValid = ((sectionInput == previousSection) or (sectionInput == nextSection))
+    logging.info("Since address is being inserted between 2 existing addresses, %s must be equal to the section of either the previous address or the next address - returning %s.", sectionInput, isValid)
+    return isValid
 
 
 '''
 validate_section_context_update() checks if the given section number is within the section numbers of the addresses in the positions before and after the position that the address will be in after it is updated.
 It accounts for the updated address being the only address, being the first address, being the last address, and being inserted between 2 existing addresses.
 It also accounts for remaining in the same position, or being moved to a position that is next to its previous position, since its existing pre-update data still exists in the address book.
-It receives a dictionary of the address's data, just before it is actually updated, for data.
+It receives a dictionary of the address's data, just before it is actually updated, for data, an int for initialPosition, and an optional AddressStore for store if the check is part of a larger operation.
 It returns True if the section number is valid, and False if not.
 '''
-def validate_section_context_update(data, initialPosition):
-    logging.debug(f"Beginning function execution with data = {data}, initialPosition = {initialPosition}.")
+@Metrics.timed
+def validate_section_context_update(data, initialPosition, store = None):
+    logging.debug("Beginning function execution with data = %s, initialPosition = %s.", data, initialPosition)
     sectionInput = data['section']
-    lastSection = Address.get_last_section()
-    # Address book is not empty if we are doing an update
-    if (initialPosition == data['position']):
-        logging.debug("The update is leaving the address in the same position - retrieving the addresses in the previous and next positions.")
-        previousAddress = Address.read_single(data['position'] - 1)
-        nextAddress = Address.read_single(data['position'] + 1)
-    elif (initialPosition == (data['position'] - 1)):
-        logging.debug("The update is moving the address to the next position (which will end up leaving it in the same place after shifting) - retrieving the addresses in the previous and next positions.")
-        previousAddress = Address.read_single(data['position'] - 2) # The address that will be before it after the update is the one that is 2 positions behind
-        nextAddress = Address.read_single(data['position']) # The address that will be next is the one that is in the position being inserted into
-    else:
-        logging.debug("The address is being moved to a position where it will not be adjacent to the initial address before the update - retrieving the addresses in the previous and next positions.")
-        previousAddress = Address.read_single(data['position'] - 1) # The address that will be before it is the one that is in the previous position
-        nextAddress = Address.read_single(data['position']) # The address that will be next is the one that is in the current position to insert
-    if (not previousAddress):
-        logging.info(f"Since the address is being moved to the first position, returning the bool of {sectionInput} == 1.")
+    with Address.session(store) as store:
+        lastSection = Address.get_last_section(store)
+        # Address book is not empty if we are doing an update
+        if (initialPosition == data['position']):
+            logging.debug("The update is leaving the address in the same position - looking up the sections of the previous and next positions.")
+            previousSection = Address.get_section_at(data['position'] - 1, store)
+            nextSection = Address.get_section_at(data['position'] + 1, store)
+        elif (initialPosition == (data['position'] - 1)):
+            logging.debug("The update is moving the address to the next position (which will end up leaving it in the same place after shifting) - looking up the sections of the previous and next positions.")
+            previousSection = Address.get_section_at(data['position'] - 2, store) # The address that will be before it after the update is the one that is 2 positions behind
+            nextSection = Address.get_section_at(data['position'], store) # The address that will be next is the one that is in the position being inserted into
+        else:
+            logging.debug("The address is being moved to a position where it will not be adjacent to the initial address before the update - looking up the sections of the previous and next positions.")
+            previousSection = Address.get_section_at(data['position'] - 1, store) # The address that will be before it is the one that is in the previous position
+            nextSection = Address.get_section_at(data['position'], store) # The address that will be next is the one that is in the current position to insert
+    if (previousSection is None):
+        logging.info("Since the address is being moved to the first position, returning the bool of %s == 1.", sectionInput)
         return (sectionInput == 1)
-    if (not nextAddress):
-        logging.info(f"Since the address is being moved to the last position, returning the bool of {sectionInput} == {lastSection}.")
+    if (nextSection is None):
+        logging.info("Since the address is being moved to the last position, returning the bool of %s == %s.", sectionInput, lastSection)
         return (sectionInput == lastSection)
-    logging.info(f"Since the address is being moved to a position between 2 existing addresses, {sectionInput} must be equal to the section of either the previous address or the next address - returning {(sectionInput == previousAddress['section']) or (sectionInput == nextAddress['section'])}.")
-    return ((sectionInput == previousAddress['section']) or (sectionInput == nextAddress['section']))
+    isValid = ((sectionInput == previousSection) or (sectionInput == nextSection))
+    logging.info("Since the address is being moved to a position between 2 existing addresses, %s must be equal to the section of either the previous address or the next address - returning %s.", sectionInput, isValid)
+    return isValid
+
+
+'''
+validate_section_continuity() checks that moving addresses keeps each section together.
+It receives the section index before the move for oldRuns and the section index after the move for newRuns, each a list of [section, count] pairs.
+It returns True if no section is split into more runs of consecutive positions than it had before, and False if not.
+'''
+def validate_section_continuity(oldRuns, newRuns):
+    logging.debug("Beginning function execution with %s runs before and %s runs after.", len(oldRuns), len(newRuns))
+    oldRunCounts = {}
+    for section, count in oldRuns:
+        oldRunCounts[section] = oldRunCounts.get(section, 0) + 1
+    newRunCounts = {}
+    for section, count in newRuns:
+        newRunCounts[section] = newRunCounts.get(section, 0) + 1
+    logging.info("Returning whether every section has at most as many runs as before: %s compared to %s.", newRunCounts, oldRunCounts)
+    return all(runCount <= oldRunCounts.get(section, 0) for section, runCount in newRunCounts.items())
 
 
 '''
@@ -311,4 +922,24 @@ fieldValidators = {
     'isBusiness':       None,
     'isCBU':            None,
     'isVacant':         None,
-}
\ No newline at end of file
+}
+
+
+'''
+fieldTypes is a dictionary that contains the data type of each field in the address book database, for checking data that did not come through the view's input prompts.
+'''
+fieldTypes = {
+    'addressNumber':    int,
+    'street':           str,
+    'unit':             str,
+    'names':            list,
+    'position':         int,
+    'section':          int,
+    'isBusiness':       bool,
+    'isCBU':            bool,
+    'isVacant':         bool,
+}
+
+
+# optionalFields lists the fields that are allowed to be None.
+optionalFields = ['unit']
@@ -0,0 +1,294 @@
+'''
+    This script is a benchmark suite for creating, reading, updating, and deleting addresses through the controller functions, at realistic route sizes.
+    For each size and storage engine, it builds a synthetic route with realistic streets, house numbers, resident and business names, apartment units, and sections, from a fixed random seed so every run builds the same address book.
+    It then times each operation many times with the address book kept open, the way the view keeps it open, and reports the operations per second and the 50th and 99th percentile latency of each one.
+    Creating and deleting are timed at the head, the middle, and the tail of the route, and updating is timed both in place and moved to another position in the same section.
+    It also reports how long building the route took, the size of the address book files afterwards, and the peak resident memory of the process.
+    Each size and engine runs in a new process, so the peak memory of one does not carry over to the next, and everything is written to a temporary directory, so the real address book is never touched.
+    The results can be written to a JSON file, and compared with the JSON file of an earlier run, such as one taken before a change.
+    Usage: python crud_benchmark.py [--repeat count] [--json results.json] [--compare baseline.json] [size ...]   (the defaults are 200 repeats and the sizes 1000, 10000, and 100000)
+'''
+
+
+import sys
+import os
+import json
+import math
+import random
+import tempfile
+import time
+import platform
+import subprocess
+import logging
+import multiprocessing
+
+try:
+    import resource
+except ImportError:
+    resource = None # Peak memory is only reported on systems that have the resource module
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 200
+READ_ALL_REPEAT = 5 # Reading the whole address book takes much longer than any other operation, so it is repeated fewer times
+ENGINES = ['shelve', 'sqlite', 'sharded']
+SEED = 360
+
+STREETS = ['Main St', 'Oak Ave', 'Maple Dr', 'Cedar Ln', 'Pine St', 'Elm St', 'Washington Blvd', 'Lake Rd', 'Hillcrest Ave', 'River Rd', 'Park Pl', 'Church St', 'Mill Rd', 'Sunset Dr', 'Highland Ave', 'Forest Ct']
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Carlos', 'Maria', 'Wei', 'Priya', 'Ahmed', 'Olga']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Nguyen', 'Kim', 'Patel', 'Chen', 'Kowalski', 'O\'Brien']
+BUSINESS_NAMES = ['Corner Market', 'Hair Studio', 'Family Dental', 'Auto Repair', 'Pizza Palace', 'Hardware Store', 'Law Office', 'Flower Shop', 'Coffee House', 'Pharmacy']
+
+
+'''
+generate_route() returns a list of dictionaries, each containing an address's data, for a synthetic route with the given number of stops in route order.
+It takes an int for size and a random.Random for generator.
+The route walks down streets in blocks of even house numbers, with apartment buildings whose units share a house number, businesses, cluster box units, and vacant houses, and starts a new section every 100 to 200 stops.
+'''
+def generate_route(size, generator):
+    route = []
+    section = 1
+    sectionEnd = generator.randint(100, 200)
+    street = generator.choice(STREETS)
+    addressNumber = generator.randrange(100, 1000, 2)
+    while (len(route) < size):
+        if (generator.random() < 0.02):
+            street = generator.choice(STREETS)
+            addressNumber = generator.randrange(100, 1000, 2)
+        addressNumber += 2
+        units = [None]
+        if (generator.random() < 0.05): # An apartment building with 4 units on each floor, numbered 101, 102, and so on, whose units are each a stop
+            units = [f"{(index // 4) + 1}{(index % 4) + 1:02d}" for index in range(generator.randint(4, 24))]
+        isBusiness = (units == [None]) and (generator.random() < 0.06)
+        for unit in units:
+            if (len(route) == size):
+                break
+            if (len(route) == sectionEnd):
+                section += 1
+                sectionEnd += generator.randint(100, 200)
+            isVacant = (not isBusiness) and (generator.random() < 0.03)
+            route.append({
+                'addressNumber': addressNumber,
+                'street':        street,
+                'unit':          unit,
+                'names':         generate_names(generator, isBusiness, isVacant),
+                'position':      len(route) + 1,
+                'section':       section,
+                'isBusiness':    isBusiness,
+                'isCBU':         (unit is not None) and (generator.random() < 0.5),
+                'isVacant':      isVacant,
+            })
+    return route
+
+
+'''
+generate_names() returns a list of resident names for a synthetic address, which is a business name for a business, 'Current Resident' for a vacant address, and one to four people otherwise, often sharing a last name.
+It takes a random.Random for generator, a bool for isBusiness, and a bool for isVacant.
+'''
+def generate_names(generator, isBusiness, isVacant):
+    if (isBusiness):
+        return [generator.choice(LAST_NAMES) + ' ' + generator.choice(BUSINESS_NAMES)]
+    if (isVacant):
+        return ['Current Resident']
+    lastName = generator.choice(LAST_NAMES)
+    names = []
+    for person in range(generator.choice([1, 1, 2, 2, 2, 3, 4])):
+        if (generator.random() < 0.2):
+            lastName = generator.choice(LAST_NAMES)
+        names.append(generator.choice(FIRST_NAMES) + ' ' + lastName)
+    return names
+
+
+'''
+summarize() returns a dictionary of the 'count', 'opsPerSecond', 'p50Ms', and 'p99Ms' of a list of latencies in seconds.
+The percentiles use the nearest rank, so they are always one of the measured latencies.
+'''
+def summarize(latencies):
+    ordered = sorted(latencies)
+    def percentile(percent):
+        return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)] * 1000
+    return {
+        'count':        len(ordered),
+        'opsPerSecond': len(ordered) / sum(ordered),
+        'p50Ms':        percentile(50),
+        'p99Ms':        percentile(99),
+    }
+
+
+'''
+time_calls() returns the list of latencies in seconds of calling a controller operation once for each set of arguments, checking that every call succeeds.
+It takes a function for operation and a list of tuples for argumentsList.
+'''
+def time_calls(operation, argumentsList):
+    latencies = []
+    for arguments in argumentsList:
+        start = time.perf_counter()
+        response = operation(*arguments)
+        latencies.append(time.perf_counter() - start)
+        assert response['success'], f"{operation.__name__}{arguments} failed with {response.get('errorType')}"
+    return latencies
+
+
+'''
+run_case() builds a synthetic route of one size with one storage engine in a temporary directory, times every operation through the controller, and returns the results as a dictionary.
+It takes a string for engine, an int for size, and an int for repeat, which is how many times each operation is timed.
+It also takes an optional int for logLevel and an optional bool for logQueued, which log to a file in the temporary directory the way log_config does, and logging is turned off if logLevel is None.
+It runs in its own process, so the peak memory it reports belongs to this case alone.
+'''
+def run_case(engine, size, repeat, logLevel = None, logQueued = True):
+    from Address import Address
+    import controller
+    import log_config
+    generator = random.Random(f"{SEED}:{size}")
+    with tempfile.TemporaryDirectory() as directory:
+        if (logLevel is None):
+            logging.disable(logging.CRITICAL) # Logging every operation would dominate the timings
+        else:
+            log_config.configure_logging(logLevel, os.path.join(directory, log_config.LOG_FILE), logQueued, force = True)
+        Address.ENGINE = engine
+        Address.DB_FILE = os.path.join(directory, 'address_book.sqlite3' if engine == 'sqlite' else 'address_book.db')
+        route = generate_route(size, generator)
+        controller.open_address_book()
+        start = time.perf_counter()
+        responses = controller.create_addresses(route)
+        buildSeconds = time.perf_counter() - start
+        assert all(response['success'] for response in responses), "The synthetic route failed validation."
+        del route, responses
+        operations = {}
+        sectionRuns = Address.get_section_runs()
+        middle = size // 2
+        middleSection = Address.read_single(middle)['section']
+        for name, position, section in [('head', 1, 1), ('middle', middle, middleSection), ('tail', size + 1, sectionRuns[-1][0])]:
+            newAddresses = []
+            for number in range(repeat):
+                names = generate_names(generator, False, False)
+                newAddresses.append(({'addressNumber': 2 * number + 1, 'street': 'Benchmark Way', 'unit': None, 'names': names, 'position': position + number if (name == 'tail') else position, 'section': section, 'isBusiness': False, 'isCBU': False, 'isVacant': False},))
+            operations['create (' + name + ')'] = summarize(time_calls(controller.create_address, newAddresses))
+            deletePositions = [((size + repeat - number),) if (name == 'tail') else (position,) for number in range(repeat)]
+            operations['delete (' + name + ')'] = summarize(time_calls(controller.delete_address, deletePositions))
+        readPositions = [(generator.randint(1, size),) for number in range(repeat)]
+        operations['read_single'] = summarize(time_calls(controller.read_single_address, readPositions))
+        operations['read'] = summarize(time_calls(controller.read_all_addresses, [()] * READ_ALL_REPEAT))
+        updates = []
+        for (position,) in readPositions:
+            addressData = Address.read_single(position)
+            addressData['names'] = generate_names(generator, False, False)
+            updates.append((addressData, position))
+        operations['update (in place)'] = summarize(time_calls(controller.update_address, updates))
+        runRanges = []
+        runEnd = 0
+        for section, count in sectionRuns:
+            if (count >= 2):
+                runRanges.append(range(runEnd + 1, runEnd + count + 1))
+            runEnd += count
+        movedLatencies = []
+        for number in range(repeat): # Each address is read just before it is moved, since earlier moves change what is at each position
+            fromPosition, toPosition = generator.sample(generator.choice(runRanges), 2)
+            addressData = Address.read_single(fromPosition)
+            addressData['position'] = toPosition
+            movedLatencies.extend(time_calls(controller.update_address, [(addressData, fromPosition)]))
+        operations['update (moved)'] = summarize(movedLatencies)
+        controller.close_address_book()
+        log_config.stop_logging()
+        fileBytes = sum(os.path.getsize(os.path.join(directory, fileName)) for fileName in os.listdir(directory) if (fileName != log_config.LOG_FILE))
+        logFileName = os.path.join(directory, log_config.LOG_FILE)
+        logBytes = os.path.getsize(logFileName) if os.path.exists(logFileName) else 0
+    peakRssBytes = None
+    if (resource is not None):
+        peakRssBytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if (sys.platform == 'darwin') else 1024) # Linux reports kilobytes and macOS reports bytes
+    return {
+        'engine':       engine,
+        'size':         size,
+        'buildSeconds': buildSeconds,
+        'fileBytes':    fileBytes,
+        'logBytes':     logBytes,
+        'peakRssBytes': peakRssBytes,
+        'operations':   operations,
+    }
+
+
+'''
+describe_commit() returns the short hash of the git commit the benchmark is run from, with '-dirty' added if there are uncommitted changes, or None if it is not run from a git repository.
+'''
+def describe_commit():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd = directory, capture_output = True, text = True, check = True).stdout.strip()
+        changes = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd = directory, capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return (commit + '-dirty') if changes else commit
+
+
+'''
+print_case() prints the results of one size and engine, one line for each operation.
+It takes a dictionary of results from run_case() for case.
+'''
+def print_case(case):
+    label = f"[{case['engine']:<6} {case['size']:>7}]"
+    peakRss = f"{case['peakRssBytes'] / (1024 * 1024):.1f} MiB" if (case['peakRssBytes'] is not None) else 'unknown'
+    print(f"{label} built in {case['buildSeconds']:.3f}s, {case['fileBytes'] / 1024:.1f} KiB on disk, {peakRss} peak memory")
+    for name, summary in case['operations'].items():
+        print(f"{label} {name:<18} {summary['opsPerSecond']:>10.1f} ops/s   p50 {summary['p50Ms']:>8.3f}ms   p99 {summary['p99Ms']:>8.3f}ms")
+
+
+'''
+compare_results() prints how the operations per second and p99 latency of each operation changed from a baseline run to this run, for every size and engine that both runs measured.
+It takes a dictionary of results loaded from a JSON file for baseline and a dictionary of results for results.
+'''
+def compare_results(baseline, results):
+    print(f"Compared with {baseline.get('commit') or 'the baseline'}:")
+    baselineCases = {(case['engine'], case['size']): case for case in baseline['cases']}
+    for case in results['cases']:
+        baselineCase = baselineCases.get((case['engine'], case['size']))
+        if (baselineCase is None):
+            continue
+        label = f"[{case['engine']:<6} {case['size']:>7}]"
+        for name, summary in case['operations'].items():
+            baselineSummary = baselineCase['operations'].get(name)
+            if (baselineSummary is None):
+                continue
+            speedup = summary['opsPerSecond'] / baselineSummary['opsPerSecond']
+            print(f"{label} {name:<18} {speedup:>6.2f}x ops/s   p99 {baselineSummary['p99Ms']:>8.3f}ms -> {summary['p99Ms']:>8.3f}ms")
+
+
+if (__name__ == '__main__'):
+    sizes = []
+    repeat = DEFAULT_REPEAT
+    jsonFileName = None
+    baselineFileName = None
+    arguments = iter(sys.argv[1:])
+    for argument in arguments:
+        if (argument in ('--repeat', '--json', '--compare')):
+            value = next(arguments, None)
+            if (value is None):
+                print(f"{argument} needs a value.")
+                sys.exit(1)
+            if (argument == '--repeat'):
+                repeat = int(value)
+            elif (argument == '--json'):
+                jsonFileName = value
+            else:
+                baselineFileName = value
+        else:
+            sizes.append(int(argument))
+    results = {
+        'commit':   describe_commit(),
+        'python':   platform.python_version(),
+        'platform': platform.platform(),
+        'seed':     SEED,
+        'repeat':   repeat,
+        'cases':    [],
+    }
+    for size in (sizes or DEFAULT_SIZES):
+        for engine in ENGINES:
+            with multiprocessing.get_context('spawn').Pool(1) as pool: # A new process for each case, so its peak memory is its own
+                case = pool.apply(run_case, (engine, size, repeat))
+            print_case(case)
+            results['cases'].append(case)
+    if (jsonFileName):
+        with open(jsonFileName, 'w') as jsonFile:
+            json.dump(results, jsonFile, indent = 4)
+        print(f"Wrote the results to {jsonFileName}.")
+    if (baselineFileName):
+        with open(baselineFileName) as baselineFile:
+            compare_results(json.load(baselineFile), results)
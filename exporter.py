@@ -0,0 +1,84 @@
+'''
+    This script exports the address book to a CSV or JSON lines file, in the same format that importer.py reads.
+    Each address is written to the file as soon as it is read from the address book, so memory use stays the same no matter how large the address book is.
+    Usage: python exporter.py fileName   (a fileName ending in '.csv' is written as CSV, anything else as JSON lines)
+'''
+
+
+import sys
+import csv
+import json
+import logging
+import log_config
+
+# Logging configuration, which matches the view's format but only records warnings by default, since logging every address would slow down large exports
+log_config.configure_logging(logging.WARNING)
+
+import controller
+
+
+'''
+format_csv_value() returns the string that a field's value is written as in a CSV file.
+None is written as an empty string, lists are written as their items separated by '/', and bools are written as 1 or 0.
+'''
+def format_csv_value(value):
+    if (value is None):
+        return ''
+    if (isinstance(value, list)):
+        return '/'.join(str(item) for item in value)
+    if (isinstance(value, bool)):
+        return '1' if value else '0'
+    return str(value)
+
+
+'''
+export_addresses() writes every address in the address book to a CSV or JSON lines file, one address at a time.
+It takes a string for fileName, and the file type is decided by its extension ('.csv' for CSV, anything else for JSON lines).
+It returns a dictionary in the same form as the controller's functions, where 'result' is the number of addresses written.
+If the address book is empty, the errorType is 'ADDRESS_BOOK_EMPTY', and if the file cannot be written, the errorType is 'EXPORT_FAILED'.
+'''
+def export_addresses(fileName):
+    logging.debug("Beginning function execution with fileName = %s.", fileName)
+    addressesRead = controller.stream_all_addresses()
+    if (not addressesRead['success']):
+        logging.info("Since the addresses read was a failure, returning the failure response.")
+        return addressesRead
+    addresses = addressesRead['result']
+    count = 0
+    try:
+        with open(fileName, 'w', newline = '', encoding = 'utf-8') as file:
+            if (fileName.lower().endswith('.csv')):
+                writer = csv.DictWriter(file, fieldnames = list(controller.fieldTypes))
+                writer.writeheader()
+                for address in addresses:
+                    writer.writerow({key: format_csv_value(value) for key, value in address.items()})
+                    count += 1
+            else:
+                for address in addresses:
+                    file.write(json.dumps(address) + '\n')
+                    count += 1
+    except OSError as err:
+        logging.warning("Returning failure response since the file %s could not be written: %s", fileName, err)
+        return {
+            'success':   False,
+            'errorType': 'EXPORT_FAILED'
+        }
+    finally:
+        addresses.close()
+    logging.info("Exported %s addresses to %s - returning success response.", count, fileName)
+    return {
+        'success': True,
+        'result':  count
+    }
+
+
+if (__name__ == '__main__'):
+    if (len(sys.argv) != 2):
+        print("Usage: python exporter.py fileName")
+        sys.exit(1)
+    exportResult = export_addresses(sys.argv[1])
+    if (exportResult['success']):
+        print(f"Exported {exportResult['result']} addresses to {sys.argv[1]}.")
+    else:
+        print(f"The export failed: {exportResult['errorType']}")
+        sys.exit(1)
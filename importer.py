@@ -0,0 +1,171 @@
+'''
+    This script imports address entries from a CSV or JSON lines file without going through the interactive input prompts.
+    The file is read one row at a time, and the rows are created in batches of a fixed size, so memory use stays the same no matter how large the file is.
+    Each row is converted to the field types the same way the view converts its input, and then it is validated by the controller before it is created.
+    Rows that cannot be converted or fail validation are reported with their line number, and the rest of the file is still imported.
+
+    CSV files need a header row with the field names. The names field holds the names separated by '/', the same way the view displays them, and the bool fields hold 1 or 0.
+    JSON lines files hold one JSON object per line, with the same field names.
+    Usage: python importer.py fileName [batchSize]   (the default batch size is 1000)
+'''
+
+
+import sys
+import os
+import csv
+import json
+import time
+import logging
+import log_config
+
+# Logging configuration, which matches the view's format but only records warnings by default, since logging every row would slow down large imports
+log_config.configure_logging(logging.WARNING)
+
+import controller
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+'''
+read_rows() is a generator that yields each row of a CSV or JSON lines file as a tuple of the row's line number and a dictionary of the row's values.
+It takes a string for fileName, and the file type is decided by its extension ('.csv' for CSV, anything else for JSON lines).
+If a JSON line cannot be parsed, the dictionary is None, so that the line can be reported as rejected.
+'''
+def read_rows(fileName):
+    logging.debug("Beginning function execution with fileName = %s.", fileName)
+    with open(fileName, newline = '', encoding = 'utf-8') as file:
+        if (fileName.lower().endswith('.csv')):
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield (reader.line_num, row)
+        else:
+            for lineNumber, line in enumerate(file, start = 1):
+                if (not line.strip()):
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as err:
+                    logging.warning("Line %s is not valid JSON: %s", lineNumber, err)
+                    yield (lineNumber, None)
+                    continue
+                yield (lineNumber, row if isinstance(row, dict) else None)
+
+
+'''
+convert_value() converts a value read from an import file to the given data type, the same way the view's convert_input() converts user input.
+It takes the value for value and a type from controller.fieldTypes for dataType.
+Empty values become None, lists may be given as a string of items separated by '/', and bools may be given as '1' or '0'.
+If the value cannot be converted, it raises a ValueError.
+'''
+def convert_value(value, dataType):
+    if (isinstance(value, str)):
+        value = value.strip()
+    if ((value is None) or (value == '')):
+        return None
+    if (dataType is list):
+        if (isinstance(value, str)):
+            value = value.split('/')
+        if (not isinstance(value, list)):
+            raise ValueError(f"{value} is not a list")
+        return [str(item).strip() for item in value if str(item).strip()]
+    if (dataType is bool):
+        if (isinstance(value, bool)):
+            return value
+        if (str(value) in ('1', '0')):
+            return (str(value) == '1')
+        raise ValueError(f"{value} is not 1 or 0")
+    if (dataType is int):
+        if (isinstance(value, bool)):
+            raise ValueError(f"{value} is not an int")
+        return int(value)
+    return str(value)
+
+
+'''
+convert_row() converts every field of a row from an import file to the types in controller.fieldTypes.
+It takes a dictionary of the row's values for row.
+Fields that are missing from the row are left out, so that the controller reports them as missing.
+It returns the converted dictionary, or None if any value could not be converted.
+'''
+def convert_row(row):
+    addressData = {}
+    for key, dataType in controller.fieldTypes.items():
+        if (key not in row):
+            continue
+        try:
+            addressData[key] = convert_value(row[key], dataType)
+        except ValueError as err:
+            logging.warning("Could not convert the %s value %s: %s", key, row[key], err)
+            return None
+    return addressData
+
+
+'''
+import_addresses() imports every row of a CSV or JSON lines file into the address book, creating the rows in batches with controller.create_addresses().
+It takes a string for fileName, an optional int for batchSize, and an optional function for reportRejected, which is called with the line number and errorType of each rejected row as soon as it is rejected.
+Only one batch of rows is held in memory at a time.
+It returns a dictionary with the number of rows imported, the number of rows rejected, and the number of seconds the import took.
+'''
+def import_addresses(fileName, batchSize = DEFAULT_BATCH_SIZE, reportRejected = None):
+    logging.debug("Beginning function execution with fileName = %s, batchSize = %s.", fileName, batchSize)
+    summary = {
+        'imported': 0,
+        'rejected': 0,
+        'seconds':  0.0,
+    }
+    start = time.perf_counter()
+    controller.open_address_book()
+    try:
+        lineNumbers = []
+        batch = []
+        for lineNumber, row in read_rows(fileName):
+            addressData = convert_row(row) if (row is not None) else None
+            if (addressData is None):
+                record_rejected(summary, lineNumber, 'INVALID_INPUT', reportRejected)
+                continue
+            lineNumbers.append(lineNumber)
+            batch.append(addressData)
+            if (len(batch) == batchSize):
+                import_batch(summary, lineNumbers, batch, reportRejected)
+                lineNumbers = []
+                batch = []
+        if (batch):
+            import_batch(summary, lineNumbers, batch, reportRejected)
+    finally:
+        controller.close_address_book()
+    summary['seconds'] = time.perf_counter() - start
+    logging.info("Import finished: %s", summary)
+    return summary
+
+
+'''
+import_batch() creates one batch of converted rows with controller.create_addresses() and records the result of each row in the summary.
+It takes the summary dictionary from import_addresses() for summary, a list of the rows' line numbers for lineNumbers, a list of the rows' converted data for batch, and the optional reportRejected function.
+'''
+def import_batch(summary, lineNumbers, batch, reportRejected = None):
+    logging.debug("Beginning function execution with %s rows.", len(batch))
+    for lineNumber, result in zip(lineNumbers, controller.create_addresses(batch)):
+        if (result['success']):
+            summary['imported'] += 1
+        else:
+            record_rejected(summary, lineNumber, result['errorType'], reportRejected)
+
+
+'''
+record_rejected() counts a rejected row in the summary and passes its line number and errorType to reportRejected, if it was given.
+'''
+def record_rejected(summary, lineNumber, errorType, reportRejected = None):
+    logging.info("Rejected line %s with %s.", lineNumber, errorType)
+    summary['rejected'] += 1
+    if (reportRejected):
+        reportRejected(lineNumber, errorType)
+
+
+if (__name__ == '__main__'):
+    if ((len(sys.argv) < 2) or not os.path.isfile(sys.argv[1])):
+        print("Usage: python importer.py fileName [batchSize]")
+        sys.exit(1)
+    batchSize = int(sys.argv[2]) if (len(sys.argv) > 2) else DEFAULT_BATCH_SIZE
+    summary = import_addresses(sys.argv[1], batchSize, lambda lineNumber, errorType: print(f"Rejected line {lineNumber}: {errorType}"))
+    rowsPerSecond = (summary['imported'] + summary['rejected']) / summary['seconds'] if summary['seconds'] else 0
+    print(f"Imported {summary['imported']} rows and rejected {summary['rejected']} rows in {summary['seconds']:.2f}s ({rowsPerSecond:.0f} rows per second).")
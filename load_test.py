@@ -0,0 +1,230 @@
+'''
+    This script is a load test for server.py, which reports how many requests per second the server answers and how long the requests take.
+    It builds a synthetic route with crud_benchmark.py's generator in a temporary directory, starts server.py on it in a separate process, and sends requests from many keep-alive connections at once for a fixed time.
+    Each connection picks its requests at random: mostly reading single addresses, with some searches, some reads of every address that send If-None-Match with the last ETag they saw, and a share of in-place updates of an address the connection read.
+    Updates in place never shift positions, so every position stays valid for the whole test.
+    It can also test a server that is already running with --url, such as one serving a real address book, in which case it does not update anything unless --writes is given.
+    Usage: python load_test.py [--connections count] [--seconds seconds] [--size addresses] [--writes percent] [--engine shelve|sqlite|sharded] [--url http://host:port] [--json results.json]
+        (the defaults are 32 connections, 10 seconds, 1000 addresses, 5 percent writes, and the shelve engine)
+'''
+
+
+import sys
+import os
+import json
+import math
+import time
+import random
+import socket
+import asyncio
+import tempfile
+import platform
+import subprocess
+import urllib.parse
+
+import crud_benchmark
+
+DEFAULT_CONNECTIONS = 32
+DEFAULT_SECONDS = 10
+DEFAULT_SIZE = 1000
+DEFAULT_WRITES = 5
+DEFAULT_ENGINE = 'shelve'
+READ_ALL_PERCENT = 2 # Share of requests that read every address, which are much larger than the others
+SEARCH_PERCENT = 10
+SEARCH_TEXTS = ['Smith', 'Garcia', 'Main', 'Oak Ave', 'Patel', 'Corner Market', 'Jonson', 'Hernandes']
+
+
+'''
+send_request() sends one request on a keep-alive connection and returns a tuple of the status, the headers, and the body of the response.
+It takes an asyncio.StreamReader for reader, an asyncio.StreamWriter for writer, strings for host, method, and path, an optional dictionary for data, which is sent as a JSON body, and an optional dictionary of extra headers for headers.
+'''
+async def send_request(reader, writer, host, method, path, data = None, headers = None):
+    body = json.dumps(data).encode('utf-8') if (data is not None) else b''
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}"]
+    if (data is not None):
+        lines.append("Content-Type: application/json")
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+    statusLine = await reader.readline()
+    if (not statusLine):
+        raise ConnectionError("The server closed the connection.")
+    status = int(statusLine.split()[1])
+    responseHeaders = {}
+    while (True):
+        line = await reader.readline()
+        if (line in (b'\r\n', b'\n', b'')):
+            break
+        name, separator, value = line.decode('latin-1').partition(':')
+        responseHeaders[name.strip().lower()] = value.strip()
+    length = int(responseHeaders.get('content-length', '0'))
+    responseBody = await reader.readexactly(length) if length else b''
+    return status, responseHeaders, responseBody
+
+
+'''
+run_connection() sends requests on one connection until the deadline, and adds the latency of each one to results.
+It takes strings for host and port, an int for size, which is the number of addresses, an int for writes, which is the percent of requests that update an address, a float from time.perf_counter() for deadline, a random.Random for generator, and a dictionary of request kinds to lists of latencies for results, as well as a dictionary of statuses to counts for statuses.
+'''
+async def run_connection(host, port, size, writes, deadline, generator, results, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    etag = None
+    lastAddress = None
+    try:
+        while (time.perf_counter() < deadline):
+            choice = generator.random() * 100
+            headers = None
+            data = None
+            if ((choice < writes) and (lastAddress is not None)):
+                kind, method, path = 'update', 'PUT', f"/addresses/{lastAddress['position']}"
+                data = dict(lastAddress, names = crud_benchmark.generate_names(generator, lastAddress['isBusiness'], lastAddress['isVacant']))
+            elif (choice < (writes + READ_ALL_PERCENT)):
+                kind, method, path = 'read all', 'GET', '/addresses'
+                headers = {'If-None-Match': etag} if etag else None
+            elif (choice < (writes + READ_ALL_PERCENT + SEARCH_PERCENT)):
+                kind, method, path = 'search', 'GET', '/search?' + urllib.parse.urlencode({'text': generator.choice(SEARCH_TEXTS), 'limit': 10})
+            else:
+                kind, method, path = 'read single', 'GET', f"/addresses/{generator.randint(1, size)}"
+            start = time.perf_counter()
+            status, responseHeaders, responseBody = await send_request(reader, writer, host, method, path, data, headers)
+            results.setdefault(kind, []).append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if (kind == 'read all'):
+                etag = responseHeaders.get('etag', etag)
+            elif ((kind == 'read single') and (status == 200)):
+                lastAddress = json.loads(responseBody)['result']
+    finally:
+        writer.close()
+
+
+'''
+summarize() returns a dictionary of the 'count', 'requestsPerSecond', 'p50Ms', 'p99Ms', and 'maxMs' of a list of latencies in seconds, measured over a number of seconds.
+'''
+def summarize(latencies, seconds):
+    ordered = sorted(latencies)
+    def percentile(percent):
+        return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)] * 1000
+    return {
+        'count':             len(ordered),
+        'requestsPerSecond': len(ordered) / seconds,
+        'p50Ms':             percentile(50),
+        'p99Ms':             percentile(99),
+        'maxMs':             ordered[-1] * 1000,
+    }
+
+
+'''
+run_load() runs every connection at once against a server for a number of seconds, and returns the results as a dictionary.
+It takes strings for host and port, an int for connections, a float for seconds, an int for size, and an int for writes.
+'''
+async def run_load(host, port, connections, seconds, size, writes):
+    results = {}
+    statuses = {}
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*[run_connection(host, port, size, writes, deadline, random.Random(f"{crud_benchmark.SEED}:{number}"), results, statuses) for number in range(connections)])
+    elapsed = time.perf_counter() - start
+    allLatencies = [latency for latencies in results.values() for latency in latencies]
+    return {
+        'connections': connections,
+        'seconds':     elapsed,
+        'total':       summarize(allLatencies, elapsed),
+        'requests':    {kind: summarize(latencies, elapsed) for kind, latencies in sorted(results.items())},
+        'statuses':    {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+'''
+count_addresses() returns the number of addresses served by a running server, by reading every address once.
+'''
+async def count_addresses(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, headers, body = await send_request(reader, writer, host, 'GET', '/addresses')
+    finally:
+        writer.close()
+    return len(json.loads(body)['result']) if (status == 200) else 0
+
+
+'''
+start_server() builds a synthetic route of a size in a directory, starts server.py on it on a free port, and returns a tuple of the server process and its port.
+It takes a string for directory, a string for engine, and an int for size.
+'''
+def start_server(directory, engine, size):
+    environment = dict(os.environ, ADDRESS_BOOK_ENGINE = engine, ADDRESS_BOOK_FILE = os.path.join(directory, 'address_book.sqlite3' if engine == 'sqlite' else 'address_book.db'))
+    packageDirectory = os.path.dirname(os.path.abspath(__file__))
+    buildScript = f"import sys, random, logging; sys.path.insert(0, {packageDirectory!r}); logging.disable(logging.CRITICAL); import crud_benchmark, controller; assert all(response['success'] for response in controller.create_addresses(crud_benchmark.generate_route({size}, random.Random({crud_benchmark.SEED}))))"
+    subprocess.run([sys.executable, '-c', buildScript], cwd = directory, env = environment, check = True)
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen([sys.executable, os.path.join(packageDirectory, 'server.py'), '--port', str(port)], cwd = directory, env = environment, stdout = subprocess.PIPE, text = True)
+    process.stdout.readline() # The server prints one line once it is listening
+    return process, port
+
+
+'''
+print_results() prints the requests per second and latencies of each kind of request.
+It takes a dictionary of results from run_load() for results.
+'''
+def print_results(results):
+    total = results['total']
+    print(f"{total['count']} requests from {results['connections']} connections in {results['seconds']:.1f}s: {total['requestsPerSecond']:.1f} requests/s   p50 {total['p50Ms']:.2f}ms   p99 {total['p99Ms']:.2f}ms   max {total['maxMs']:.2f}ms")
+    for kind, summary in results['requests'].items():
+        print(f"    {kind:<12} {summary['count']:>8} requests {summary['requestsPerSecond']:>10.1f}/s   p50 {summary['p50Ms']:>8.2f}ms   p99 {summary['p99Ms']:>8.2f}ms   max {summary['maxMs']:>8.2f}ms")
+    print("    statuses:    " + ', '.join(f"{status}: {count}" for status, count in results['statuses'].items()))
+
+
+if (__name__ == '__main__'):
+    connections = DEFAULT_CONNECTIONS
+    seconds = DEFAULT_SECONDS
+    size = DEFAULT_SIZE
+    writes = None
+    engine = DEFAULT_ENGINE
+    url = None
+    jsonFileName = None
+    arguments = iter(sys.argv[1:])
+    for argument in arguments:
+        value = next(arguments, None)
+        if ((argument not in ('--connections', '--seconds', '--size', '--writes', '--engine', '--url', '--json')) or (value is None)):
+            print("Usage: python load_test.py [--connections count] [--seconds seconds] [--size addresses] [--writes percent] [--engine shelve|sqlite|sharded] [--url http://host:port] [--json results.json]")
+            sys.exit(1)
+        if (argument == '--connections'):
+            connections = int(value)
+        elif (argument == '--seconds'):
+            seconds = float(value)
+        elif (argument == '--size'):
+            size = int(value)
+        elif (argument == '--writes'):
+            writes = float(value)
+        elif (argument == '--engine'):
+            engine = value
+        elif (argument == '--url'):
+            url = urllib.parse.urlsplit(value)
+        else:
+            jsonFileName = value
+    if (url is not None):
+        host, port = url.hostname, url.port or 80
+        size = asyncio.run(count_addresses(host, port))
+        results = asyncio.run(run_load(host, port, connections, seconds, size, writes or 0))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            process, port = start_server(directory, engine, size)
+            try:
+                host = '127.0.0.1'
+                results = asyncio.run(run_load(host, port, connections, seconds, size, DEFAULT_WRITES if (writes is None) else writes))
+            finally:
+                process.terminate()
+                process.wait()
+    results.update({
+        'commit':   crud_benchmark.describe_commit(),
+        'python':   platform.python_version(),
+        'platform': platform.platform(),
+        'engine':   engine if (url is None) else None,
+        'size':     size,
+    })
+    print_results(results)
+    if (jsonFileName):
+        with open(jsonFileName, 'w') as jsonFile:
+            json.dump(results, jsonFile, indent = 4)
+        print(f"Wrote the results to {jsonFileName}.")
@@ -0,0 +1,84 @@
+'''
+    This script measures how much logging slows down creating, reading, updating, and deleting addresses through the controller functions.
+    It runs the operations of crud_benchmark.py on the same synthetic route once for each logging profile: with logging off, with DEBUG records written directly by each operation, with DEBUG records written by the QueueListener thread as the view does, and with INFO records written by the thread.
+    For each operation, it reports the operations per second of every profile and how much slower each profile is than having logging off, along with how large the log file grew.
+    Every profile runs in a new process, in a temporary directory, so the real address book and log file are never touched.
+    Usage: python log_benchmark.py [--engine shelve|sqlite|sharded] [--repeat count] [--json results.json] [size]   (the defaults are the shelve engine, 200 repeats, and 1000 addresses)
+'''
+
+
+import sys
+import json
+import logging
+import platform
+import multiprocessing
+
+import crud_benchmark
+
+DEFAULT_ENGINE = 'shelve'
+DEFAULT_SIZE = 1000
+# Each profile is a name, a logging level or None for logging off, and whether records are written by the QueueListener thread
+PROFILES = [
+    ('off',           None,          False),
+    ('DEBUG, direct', logging.DEBUG, False),
+    ('DEBUG, queued', logging.DEBUG, True),
+    ('INFO, queued',  logging.INFO,  True),
+]
+
+
+'''
+print_profiles() prints the operations per second of each operation with every logging profile, and how much slower each profile is than having logging off.
+It takes a list of dictionaries of results from crud_benchmark.run_case() for cases, in the same order as PROFILES.
+'''
+def print_profiles(cases):
+    print(f"{'Operation':<18}" + ''.join(f"{name:>24}" for name, level, queued in PROFILES))
+    for operation, summary in cases[0]['operations'].items():
+        columns = []
+        for case in cases:
+            opsPerSecond = case['operations'][operation]['opsPerSecond']
+            overhead = (summary['opsPerSecond'] / opsPerSecond - 1) * 100
+            columns.append(f"{opsPerSecond:>10.1f} ops/s" + (f" {overhead:>+6.1f}%" if (case is not cases[0]) else ' ' * 8))
+        print(f"{operation:<18}" + ''.join(f"{column:>24}" for column in columns))
+    print(f"{'log file':<18}" + ''.join(f"{case['logBytes'] / 1024:>20.1f} KiB" for case in cases))
+
+
+if (__name__ == '__main__'):
+    engine = DEFAULT_ENGINE
+    size = DEFAULT_SIZE
+    repeat = crud_benchmark.DEFAULT_REPEAT
+    jsonFileName = None
+    arguments = iter(sys.argv[1:])
+    for argument in arguments:
+        if (argument in ('--engine', '--repeat', '--json')):
+            value = next(arguments, None)
+            if (value is None):
+                print(f"{argument} needs a value.")
+                sys.exit(1)
+            if (argument == '--engine'):
+                engine = value
+            elif (argument == '--repeat'):
+                repeat = int(value)
+            else:
+                jsonFileName = value
+        else:
+            size = int(argument)
+    cases = []
+    for name, level, queued in PROFILES:
+        with multiprocessing.get_context('spawn').Pool(1) as pool: # A new process for each profile, so the logging of one does not carry over to the next
+            case = pool.apply(crud_benchmark.run_case, (engine, size, repeat, level, queued))
+        case['profile'] = name
+        cases.append(case)
+    print(f"[{engine} {size}] {repeat} repeats of each operation")
+    print_profiles(cases)
+    if (jsonFileName):
+        results = {
+            'commit':   crud_benchmark.describe_commit(),
+            'python':   platform.python_version(),
+            'platform': platform.platform(),
+            'seed':     crud_benchmark.SEED,
+            'repeat':   repeat,
+            'cases':    cases,
+        }
+        with open(jsonFileName, 'w') as jsonFile:
+            json.dump(results, jsonFile, indent = 4)
+        print(f"Wrote the results to {jsonFileName}.")
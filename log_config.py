@@ -0,0 +1,141 @@
+'''
+    log_config sets up logging for the address book programs, so that every program writes to logFile.txt in the same format and logging costs as little as possible while operations run.
+    The level comes from the ADDRESS_BOOK_LOG_LEVEL environment variable, which can be a level name such as DEBUG, INFO, or WARNING, or OFF to turn logging off.
+    If the variable is not set, each program's own default level is used.
+    The messages in the address book's modules pass their values as arguments instead of formatting them first, so a message below the level costs only a level check.
+    Records that are logged are put on a queue by a QueueHandler, and a QueueListener thread writes them to the log file, so an operation never waits for the disk.
+    Setting the ADDRESS_BOOK_LOG_QUEUE environment variable to 0 writes each record from the thread that logged it instead, which keeps every record up to a crash.
+    The queue is flushed to the log file when the program exits.
+'''
+
+
+import os
+import sys
+import copy
+import queue
+import atexit
+import logging
+import logging.handlers
+
+LOG_FILE = 'logFile.txt'
+''' Format example:
+myFile.py   at line 17  (DEBUG):
+    lookup_address()    -   No address was found at position 7.
+'''
+LOG_FORMAT = '%(filename)s\tat line %(lineno)s\t(%(levelname)s):\n\t%(funcName)s()\t-\t%(message)s\n'
+listener = None # The QueueListener writing queued records to the log file, or None if records are written directly
+
+
+'''
+RecordQueueHandler is a QueueHandler that puts records on the queue with as little work as possible in the thread that logged them.
+The message is merged with its arguments and formatted for the log file by the QueueListener thread, so the thread that logged it never formats it.
+Since a list, dictionary, or set argument such as an address dictionary may change before the record is written, those arguments are copied first, and every other argument is passed on as it is.
+The record is not copied, since this is the only handler that sees it.
+'''
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    MUTABLE_TYPES = (list, dict, set)
+
+    def prepare(self, record):
+        if (isinstance(record.args, dict)):
+            record.args = copy.deepcopy(record.args)
+        elif (record.args):
+            record.args = tuple((copy.deepcopy(arg) if isinstance(arg, RecordQueueHandler.MUTABLE_TYPES) else arg) for arg in record.args)
+        return record
+
+
+'''
+BufferedFileHandler is a FileHandler that leaves its records in the file's buffer instead of flushing the file after every record.
+It is only used by the QueueListener, which flushes it whenever the queue runs empty, so a burst of records is written with a few large writes.
+'''
+class BufferedFileHandler(logging.FileHandler):
+    def emit(self, record):
+        if (self.stream is None):
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+'''
+FlushingQueueListener is a QueueListener that flushes its handlers whenever it has written every record on the queue, before it waits for more.
+'''
+class FlushingQueueListener(logging.handlers.QueueListener):
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            for handler in self.handlers:
+                handler.flush()
+            return self.queue.get(block)
+
+
+'''
+get_level() returns the logging level chosen by the ADDRESS_BOOK_LOG_LEVEL environment variable, or None if it is OFF.
+It takes an int for defaultLevel, which is returned if the variable is not set or is not a level name.
+'''
+def get_level(defaultLevel):
+    levelName = os.environ.get('ADDRESS_BOOK_LOG_LEVEL', '').strip().upper()
+    if (not levelName):
+        return defaultLevel
+    if (levelName == 'OFF'):
+        return None
+    level = logging.getLevelName(levelName)
+    if (not isinstance(level, int)):
+        print(f"ADDRESS_BOOK_LOG_LEVEL is set to {levelName}, which is not a logging level, so {logging.getLevelName(defaultLevel)} is used instead.", file = sys.stderr)
+        return defaultLevel
+    return level
+
+
+'''
+configure_logging() sets up the root logger to write to the log file, at the level chosen by the ADDRESS_BOOK_LOG_LEVEL environment variable or at defaultLevel.
+It takes an optional int for defaultLevel, an optional string for fileName, an optional bool for queued, which is True to write records from a QueueListener thread and False to write them directly, and an optional bool for force.
+If queued is None, records are queued unless the ADDRESS_BOOK_LOG_QUEUE environment variable is 0.
+Like logging.basicConfig(), it does nothing if logging was already set up, unless force is True, so a module that is imported by a program does not change the program's logging.
+'''
+def configure_logging(defaultLevel = logging.WARNING, fileName = LOG_FILE, queued = None, force = False):
+    global listener
+    rootLogger = logging.getLogger()
+    if (rootLogger.handlers and (not force)):
+        return
+    stop_logging()
+    level = get_level(defaultLevel)
+    if (level is None):
+        logging.disable(logging.CRITICAL)
+        return
+    logging.disable(logging.NOTSET)
+    logging.logThreads = False # The log format has no thread or process names, so the records skip looking them up
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    if (queued is None):
+        queued = (os.environ.get('ADDRESS_BOOK_LOG_QUEUE', '1') != '0')
+    fileHandler = BufferedFileHandler(fileName) if queued else logging.FileHandler(fileName)
+    fileHandler.setFormatter(logging.Formatter(LOG_FORMAT))
+    if (queued):
+        recordQueue = queue.SimpleQueue()
+        listener = FlushingQueueListener(recordQueue, fileHandler)
+        listener.start()
+        rootLogger.addHandler(RecordQueueHandler(recordQueue))
+    else:
+        rootLogger.addHandler(fileHandler)
+    rootLogger.setLevel(level)
+
+
+'''
+stop_logging() writes any records still on the queue to the log file, and removes and closes the root logger's handlers.
+It is called when the program exits, and before logging is set up again.
+'''
+def stop_logging():
+    global listener
+    if (listener is not None):
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        listener = None
+    rootLogger = logging.getLogger()
+    for handler in list(rootLogger.handlers):
+        rootLogger.removeHandler(handler)
+        handler.close()
+
+
+atexit.register(stop_logging)
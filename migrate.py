@@ -0,0 +1,83 @@
+'''
+    This script copies an address book from one storage engine to another, such as an existing shelve address_book.db to an SQLite address_book.sqlite3.
+    The addresses are read from the source one at a time and inserted into the target in batches, so memory use stays the same no matter how large the address book is.
+    Each batch is saved to the target's journal as soon as it is inserted, and the journal is checkpointed at the end, so the target file holds every address when the script finishes.
+    The engine of each file is decided by its extension ('.sqlite3' or '.sqlite' for SQLite, '.shards' for the sharded shelve layout, anything else for shelve).
+    The addresses are added after any addresses already in the target, and the source is never changed.
+    Usage: python migrate.py [source] [target]   (the defaults are address_book.db and address_book.sqlite3)
+'''
+
+
+import sys
+import time
+import logging
+import log_config
+
+# Logging configuration, which matches the view's format but only records warnings by default, since logging every address would slow down large migrations
+log_config.configure_logging(logging.WARNING)
+
+from ShelveAddressStore import ShelveAddressStore
+from SQLiteAddressStore import SQLiteAddressStore
+from ShardedAddressStore import ShardedAddressStore
+
+DEFAULT_SOURCE = 'address_book.db'
+DEFAULT_TARGET = 'address_book.sqlite3'
+BATCH_SIZE = 1000
+
+
+'''
+open_store() returns a new AddressStore for a file, using the storage engine decided by the file's extension.
+It takes a string for fileName.
+'''
+def open_store(fileName):
+    if (fileName.lower().endswith(('.sqlite3', '.sqlite'))):
+        return SQLiteAddressStore(fileName)
+    if (fileName.lower().endswith('.shards')):
+        return ShardedAddressStore(fileName)
+    return ShelveAddressStore(fileName)
+
+
+'''
+migrate_addresses() copies every address from the source address book to the end of the target address book, in position order.
+It takes a string for sourceFileName and a string for targetFileName.
+It returns the number of addresses copied.
+'''
+def migrate_addresses(sourceFileName, targetFileName):
+    logging.debug("Beginning function execution with sourceFileName = %s, targetFileName = %s.", sourceFileName, targetFileName)
+    count = 0
+    with open_store(sourceFileName).session() as source, open_store(targetFileName).session(exclusive = True) as target:
+        batch = []
+        for address in source.iter_records():
+            batch.append(address)
+            if (len(batch) == BATCH_SIZE):
+                count += copy_batch(target, batch)
+                batch = []
+        if (batch):
+            count += copy_batch(target, batch)
+        target.checkpoint()
+    logging.info("Copied %s addresses from %s to %s.", count, sourceFileName, targetFileName)
+    return count
+
+
+'''
+copy_batch() inserts a batch of Address objects at the end of the target address book.
+It takes the open target AddressStore for target and a list of Address objects for batch, and saves the batch before returning.
+It returns the number of addresses inserted.
+'''
+def copy_batch(target, batch):
+    for address in batch:
+        address.position = target.header['count'] + 1 # Every address in the batch goes after the last address, in the order given
+    target.insert_addresses(batch)
+    target.sync() # Saving each batch keeps the changes waiting to be saved from growing with the address book
+    return len(batch)
+
+
+if (__name__ == '__main__'):
+    if (len(sys.argv) > 3):
+        print("Usage: python migrate.py [source] [target]")
+        sys.exit(1)
+    sourceFileName = sys.argv[1] if (len(sys.argv) > 1) else DEFAULT_SOURCE
+    targetFileName = sys.argv[2] if (len(sys.argv) > 2) else DEFAULT_TARGET
+    start = time.perf_counter()
+    count = migrate_addresses(sourceFileName, targetFileName)
+    print(f"Copied {count} addresses from {sourceFileName} to {targetFileName} in {time.perf_counter() - start:.2f}s.")
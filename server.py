@@ -0,0 +1,357 @@
+'''
+    This script serves the address book as an HTTP/JSON API on the local computer, so other programs can use it without the view's menu.
+    Each route runs a controller function through async_controller, so reads run concurrently on worker threads that keep the address book open, and changes are applied one at a time in the order they arrive.
+    Every response body is the controller function's dictionary as JSON, with 'success' and either 'result' or 'errorType', and the HTTP status reflects the errorType.
+    Connections are kept alive between requests, unless the client asks to close them or sits idle for KEEP_ALIVE_SECONDS.
+    Reading every address returns an ETag, and a request with a matching If-None-Match header gets a 304 response with no body.
+    The ETag is the lock file's generation number, so the server can tell the address book is unchanged without reading it, and the last encoded address book is reused until it changes.
+
+    Routes:
+        GET     /addresses                  every address
+        POST    /addresses                  create an address from a JSON object of its fields
+        GET     /addresses/<position>       the address at a position
+        PUT     /addresses/<position>       update the address at a position from a JSON object of its fields
+        DELETE  /addresses/<position>       delete the address at a position
+        GET     /search?text=<text>         the addresses whose names or street are most like the text, with an optional limit
+        GET     /sections                   the section numbers
+        GET     /sections/<section>         the addresses in a section
+        GET     /stats                      the performance statistics of the server process
+
+    Usage: python server.py [--host host] [--port port] [--readers count]   (the defaults are 127.0.0.1, port 8360, and 4 readers)
+'''
+
+
+import sys
+import re
+import json
+import http
+import asyncio
+import hashlib
+import logging
+import log_config
+import urllib.parse
+
+# Logging configuration, which matches the view's format but only records warnings by default, since logging every request would slow down the server
+log_config.configure_logging(logging.WARNING)
+
+import controller
+import async_controller
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8360
+KEEP_ALIVE_SECONDS = 30 # How long an idle connection is kept open for its next request
+MAX_BODY_SIZE = 1024 * 1024 # Largest request body accepted, in bytes
+MAX_HEADERS = 100
+# The HTTP status of each errorType, where any errorType not listed is a 500
+ERROR_STATUSES = {
+    'ADDRESS_NOT_FOUND':    404,
+    'ADDRESS_BOOK_EMPTY':   404,
+    'SECTION_NOT_FOUND':    404,
+    'NO_MATCHES':           404,
+    'MISSING_FIELD':        400,
+    'INVALID_INPUT':        400,
+    'INVALID_SECTION':      409,
+    'ADDRESS_BOOK_BUSY':    503,
+}
+cachedAddressBook = None # A tuple of the generation, ETag, and encoded body of the last response of reading every address
+
+
+'''
+BadRequest is raised when a request cannot be understood, and ends the connection with a 400 response.
+'''
+class BadRequest(Exception):
+    pass
+
+
+'''
+encode_json() returns a dictionary encoded as a JSON body.
+'''
+def encode_json(data):
+    return json.dumps(data, separators = (',', ':')).encode('utf-8')
+
+
+'''
+read_all_encoded() reads every address with controller.read_all_addresses() and returns its response with the encoded body added as 'body'.
+It runs on a reader thread, so that encoding a large address book does not hold up the event loop.
+'''
+def read_all_encoded():
+    response = controller.read_all_addresses()
+    response['body'] = encode_json(response)
+    return response
+
+
+'''
+respond() returns a tuple of the HTTP status, the extra headers, and the body of a controller function's response.
+It takes a dictionary for response, and an optional int for successStatus, which is the status if 'success' is True.
+'''
+def respond(response, successStatus = 200):
+    status = successStatus if response['success'] else ERROR_STATUSES.get(response['errorType'], 500)
+    return status, {}, encode_json(response)
+
+
+'''
+fail() returns a tuple of the HTTP status, the extra headers, and the body of a failure response with an errorType, for a request the server rejects without calling the controller.
+'''
+def fail(errorType):
+    return respond({
+        'success':   False,
+        'errorType': errorType
+    })
+
+
+'''
+decode_address_data() returns the JSON object in a request body as a dictionary, or None if the body is not a JSON object.
+'''
+def decode_address_data(body):
+    try:
+        addressData = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return addressData if isinstance(addressData, dict) else None
+
+
+'''
+read_addresses() handles GET /addresses, and returns a 304 response with no body if the If-None-Match header matches the address book's current ETag.
+The ETag is 'g' followed by the lock file's generation number, and the last encoded address book is reused while the generation is unchanged.
+On a system without file locking, the ETag is a hash of the body instead, so the address book is read for every request but is only sent when it changed.
+'''
+async def read_addresses(match, query, headers, body):
+    global cachedAddressBook
+    generation = (await async_controller.run_read(controller.read_generation))['result']
+    if ((generation is not None) and (cachedAddressBook is not None) and (cachedAddressBook[0] == generation)):
+        etag, responseBody = cachedAddressBook[1], cachedAddressBook[2]
+        status = 200
+    else:
+        response = await async_controller.run_read(read_all_encoded)
+        responseBody = response.pop('body', None) or encode_json(response)
+        status = 200 if response['success'] else ERROR_STATUSES.get(response['errorType'], 500)
+        etag = f'"g{generation}"' if (generation is not None) else f'"h{hashlib.sha1(responseBody).hexdigest()}"'
+        if ((generation is not None) and response['success']):
+            cachedAddressBook = (generation, etag, responseBody)
+    if (status != 200):
+        return status, {}, responseBody
+    if (etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]):
+        return 304, {'ETag': etag}, b''
+    return 200, {'ETag': etag}, responseBody
+
+
+'''
+create_address() handles POST /addresses.
+'''
+async def create_address(match, query, headers, body):
+    addressData = decode_address_data(body)
+    if (addressData is None):
+        return fail('INVALID_INPUT')
+    return respond(await async_controller.run_change(controller.create_checked_address, addressData), 201)
+
+
+'''
+read_address() handles GET /addresses/<position>.
+'''
+async def read_address(match, query, headers, body):
+    return respond(await async_controller.read_single_address(int(match.group(1))))
+
+
+'''
+update_address() handles PUT /addresses/<position>.
+'''
+async def update_address(match, query, headers, body):
+    addressData = decode_address_data(body)
+    if (addressData is None):
+        return fail('INVALID_INPUT')
+    return respond(await async_controller.run_change(controller.update_checked_address, addressData, int(match.group(1))))
+
+
+'''
+delete_address() handles DELETE /addresses/<position>.
+'''
+async def delete_address(match, query, headers, body):
+    return respond(await async_controller.delete_address(int(match.group(1))))
+
+
+'''
+search_addresses() handles GET /search, with the text to search for in the text parameter and an optional limit parameter.
+'''
+async def search_addresses(match, query, headers, body):
+    text = query.get('text', [''])[0]
+    try:
+        limit = int(query.get('limit', ['10'])[0])
+    except ValueError:
+        return fail('INVALID_INPUT')
+    return respond(await async_controller.run_read(controller.search_addresses, text, limit))
+
+
+'''
+read_section_numbers() handles GET /sections.
+'''
+async def read_section_numbers(match, query, headers, body):
+    return respond(await async_controller.run_read(controller.read_section_numbers))
+
+
+'''
+read_section() handles GET /sections/<section>.
+'''
+async def read_section(match, query, headers, body):
+    return respond(await async_controller.run_read(controller.read_section, int(match.group(1))))
+
+
+'''
+read_stats() handles GET /stats.
+'''
+async def read_stats(match, query, headers, body):
+    return respond(controller.read_stats())
+
+
+# Each route is a method, a regular expression that the whole path must match, and the handler, which takes the match, the query parameters, the headers, and the body
+ROUTES = [
+    ('GET',     re.compile(r'/addresses'),              read_addresses),
+    ('POST',    re.compile(r'/addresses'),              create_address),
+    ('GET',     re.compile(r'/addresses/(\d+)'),        read_address),
+    ('PUT',     re.compile(r'/addresses/(\d+)'),        update_address),
+    ('DELETE',  re.compile(r'/addresses/(\d+)'),        delete_address),
+    ('GET',     re.compile(r'/search'),                 search_addresses),
+    ('GET',     re.compile(r'/sections'),               read_section_numbers),
+    ('GET',     re.compile(r'/sections/(\d+)'),         read_section),
+    ('GET',     re.compile(r'/stats'),                  read_stats),
+]
+
+
+'''
+route() returns a tuple of the HTTP status, the extra headers, and the body of the response to a request.
+It takes a string for method, a string for target, which is the path and query, a dictionary of lower case header names to values for headers, and bytes for body.
+'''
+async def route(method, target, headers, body):
+    url = urllib.parse.urlsplit(target)
+    path = url.path.rstrip('/') or '/'
+    allowedMethods = []
+    for routeMethod, pattern, handler in ROUTES:
+        match = pattern.fullmatch(path)
+        if (match is None):
+            continue
+        if (routeMethod == method):
+            return await handler(match, urllib.parse.parse_qs(url.query), headers, body)
+        allowedMethods.append(routeMethod)
+    if (allowedMethods):
+        return 405, {'Allow': ', '.join(allowedMethods)}, b''
+    return 404, {}, b''
+
+
+'''
+read_request() reads one request from a connection, and returns a tuple of its method, target, HTTP version, headers, and body, or None if the client closed the connection.
+It takes an asyncio.StreamReader for reader, and raises BadRequest if the request is malformed.
+'''
+async def read_request(reader):
+    try:
+        requestLine = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_SECONDS)
+    except asyncio.TimeoutError:
+        return None
+    if (not requestLine):
+        return None
+    parts = requestLine.decode('latin-1').split()
+    if ((len(parts) != 3) or (not parts[2].startswith('HTTP/1.'))):
+        raise BadRequest(f"Malformed request line: {requestLine!r}")
+    method, target, version = parts
+    headers = {}
+    while (True):
+        line = await reader.readline()
+        if (line in (b'\r\n', b'\n', b'')):
+            break
+        name, separator, value = line.decode('latin-1').partition(':')
+        if ((not separator) or (len(headers) >= MAX_HEADERS)):
+            raise BadRequest(f"Malformed header: {line!r}")
+        headers[name.strip().lower()] = value.strip()
+    if ('chunked' in headers.get('transfer-encoding', '').lower()):
+        raise BadRequest("Chunked request bodies are not supported.")
+    try:
+        length = int(headers.get('content-length', '0'))
+    except ValueError:
+        raise BadRequest("Malformed Content-Length.") from None
+    if ((length < 0) or (length > MAX_BODY_SIZE)):
+        raise BadRequest(f"A body of {length} bytes is not allowed.")
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+'''
+write_response() writes one response to a connection.
+It takes an asyncio.StreamWriter for writer, an int for status, a dictionary of extra headers for headers, bytes for body, and a bool for keepAlive.
+'''
+def write_response(writer, status, headers, body, keepAlive):
+    lines = [f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}"]
+    if (body):
+        lines.append("Content-Type: application/json")
+    lines.append(f"Content-Length: {len(body)}")
+    lines.append("Connection: keep-alive" if keepAlive else "Connection: close")
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+
+'''
+handle_connection() answers every request on one connection in turn, until the client closes it, asks for it to be closed, or leaves it idle.
+It takes an asyncio.StreamReader for reader and an asyncio.StreamWriter for writer.
+'''
+async def handle_connection(reader, writer):
+    try:
+        while (True):
+            try:
+                request = await read_request(reader)
+            except BadRequest as err:
+                logging.warning("Closing a connection after a bad request: %s", err)
+                write_response(writer, 400, {}, b'', False)
+                await writer.drain()
+                break
+            if (request is None):
+                break
+            method, target, version, headers, body = request
+            connection = headers.get('connection', '').lower()
+            keepAlive = (connection != 'close') if (version == 'HTTP/1.1') else (connection == 'keep-alive')
+            try:
+                status, responseHeaders, responseBody = await route(method, target, headers, body)
+            except Exception:
+                logging.exception("The request %s %s failed.", method, target)
+                status, responseHeaders, responseBody = 500, {}, b''
+            write_response(writer, status, responseHeaders, responseBody, keepAlive)
+            await writer.drain()
+            if (not keepAlive):
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+        pass # The client went away or sent a line longer than the stream limit
+    finally:
+        writer.close()
+
+
+'''
+serve() opens the address book and serves requests on a host and port until the program is stopped.
+It takes a string for host, an int for port, and an int for readers, which is the number of reads that can run at the same time.
+'''
+async def serve(host, port, readers):
+    await async_controller.open_address_book(readers)
+    server = await asyncio.start_server(handle_connection, host, port)
+    print(f"Serving the address book at http://{host}:{port}/", flush = True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await async_controller.close_address_book()
+
+
+if (__name__ == '__main__'):
+    host = DEFAULT_HOST
+    port = DEFAULT_PORT
+    readers = async_controller.DEFAULT_READERS
+    arguments = iter(sys.argv[1:])
+    for argument in arguments:
+        value = next(arguments, None)
+        if ((argument not in ('--host', '--port', '--readers')) or (value is None)):
+            print(__doc__.strip().splitlines()[-1].strip())
+            sys.exit(1)
+        if (argument == '--host'):
+            host = value
+        elif (argument == '--port'):
+            port = int(value)
+        else:
+            readers = int(value)
+    try:
+        asyncio.run(serve(host, port, readers))
+    except KeyboardInterrupt:
+        pass
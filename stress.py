@@ -0,0 +1,140 @@
+'''
+    This script is a stress test for using one address book from several processes at the same time.
+    Each worker process creates, deletes, and reads addresses at random positions as fast as it can, while the file lock keeps the processes from changing the address book at the same time.
+    Half of the workers keep the address book open between operations, so that reloading it after another process changed it is also tested.
+    When every worker is done, the address book is checked: the positions must run from 1 to the number of addresses with no gaps or duplicates, the number of addresses must match the creates and deletes, and every address must be found by its name.
+    Every check is run with each storage engine, in a temporary directory, so the real address book is never touched.
+    Usage: python stress.py [processes] [operations]   (the defaults are 4 processes and 200 operations per process)
+'''
+
+
+import sys
+import os
+import random
+import tempfile
+import time
+import logging
+import multiprocessing
+
+from Address import Address
+
+DEFAULT_PROCESSES = 4
+DEFAULT_OPERATIONS = 200
+INITIAL_SIZE = 50
+ENGINES = ['shelve', 'sqlite', 'sharded']
+
+
+'''
+new_address() returns a new Address object with a unique address number and name, in section 1.
+It takes an int for addressNumber and an int for position.
+'''
+def new_address(addressNumber, position):
+    return Address(addressNumber, 'Stress St', None, ['Resident ' + str(addressNumber)], position, 1, False, False, False)
+
+
+'''
+run_worker() runs one worker process's random operations on the address book and returns a dictionary of how many addresses it created and deleted, how many reads it checked, and its lock statistics.
+It takes an int for workerNumber, a string for engine, a string for fileName, and an int for operations.
+'''
+def run_worker(workerNumber, engine, fileName, operations):
+    logging.disable(logging.CRITICAL)
+    Address.ENGINE = engine
+    Address.DB_FILE = fileName
+    random.seed(workerNumber)
+    keepOpen = (workerNumber % 2 == 1)
+    if (keepOpen):
+        Address.open_shared_store()
+    summary = {
+        'created': 0,
+        'deleted': 0,
+        'reads':   0,
+    }
+    for operation in range(operations):
+        choice = random.random()
+        if (choice < 0.4):
+            with Address.session(exclusive = True) as store:
+                lastPosition = Address.get_last_position(store) or 0
+                new_address((workerNumber + 1) * 1000000 + operation, random.randint(1, lastPosition + 1)).create(store)
+            summary['created'] += 1
+        elif (choice < 0.7):
+            with Address.session(exclusive = True) as store:
+                lastPosition = Address.get_last_position(store)
+                if (lastPosition and Address.delete(random.randint(1, lastPosition), store)):
+                    summary['deleted'] += 1
+        else:
+            with Address.session() as store:
+                lastPosition = Address.get_last_position(store)
+                if (lastPosition):
+                    position = random.randint(1, lastPosition)
+                    address = Address.read_single(position, store)
+                    assert (address is not None) and (address['position'] == position), f"Read the wrong address at position {position}: {address}"
+                    summary['reads'] += 1
+    if (keepOpen):
+        Address.close_shared_store()
+    summary['lockStats'] = Address.get_lock_stats()
+    return summary
+
+
+'''
+check_address_book() checks that the address book has every position from 1 to its number of addresses exactly once, that it has the expected number of addresses, and that every address is found by its name.
+It takes an int for expectedCount.
+It returns a list of strings describing each problem found, which is empty if the address book is consistent.
+'''
+def check_address_book(expectedCount):
+    problems = []
+    addresses = Address.read() or []
+    positions = [address['position'] for address in addresses]
+    if (positions != list(range(1, len(addresses) + 1))):
+        problems.append("The positions are not contiguous from 1.")
+    if (len(addresses) != expectedCount):
+        problems.append(f"There are {len(addresses)} addresses, but {expectedCount} were expected.")
+    if (Address.get_last_position() != (len(addresses) or None)):
+        problems.append(f"The last position in the header is {Address.get_last_position()}, but there are {len(addresses)} addresses.")
+    if (len(set(address['addressNumber'] for address in addresses)) != len(addresses)):
+        problems.append("An address is stored more than once.")
+    for address in addresses:
+        found = Address.find(name = address['names'][0])
+        if ([match['position'] for match in found] != [address['position']]):
+            problems.append(f"The address at position {address['position']} was found at {[match['position'] for match in found]} by its name.")
+            break
+    return problems
+
+
+'''
+stress_engine() runs the stress test with one storage engine and prints its results.
+It takes a string for engine, an int for processes, and an int for operations.
+It returns True if the address book was consistent at the end, and False if not.
+'''
+def stress_engine(engine, processes, operations):
+    with tempfile.TemporaryDirectory() as directory:
+        Address.ENGINE = engine
+        Address.DB_FILE = os.path.join(directory, 'address_book.sqlite3' if engine == 'sqlite' else 'address_book.db')
+        Address.create_batch([new_address(position, position) for position in range(1, INITIAL_SIZE + 1)])
+        start = time.perf_counter()
+        with multiprocessing.get_context('spawn').Pool(processes) as pool: # Spawned workers start fresh, like separate operators, instead of inheriting this process's lock statistics
+            summaries = pool.starmap(run_worker, [(workerNumber, engine, Address.DB_FILE, operations) for workerNumber in range(processes)])
+        elapsed = time.perf_counter() - start
+        created = sum(summary['created'] for summary in summaries)
+        deleted = sum(summary['deleted'] for summary in summaries)
+        reads = sum(summary['reads'] for summary in summaries)
+        waited = sum(summary['lockStats']['waited'] for summary in summaries)
+        acquired = sum(summary['lockStats']['acquired'] for summary in summaries)
+        waitSeconds = sum(summary['lockStats']['waitSeconds'] for summary in summaries)
+        maxWaitSeconds = max(summary['lockStats']['maxWaitSeconds'] for summary in summaries)
+        label = f"[{engine:<7}]"
+        print(f"{label} {processes} processes made {created} creates, {deleted} deletes, and {reads} checked reads in {elapsed:.2f}s")
+        print(f"{label} {waited} of {acquired} lock acquisitions waited, for {waitSeconds:.2f}s in total and {maxWaitSeconds * 1000:.1f}ms at most")
+        problems = check_address_book(INITIAL_SIZE + created - deleted)
+        for problem in problems:
+            print(f"{label} FAILED: {problem}")
+        if (not problems):
+            print(f"{label} The address book is consistent.")
+        return (not problems)
+
+
+if (__name__ == '__main__'):
+    logging.disable(logging.CRITICAL) # Logging every operation from every process would dominate the test
+    processes = int(sys.argv[1]) if (len(sys.argv) > 1) else DEFAULT_PROCESSES
+    operations = int(sys.argv[2]) if (len(sys.argv) > 2) else DEFAULT_OPERATIONS
+    results = [stress_engine(engine, processes, operations) for engine in ENGINES]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,636 @@
+'''
+Tests for Address, run with 'python -m pytest' or 'python -m unittest' from the project directory.
+Each test works on its own address book in a temporary directory, so the address book in the project directory is never touched.
+A test case that runs on every storage engine has a subclass for each of the other engines, which only sets ENGINE.
+'''
+
+
+import os
+import json
+import logging
+import tempfile
+import unittest
+from unittest import mock
+
+import benchmark
+import exporter
+import importer
+import migrate
+from Address import Address
+from ShelveAddressStore import ShelveAddressStore
+
+
+'''
+AddressBookTestCase is the base of every test case that works on an address book, which points Address.DB_FILE at a new file in a temporary directory for each test and puts it back afterwards.
+The address book uses the storage engine in ENGINE, and its file has the extension that migrate.py expects for that engine.
+'''
+class AddressBookTestCase(unittest.TestCase):
+    ENGINE = 'shelve'
+    FILE_NAMES = {'shelve': 'address_book.db', 'sqlite': 'address_book.sqlite3', 'sharded': 'address_book.shards'}
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directory = tempfile.TemporaryDirectory()
+        self.oldDbFile = Address.DB_FILE
+        self.oldEngine = Address.ENGINE
+        Address.DB_FILE = self.file_path(AddressBookTestCase.FILE_NAMES[self.ENGINE])
+        Address.ENGINE = self.ENGINE
+
+
+    def tearDown(self):
+        Address.close_shared_store()
+        Address.DB_FILE = self.oldDbFile
+        Address.ENGINE = self.oldEngine
+        self.directory.cleanup()
+        logging.disable(logging.NOTSET)
+
+
+    '''
+    file_path() returns the path of a file with a name in the test's temporary directory.
+    '''
+    def file_path(self, fileName):
+        return os.path.join(self.directory.name, fileName)
+
+
+    '''
+    new_address() returns an unsaved Address object with a number, a position, and a section, and the same values for every other field.
+    '''
+    @staticmethod
+    def new_address(addressNumber, position, section = 1):
+        return Address(addressNumber, 'Main St', None, [f"Name {addressNumber}"], position, section, False, False, False)
+
+
+    '''
+    read_numbers() returns a list of the addressNumber of every address in the address book, in position order.
+    '''
+    @staticmethod
+    def read_numbers():
+        return [address['addressNumber'] for address in (Address.read() or [])]
+
+
+class CreateBatchTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([self.new_address(1, 1), self.new_address(2, 2), self.new_address(3, 3)])
+
+
+    def test_different_positions_are_final_positions(self):
+        created = Address.create_batch([self.new_address(12, 4), self.new_address(10, 2)])
+        self.assertEqual([address['position'] for address in created], [4, 2])
+        self.assertEqual(self.read_numbers(), [1, 10, 2, 12, 3])
+
+
+    def test_same_positions_keep_input_order(self):
+        created = Address.create_batch([self.new_address(10, 2), self.new_address(11, 2), self.new_address(12, 2)])
+        self.assertEqual([address['position'] for address in created], [2, 3, 4])
+        self.assertEqual(self.read_numbers(), [1, 10, 11, 12, 2, 3])
+
+
+    def test_same_positions_differ_from_sequential_creates(self):
+        self.new_address(10, 2).create()
+        self.new_address(11, 2).create()
+        self.assertEqual(self.read_numbers(), [1, 11, 10, 2, 3])
+
+
+    def test_taken_positions_follow_the_earlier_addresses(self):
+        created = Address.create_batch([self.new_address(10, 2), self.new_address(11, 2), self.new_address(12, 3)])
+        self.assertEqual([address['position'] for address in created], [2, 3, 4])
+        self.assertEqual(self.read_numbers(), [1, 10, 11, 12, 2, 3])
+
+
+    def test_positions_beyond_the_end_are_appended(self):
+        created = Address.create_batch([self.new_address(10, 50), self.new_address(11, 50)])
+        self.assertEqual([address['position'] for address in created], [4, 5])
+        self.assertEqual(self.read_numbers(), [1, 2, 3, 10, 11])
+
+
+class RecordCacheTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([self.new_address(1, 1), self.new_address(2, 2)])
+        Address.open_shared_store() # The shared store keeps its record cache between operations
+
+
+    def test_changing_a_read_address_does_not_change_the_cache(self):
+        addressData = Address.read_single(1)
+        addressData['names'].append('INTRUDER')
+        addressData['street'] = 'ELSEWHERE'
+        self.assertEqual(Address.read_single(1)['names'], ['NAME 1'])
+        self.assertEqual(Address.read_single(1)['street'], 'MAIN ST')
+        self.assertGreater(Address.get_cache_stats()['hits'], 0)
+
+
+    def test_changing_a_store_address_does_not_change_the_cache(self):
+        with Address.session() as store:
+            address = store.get_record_at(2)
+            address.names.append('INTRUDER')
+            address.section = 99
+            cachedAddress = store.get_record_at(2)
+        self.assertEqual(cachedAddress.names, ['NAME 2'])
+        self.assertEqual(cachedAddress.section, 1)
+
+
+class CheckpointTest(AddressBookTestCase):
+    def test_operations_leave_the_checkpoint_for_when_idle(self):
+        with mock.patch.object(ShelveAddressStore, 'CHECKPOINT_SIZE', 1):
+            self.new_address(1, 1).create()
+            journalSize = Address.get_journal_size()
+            self.assertGreater(journalSize, 0)
+            self.assertEqual(Address.checkpoint_if_needed(), journalSize)
+            self.assertEqual(Address.get_journal_size(), 0)
+            self.assertEqual(Address.checkpoint_if_needed(), 0)
+        self.assertEqual(self.read_numbers(), [1])
+
+
+    def test_operations_checkpoint_past_the_largest_journal(self):
+        with mock.patch.object(ShelveAddressStore, 'MAX_JOURNAL_SIZE', 1):
+            self.new_address(1, 1).create()
+            self.assertEqual(Address.get_journal_size(), 0)
+        self.assertEqual(self.read_numbers(), [1])
+
+
+class ImportTest(AddressBookTestCase):
+    '''
+    write_file() writes lines of text to a file in the test's temporary directory, and returns the file's path.
+    '''
+    def write_file(self, fileName, lines):
+        with open(self.file_path(fileName), 'w', encoding = 'utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        return self.file_path(fileName)
+
+
+    def test_csv_rows_are_converted_to_the_field_types(self):
+        fileName = self.write_file('rows.csv', [
+            'addressNumber,street,unit,names,position,section,isBusiness,isCBU,isVacant',
+            '5,Elm St,,Eve Adams/Fay Adams,1,1,1,0,0',
+            '6,Elm St,2B,Gus,2,1,0,1,1',
+        ])
+        self.assertEqual(importer.import_addresses(fileName, 1)['imported'], 2)
+        self.assertEqual(Address.read(), [
+            {'addressNumber': 5, 'street': 'ELM ST', 'unit': None, 'names': ['EVE ADAMS', 'FAY ADAMS'], 'position': 1, 'section': 1, 'isBusiness': True, 'isCBU': False, 'isVacant': False},
+            {'addressNumber': 6, 'street': 'ELM ST', 'unit': '2B', 'names': ['GUS'], 'position': 2, 'section': 1, 'isBusiness': False, 'isCBU': True, 'isVacant': True},
+        ])
+
+
+    def test_rejected_rows_are_reported_and_the_rest_are_imported(self):
+        fileName = self.write_file('rows.jsonl', [
+            json.dumps({'addressNumber': 5, 'street': 'Elm St', 'unit': None, 'names': ['Eve'], 'position': 1, 'section': 1, 'isBusiness': False, 'isCBU': False, 'isVacant': False}),
+            'not json',
+            json.dumps({'addressNumber': 'five', 'street': 'Elm St', 'unit': None, 'names': ['Eve'], 'position': 2, 'section': 1, 'isBusiness': False, 'isCBU': False, 'isVacant': False}),
+            json.dumps({'addressNumber': 6, 'street': 'Elm St', 'unit': None, 'names': ['Fay'], 'position': 2, 'section': 1, 'isBusiness': False, 'isCBU': False, 'isVacant': False}),
+        ])
+        rejected = []
+        summary = importer.import_addresses(fileName, 2, lambda lineNumber, errorType: rejected.append((lineNumber, errorType)))
+        self.assertEqual((summary['imported'], summary['rejected']), (2, 2))
+        self.assertEqual(rejected, [(2, 'INVALID_INPUT'), (3, 'INVALID_INPUT')])
+        self.assertEqual(self.read_numbers(), [5, 6])
+
+
+class SQLiteImportTest(ImportTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedImportTest(ImportTest):
+    ENGINE = 'sharded'
+
+
+class ExportTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([
+            Address(1, 'Main St', None, ['Ann Smith', 'Bob Smith'], 1, 1, False, False, False),
+            Address(2, 'Main St', '2B', ['Café Owner'], 2, 1, True, False, False),
+            Address(3, 'Oak Ave', None, ['Dee Jones'], 3, 2, False, True, True),
+        ])
+
+
+    '''
+    import_into_new_book() imports a file into a new, empty address book of the same engine, and returns the summary of the import.
+    '''
+    def import_into_new_book(self, fileName):
+        Address.DB_FILE = self.file_path('imported_' + AddressBookTestCase.FILE_NAMES[self.ENGINE])
+        return importer.import_addresses(fileName, 2)
+
+
+    def test_csv_export_imports_the_same_address_book(self):
+        addresses = Address.read()
+        self.assertEqual(exporter.export_addresses(self.file_path('export.csv')), {'success': True, 'result': 3})
+        self.assertEqual(self.import_into_new_book(self.file_path('export.csv'))['imported'], 3)
+        self.assertEqual(Address.read(), addresses)
+
+
+    def test_json_lines_export_imports_the_same_address_book(self):
+        addresses = Address.read()
+        self.assertEqual(exporter.export_addresses(self.file_path('export.jsonl')), {'success': True, 'result': 3})
+        self.assertEqual(self.import_into_new_book(self.file_path('export.jsonl'))['imported'], 3)
+        self.assertEqual(Address.read(), addresses)
+
+
+    def test_an_empty_address_book_is_not_exported(self):
+        for position in (3, 2, 1):
+            Address.delete(position)
+        self.assertEqual(exporter.export_addresses(self.file_path('export.csv')), {'success': False, 'errorType': 'ADDRESS_BOOK_EMPTY'})
+
+
+class SQLiteExportTest(ExportTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedExportTest(ExportTest):
+    ENGINE = 'sharded'
+
+
+class MigrateTest(AddressBookTestCase):
+    def test_every_address_is_copied_to_the_other_engines(self):
+        Address.create_batch([self.new_address(1, 1), self.new_address(2, 2), self.new_address(3, 3, 2)])
+        for engine, fileName in AddressBookTestCase.FILE_NAMES.items():
+            if (engine == self.ENGINE):
+                continue
+            self.assertEqual(migrate.migrate_addresses(Address.DB_FILE, self.file_path(fileName)), 3)
+            with migrate.open_store(self.file_path(fileName)).session() as store:
+                self.assertEqual([(address.addressNumber, address.position, address.section) for address in store.iter_records()], [(1, 1, 1), (2, 2, 1), (3, 3, 2)])
+        self.assertEqual(self.read_numbers(), [1, 2, 3])
+
+
+class SQLiteMigrateTest(MigrateTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedMigrateTest(MigrateTest):
+    ENGINE = 'sharded'
+
+
+class RecordTest(AddressBookTestCase):
+    def test_every_field_is_kept_by_the_store(self):
+        Address(7, 'Main St', 'Unit 1', ['José Núñez', 'Ann'], 1, 1, True, True, True).create()
+        Address(8, 'Main St', None, [], 2, 2, False, False, False).create()
+        self.assertEqual(Address.read(), [
+            {'addressNumber': 7, 'street': 'MAIN ST', 'unit': 'UNIT 1', 'names': ['JOSÉ NÚÑEZ', 'ANN'], 'position': 1, 'section': 1, 'isBusiness': True, 'isCBU': True, 'isVacant': True},
+            {'addressNumber': 8, 'street': 'MAIN ST', 'unit': None, 'names': [], 'position': 2, 'section': 2, 'isBusiness': False, 'isCBU': False, 'isVacant': False},
+        ])
+
+
+    def test_a_compact_record_holds_every_field_but_the_position(self):
+        address = Address(7, 'Main St', 'Unit 1', ['José Núñez', 'Ann'], 4, 3, True, False, True)
+        copy = Address.from_record(address.to_record())
+        self.assertIsNone(copy.position)
+        copy.position = address.position
+        self.assertEqual(copy.to_dict(), address.to_dict())
+
+
+    def test_a_record_of_another_version_is_rejected(self):
+        record = bytearray(self.new_address(1, 1).to_record())
+        record[0] = Address.RECORD_VERSION + 1
+        with self.assertRaises(ValueError):
+            Address.from_record(bytes(record))
+
+
+class SQLiteRecordTest(RecordTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedRecordTest(RecordTest):
+    ENGINE = 'sharded'
+
+
+class FindTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([
+            Address(10, 'Main St', None, ['Ann Smith'], 1, 1, False, False, False),
+            Address(10, 'Main St', 'Apt 2', ['Bob Johnson'], 2, 1, False, False, False),
+            Address(12, 'Oak Ave', None, ['Ann Smith', 'Carl Williams'], 3, 2, False, False, False),
+        ])
+
+
+    '''
+    find_positions() returns a list of the positions of the addresses that Address.find() finds with the given values.
+    '''
+    @staticmethod
+    def find_positions(**values):
+        return [address['position'] for address in Address.find(**values)]
+
+
+    def test_find_by_street_name_and_number(self):
+        self.assertEqual(self.find_positions(street = 'main st'), [1, 2])
+        self.assertEqual(self.find_positions(name = 'ann smith'), [1, 3])
+        self.assertEqual(self.find_positions(street = 'Oak Ave', name = 'Ann Smith'), [3])
+        self.assertEqual(self.find_positions(street = 'Main St', addressNumber = 10), [1])
+        self.assertEqual(self.find_positions(street = 'Main St', addressNumber = 10, unit = 'apt 2'), [2])
+        self.assertEqual(self.find_positions(name = 'Nobody'), [])
+        self.assertEqual(self.find_positions(), [])
+
+
+    def test_the_indexes_follow_updates_deletes_and_shifts(self):
+        Address(12, 'Oak Ave', None, ['Dana White'], 3, 2, False, False, False).update(3)
+        self.new_address(1, 1).create()
+        self.assertEqual(self.find_positions(name = 'Ann Smith'), [2])
+        self.assertEqual(self.find_positions(name = 'Dana White'), [4])
+        Address.delete(2)
+        self.assertEqual(self.find_positions(name = 'Ann Smith'), [])
+        self.assertEqual(self.find_positions(street = 'Main St'), [1, 2])
+
+
+class SQLiteFindTest(FindTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedFindTest(FindTest):
+    ENGINE = 'sharded'
+
+
+class FindSimilarTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([
+            Address(10, 'Main St', None, ['Ann Smith'], 1, 1, False, False, False),
+            Address(11, 'Main St', None, ['Bob Johnson'], 2, 1, False, False, False),
+            Address(12, 'Oak Ave', None, ['Ann Smith', 'Carl Williams'], 3, 2, False, False, False),
+        ])
+
+
+    def test_find_similar_ranks_a_misspelled_name_first(self):
+        matches = Address.find_similar('Jonson', 2)
+        self.assertEqual(matches[0]['address']['names'], ['BOB JOHNSON'])
+        self.assertGreater(matches[0]['score'], 0.3)
+        self.assertEqual(Address.find_similar('Qqqqq'), [])
+
+
+    def test_find_similar_forgets_the_words_of_deleted_addresses(self):
+        Address.delete(2)
+        self.assertEqual(Address.find_similar('Jonson'), [])
+        self.assertEqual([match['address']['addressNumber'] for match in Address.find_similar('Wiliams')], [12])
+        self.assertEqual([match['address']['position'] for match in Address.find_similar('Wiliams')], [2])
+
+
+class SQLiteFindSimilarTest(FindSimilarTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedFindSimilarTest(FindSimilarTest):
+    ENGINE = 'sharded'
+
+
+class SectionTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([self.new_address(number, number, section) for number, section in [(1, 1), (2, 1), (3, 2), (4, 2), (5, 2), (6, 3)]])
+
+
+    def test_sections_are_read_from_the_section_index(self):
+        self.assertEqual(Address.get_sections(), [1, 2, 3])
+        self.assertEqual(Address.get_section_bounds(2), (3, 5))
+        self.assertIsNone(Address.get_section_bounds(4))
+        self.assertEqual(Address.get_section_at(6), 3)
+        self.assertIsNone(Address.get_section_at(7))
+
+
+    def test_read_sections_returns_only_the_range(self):
+        self.assertEqual([address['addressNumber'] for address in Address.read_section(2)], [3, 4, 5])
+        self.assertEqual([address['addressNumber'] for address in Address.read_sections(2, 4)], [3, 4, 5, 6])
+        self.assertIsNone(Address.read_section(4))
+
+
+    def test_the_section_index_follows_inserts_and_deletes(self):
+        self.new_address(7, 3, 1).create()
+        Address.delete(7)
+        self.assertEqual(Address.get_section_bounds(1), (1, 3))
+        self.assertEqual(Address.get_section_bounds(2), (4, 6))
+        self.assertEqual([address['addressNumber'] for address in Address.read_section(1)], [1, 2, 7])
+
+
+class SQLiteSectionTest(SectionTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedSectionTest(SectionTest):
+    ENGINE = 'sharded'
+
+
+class PagingTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([self.new_address(number, number) for number in range(1, 8)])
+
+
+    '''
+    page_numbers() returns a tuple of the list of the addressNumber of every address on a page from read_page() and the page's cursor.
+    '''
+    @staticmethod
+    def page_numbers(page):
+        addresses, cursor = page
+        return ([address['addressNumber'] for address in addresses], cursor)
+
+
+    def test_read_range_reads_only_the_run(self):
+        self.assertEqual([address['addressNumber'] for address in Address.read_range(3, 3)], [3, 4, 5])
+        self.assertEqual([address['addressNumber'] for address in Address.read_range(6, 5)], [6, 7])
+        self.assertIsNone(Address.read_range(8, 1))
+
+
+    def test_the_pages_cover_the_address_book_once(self):
+        numbers, cursor = self.page_numbers(Address.read_page(None, 3))
+        self.assertEqual(numbers, [1, 2, 3])
+        numbers, cursor = self.page_numbers(Address.read_page(cursor, 3))
+        self.assertEqual(numbers, [4, 5, 6])
+        self.assertEqual(self.page_numbers(Address.read_page(cursor, 3)), ([7], None))
+
+
+    def test_the_cursor_follows_its_address_when_addresses_are_inserted_before_it(self):
+        numbers, cursor = self.page_numbers(Address.read_page(None, 3))
+        self.new_address(0, 1).create()
+        self.new_address(8, 2).create()
+        self.assertEqual(self.page_numbers(Address.read_page(cursor, 3))[0], [4, 5, 6])
+
+
+    def test_a_new_address_never_takes_over_the_cursor_of_a_deleted_one(self):
+        for position in (7, 6, 5):
+            Address.delete(position)
+        numbers, cursor = self.page_numbers(Address.read_page(None, 3))
+        Address.delete(4)
+        Address.delete(3)
+        self.new_address(8, 3).create()
+        self.assertEqual(self.page_numbers(Address.read_page(cursor, 3)), ([8], None))
+
+
+    def test_an_invalid_cursor_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Address.read_page('not a cursor', 3)
+
+
+class SQLitePagingTest(PagingTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedPagingTest(PagingTest):
+    ENGINE = 'sharded'
+
+
+class MoveTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([self.new_address(number, number) for number in range(1, 7)])
+
+
+    '''
+    move_by_update() moves the address at a position to a new position with update(), keeping its other fields, and returns the updated address.
+    '''
+    @staticmethod
+    def move_by_update(initialPosition, position):
+        address = Address(**Address.read_single(initialPosition))
+        address.position = position
+        return address.update(initialPosition)
+
+
+    def test_update_moves_the_address_and_keeps_its_record_id(self):
+        with Address.session() as store:
+            recordId = store.get_record_id_at(2)
+        self.assertEqual(self.move_by_update(2, 5)['position'], 4)
+        self.assertEqual(self.read_numbers(), [1, 3, 4, 2, 5, 6])
+        self.assertEqual(self.move_by_update(5, 1)['position'], 1)
+        self.assertEqual(self.read_numbers(), [5, 1, 3, 4, 2, 6])
+        with Address.session() as store:
+            self.assertEqual(store.get_record_position(recordId), 5)
+
+
+    def test_update_changing_the_names_updates_the_indexes(self):
+        Address(3, 'Main St', None, ['Dana White'], 3, 1, False, False, False).update(3)
+        self.assertEqual([found['position'] for found in Address.find(name = 'Dana White')], [3])
+        self.assertEqual(Address.find(name = 'Name 3'), [])
+
+
+class SQLiteMoveTest(MoveTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedMoveTest(MoveTest):
+    ENGINE = 'sharded'
+
+
+class MoveRangeTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([self.new_address(number, number) for number in range(1, 7)])
+
+
+    def test_move_range_moves_a_block_after_the_target(self):
+        self.assertEqual(Address.move_range(2, 3, 5), (4, 5))
+        self.assertEqual(self.read_numbers(), [1, 4, 5, 2, 3, 6])
+        self.assertEqual(Address.move_range(4, 5, 0), (1, 2))
+        self.assertEqual(self.read_numbers(), [2, 3, 1, 4, 5, 6])
+        self.assertEqual([found['position'] for found in Address.find(name = 'Name 1')], [3])
+
+
+    def test_reorder_puts_a_run_in_a_new_order(self):
+        self.assertEqual(Address.reorder([4, 2, 3]), (2, 4))
+        self.assertEqual(self.read_numbers(), [1, 4, 2, 3, 5, 6])
+        self.assertEqual([found['position'] for found in Address.find(name = 'Name 4')], [2])
+
+
+    def test_moves_keep_the_section_index_right(self):
+        Address.create_batch([self.new_address(7, 7, 2), self.new_address(8, 8, 2)])
+        self.assertEqual(Address.get_moved_section_runs(7, 8, 0), [[2, 2], [1, 6]])
+        Address.move_range(7, 8, 0)
+        self.assertEqual(Address.get_section_runs(), [[2, 2], [1, 6]])
+        Address.reorder([3, 1, 2])
+        self.assertEqual(Address.get_section_runs(), [[1, 1], [2, 2], [1, 5]])
+
+
+class SQLiteMoveRangeTest(MoveRangeTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedMoveRangeTest(MoveRangeTest):
+    ENGINE = 'sharded'
+
+
+'''
+CrossShardTest runs the moves and searches of the sharded engine on an address book of three sections, which are each in a shard of their own.
+'''
+class CrossShardTest(AddressBookTestCase):
+    ENGINE = 'sharded'
+
+    def setUp(self):
+        super().setUp()
+        Address.create_batch([self.new_address(number, number, (number + 2) // 3) for number in range(1, 10)])
+
+
+    '''
+    read_manifest() returns the manifest of the address book, which is the list of [shardId, count] pairs of every shard in route order.
+    '''
+    @staticmethod
+    def read_manifest():
+        with Address.session() as store:
+            return [list(pair) for pair in store.manifest]
+
+
+    def test_every_section_has_its_own_shard(self):
+        self.assertEqual([count for shardId, count in self.read_manifest()], [3, 3, 3])
+
+
+    def test_an_address_moved_to_another_section_moves_to_its_shard(self):
+        address = Address(**Address.read_single(2))
+        address.position = 8
+        address.section = 3
+        self.assertEqual(address.update(2)['position'], 7)
+        self.assertEqual(self.read_numbers(), [1, 3, 4, 5, 6, 7, 2, 8, 9])
+        self.assertEqual([count for shardId, count in self.read_manifest()], [2, 3, 4])
+        self.assertEqual([found['position'] for found in Address.find(name = 'Name 2')], [7])
+
+
+    def test_a_block_moved_across_shards_keeps_its_order(self):
+        self.assertEqual(Address.move_range(1, 2, 6), (5, 6))
+        self.assertEqual(self.read_numbers(), [3, 4, 5, 6, 1, 2, 7, 8, 9])
+        self.assertEqual(sum(count for shardId, count in self.read_manifest()), 9)
+        self.assertEqual([found['position'] for found in Address.find(street = 'Main St')], list(range(1, 10)))
+        Address.reorder([9, 8, 7, 6, 5, 4, 3, 2, 1])
+        self.assertEqual(self.read_numbers(), [9, 8, 7, 2, 1, 6, 5, 4, 3])
+        self.assertEqual([found['position'] for found in Address.find(name = 'Name 1')], [5])
+
+
+    def test_a_search_only_opens_the_shards_that_match(self):
+        manifest = self.read_manifest()
+        with Address.session() as store:
+            self.assertEqual([address.addressNumber for address in store.find_records(name = 'NAME 8')], [8])
+            self.assertEqual(list(store.shards), [manifest[2][0]])
+        with Address.session() as store:
+            self.assertEqual(store.find_records(name = 'NOBODY'), [])
+            self.assertEqual(store.count_shared_trigrams({' NA'}), {'NAME': 1})
+            self.assertEqual(list(store.shards), [])
+
+
+    def test_an_emptied_shard_is_dropped_from_the_index(self):
+        for position in (6, 5, 4):
+            Address.delete(position)
+        with Address.session() as store:
+            self.assertEqual(len(store.manifest), 2)
+            self.assertEqual(store.find_records(name = 'NAME 5'), [])
+            self.assertEqual(store.get_index_entry('word:5'), [])
+        self.assertEqual([found['position'] for found in Address.find(street = 'Main St')], [1, 2, 3, 4, 5, 6])
+
+
+'''
+WriteAmplificationTest measures the keys written and the peak memory of an insert near the end of the route, with the counting wrapper that benchmark.py uses, in address books of two sizes.
+'''
+class WriteAmplificationTest(AddressBookTestCase):
+    '''
+    measure_insert_near_end() builds an address book with a number of addresses and returns a tuple of the keys written and the peak memory of inserting an address 3 positions before its end.
+    '''
+    def measure_insert_near_end(self, size):
+        Address.DB_FILE = self.file_path(f"address_book_{size}.db")
+        benchmark.build_address_book(size)
+        section = Address.read_single(size - 2)['section']
+        return benchmark.measure_writes_and_memory(lambda: self.new_address(0, size - 2, section).create())
+
+
+    def test_an_insert_near_the_end_does_not_grow_with_the_address_book(self):
+        smallWrites, smallPeak = self.measure_insert_near_end(1000)
+        largeWrites, largePeak = self.measure_insert_near_end(10000)
+        self.assertEqual(largeWrites, smallWrites)
+        self.assertLess(largeWrites, 32)
+        self.assertLess(largePeak, smallPeak * 2)
+        self.assertEqual(Address.read_single(9998)['addressNumber'], 0)
+
+
+if (__name__ == '__main__'):
+    unittest.main()
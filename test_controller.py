@@ -0,0 +1,88 @@
+'''
+Tests for controller, run with 'python -m pytest' or 'python -m unittest' from the project directory.
+'''
+
+
+import unittest
+
+import controller
+from Address import Address
+from test_address import AddressBookTestCase
+
+
+'''
+CheckedAddressTest runs the checked creation and update, which the server uses, without a shared store open, so each one opens its own store for its exclusive session.
+The lock timeout is short, so a check that opened a second store and waited for the lock the session already holds fails quickly instead of hanging.
+'''
+class CheckedAddressTest(AddressBookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.oldLockTimeout = Address.LOCK_TIMEOUT
+        Address.LOCK_TIMEOUT = 0.5
+        Address.create_batch([self.new_address(1, 1), self.new_address(2, 2), self.new_address(3, 3, 2)])
+
+
+    def tearDown(self):
+        Address.LOCK_TIMEOUT = self.oldLockTimeout
+        super().tearDown()
+
+
+    '''
+    new_address_data() returns the data of an address for the controller, with a number, a position, and a section.
+    '''
+    @staticmethod
+    def new_address_data(addressNumber, position, section):
+        return {
+            'addressNumber': addressNumber,
+            'street':        'Main St',
+            'unit':          None,
+            'names':         [f"Name {addressNumber}"],
+            'position':      position,
+            'section':       section,
+            'isBusiness':    False,
+            'isCBU':         False,
+            'isVacant':      False,
+        }
+
+
+    def test_create_checked_address(self):
+        response = controller.create_checked_address(self.new_address_data(10, 3, 2))
+        self.assertTrue(response['success'], response)
+        self.assertEqual(response['result']['position'], 3)
+        self.assertEqual(self.read_numbers(), [1, 2, 10, 3])
+
+
+    def test_create_checked_address_rejects_a_section_out_of_place(self):
+        response = controller.create_checked_address(self.new_address_data(10, 2, 2))
+        self.assertEqual(response, {'success': False, 'errorType': 'INVALID_SECTION'})
+        self.assertEqual(self.read_numbers(), [1, 2, 3])
+
+
+    def test_update_checked_address(self):
+        response = controller.update_checked_address(self.new_address_data(20, 2, 1), 2)
+        self.assertTrue(response['success'], response)
+        self.assertEqual(self.read_numbers(), [1, 20, 3])
+
+
+    def test_update_checked_address_rejects_a_section_out_of_place(self):
+        response = controller.update_checked_address(self.new_address_data(20, 2, 2), 1)
+        self.assertEqual(response, {'success': False, 'errorType': 'INVALID_SECTION'})
+        self.assertEqual(self.read_numbers(), [1, 2, 3])
+
+
+    def test_update_checked_address_does_not_create_a_missing_address(self):
+        response = controller.update_checked_address(self.new_address_data(20, 4, 2), 4)
+        self.assertEqual(response, {'success': False, 'errorType': 'ADDRESS_NOT_FOUND'})
+        self.assertEqual(self.read_numbers(), [1, 2, 3])
+
+
+class SQLiteCheckedAddressTest(CheckedAddressTest):
+    ENGINE = 'sqlite'
+
+
+class ShardedCheckedAddressTest(CheckedAddressTest):
+    ENGINE = 'sharded'
+
+
+if (__name__ == '__main__'):
+    unittest.main()
@@ -0,0 +1,55 @@
+'''
+Tests for FileLock, run with 'python -m pytest' or 'python -m unittest' from the project directory.
+'''
+
+
+import os
+import tempfile
+import threading
+import unittest
+
+from FileLock import FileLock
+
+
+@unittest.skipUnless(FileLock.is_supported(), "This system has no file locking.")
+class WriterPreferenceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.directory.name, 'address_book.lock')
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def test_new_readers_wait_for_a_waiting_writer(self):
+        events = []
+        firstReader = FileLock(self.fileName)
+        firstReader.acquire(False)
+        def write():
+            writer = FileLock(self.fileName)
+            writer.acquire(True)
+            events.append('write')
+            writer.release()
+        def read():
+            reader = FileLock(self.fileName)
+            reader.acquire(False)
+            events.append('read')
+            reader.release()
+        writerThread = threading.Thread(target = write)
+        writerThread.start()
+        while (not FileLock.waitingWriters.get(self.fileName)):
+            writerThread.join(0.001)
+        readerThread = threading.Thread(target = read)
+        readerThread.start()
+        readerThread.join(0.1)
+        self.assertEqual(events, [])
+        firstReader.release()
+        writerThread.join()
+        readerThread.join()
+        self.assertEqual(events, ['write', 'read'])
+        self.assertEqual(FileLock.waitingWriters, {})
+
+
+if (__name__ == '__main__'):
+    unittest.main()
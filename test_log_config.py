@@ -0,0 +1,45 @@
+'''
+Tests for log_config, run with 'python -m pytest' or 'python -m unittest' from the project directory.
+'''
+
+
+import logging
+import unittest
+
+from log_config import RecordQueueHandler
+
+
+class RecordQueueHandlerTest(unittest.TestCase):
+    '''
+    new_record() returns a record of a message with its arguments, as a logger would pass it to its handlers.
+    '''
+    @staticmethod
+    def new_record(message, *arguments):
+        return logging.LogRecord('test', logging.INFO, __file__, 1, message, arguments, None)
+
+
+    def test_the_message_is_not_formatted_when_queued(self):
+        choice = 3
+        record = RecordQueueHandler(None).prepare(self.new_record("The user's choice is %s.", choice))
+        self.assertEqual(record.msg, "The user's choice is %s.")
+        self.assertIs(record.args[0], choice)
+        self.assertEqual(record.getMessage(), "The user's choice is 3.")
+
+
+    def test_changing_an_argument_after_it_is_queued_does_not_change_the_message(self):
+        addressData = {'addressNumber': 1, 'names': ['NAME 1']}
+        record = RecordQueueHandler(None).prepare(self.new_record("Created the address %s.", addressData))
+        addressData['names'].append('NAME 2')
+        addressData['addressNumber'] = 2
+        self.assertEqual(record.getMessage(), "Created the address {'addressNumber': 1, 'names': ['NAME 1']}.")
+
+
+    def test_changing_a_mapping_argument_after_it_is_queued_does_not_change_the_message(self):
+        addressData = {'street': 'MAIN ST'}
+        record = RecordQueueHandler(None).prepare(self.new_record("The street is %(street)s.", addressData))
+        addressData['street'] = 'ELSEWHERE'
+        self.assertEqual(record.getMessage(), "The street is MAIN ST.")
+
+
+if (__name__ == '__main__'):
+    unittest.main()
@@ -0,0 +1,60 @@
+'''
+Tests for Metrics, run with 'python -m pytest' or 'python -m unittest' from the project directory.
+'''
+
+
+import threading
+import unittest
+
+from Metrics import Metrics
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.oldEnabled = Metrics.enabled
+        Metrics.enable()
+        Metrics.reset()
+
+
+    def tearDown(self):
+        Metrics.reset()
+        Metrics.enable(self.oldEnabled)
+
+
+    def test_counts_from_every_thread_are_added_up(self):
+        def count_keys():
+            for _ in range(10000):
+                Metrics.count('shelfKeysRead')
+        threads = [threading.Thread(target = count_keys) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        count_keys()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(Metrics.snapshot()['counters'], {'shelfKeysRead': 50000})
+
+
+    def test_an_operation_is_only_charged_for_its_own_thread(self):
+        started = threading.Event()
+        counted = threading.Event()
+        def count_in_another_thread():
+            started.wait()
+            Metrics.count('shelfKeysRead', 100)
+            counted.set()
+        @Metrics.timed
+        def operation():
+            Metrics.count('shelfKeysRead')
+            started.set()
+            counted.wait()
+        thread = threading.Thread(target = count_in_another_thread)
+        thread.start()
+        operation()
+        thread.join()
+        snapshot = Metrics.snapshot()
+        self.assertEqual(snapshot['counters'], {'shelfKeysRead': 101})
+        operationStats = next(iter(snapshot['operations'].values()))
+        self.assertEqual(operationStats['countersPerCall'], {'shelfKeysRead': 1})
+
+
+if (__name__ == '__main__'):
+    unittest.main()
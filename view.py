@@ -14,8 +14,12 @@ academic integrity.
 
 '''
     This program is an API where the user can create, read, update, and delete from a database of addresses.
-    This database is stored on a .db file using the shelve module.
-    The addresses are stored in the address book using their position number as the key, and they are kept in the order of the position on the route.
+    By default, this database is stored on a .db file using the shelve module, where the addresses are stored under stable record ids and a separate order index keeps them in the order of the position on the route.
+    Setting the ADDRESS_BOOK_ENGINE environment variable to 'sqlite' stores it in an SQLite database instead, or to 'sharded' splits it by section into a separate shelve file for each section, and migrate.py copies an existing address book from one engine to another.
+    server.py serves the same address book to other programs as an HTTP/JSON API, and load_test.py measures how fast it answers.
+    Every change is first saved to a journal next to the address book, so a change that is cut off by a crash is never half saved, and the journal is written into the address book file once it grows large.
+    The time each operation takes and the storage work it does can be collected by setting the ADDRESS_BOOK_METRICS environment variable to 1 or from the menu, and shown and saved to a JSON file with the performance statistics option.
+    Everything is logged to logFile.txt by default, and setting the ADDRESS_BOOK_LOG_LEVEL environment variable to INFO, WARNING, or OFF logs less, which makes every operation faster.
     Each address is stored as an Address object which has properties that contain the values of the address's attributes.
     This program supports optional attributes, attributes of various types, list attributes, and different constraints for each attribute.
     The program follows the MVC (Model View Controller) convention and is thus split into 3 files accordingly. This helps with separation of concerns and controlled access to the database.
@@ -26,13 +30,10 @@ academic integrity.
 import sys
 import os
 import logging
+import log_config
 
-# Logging configuration
-''' Format example:
-myFile.py   at line 17  (DEBUG):
-    lookup_address()    -   No address was found at position 7.
-'''
-logging.basicConfig(filename='logFile.txt', level=logging.DEBUG, format='%(filename)s\tat line %(lineno)s\t(%(levelname)s):\n\t%(funcName)s()\t-\t%(message)s\n')
+# Logging configuration, which records everything by default and is written to the log file by a background thread (see log_config.py for the ADDRESS_BOOK_LOG_LEVEL setting)
+log_config.configure_logging(logging.DEBUG)
 
 # Imports for custom modules
 try:
@@ -42,6 +43,13 @@ except:
     print("controller.py is missing! Program will now exit. (Please ensure you have controller.py in the same directory as this python script.)")
     logging.critical("controller.py is missing! Program will now exit. (Please ensure you have controller.py in the same directory as this python script.)")
     sys.exit(1)
+try:
+    import exporter
+    logging.debug("exporter.py loaded successfully.")
+except:
+    print("exporter.py is missing! Program will now exit. (Please ensure you have exporter.py in the same directory as this python script.)")
+    logging.critical("exporter.py is missing! Program will now exit. (Please ensure you have exporter.py in the same directory as this python script.)")
+    sys.exit(1)
 
 
 # Classes
@@ -58,7 +66,7 @@ class Field:
         self.viewValidator = viewValidator
         self.controllerValidator = controllerValidator
         self.isRequired = isRequired
-        logging.info(f"Created field object with properties:\n\t\tkey: {key}\n\t\tprompt: {prompt}\n\t\tdataType: {dataType}\n\t\tviewValidator: {viewValidator}\n\t\tcontrollerValidator: {controllerValidator}\n\t\tisRequired: {isRequired}")
+        logging.info("Created field object with properties:\n\t\tkey: %s\n\t\tprompt: %s\n\t\tdataType: %s\n\t\tviewValidator: %s\n\t\tcontrollerValidator: %s\n\t\tisRequired: %s", key, prompt, dataType, viewValidator, controllerValidator, isRequired)
 
 
 # Global variables
@@ -83,7 +91,11 @@ Please type a number corresponding to the following options:
 2 - Create a new address entry
 3 - Update an existing address entry
 4 - Delete an existing address entry
-5 - Exit program
+5 - Export address entries to a file
+6 - Search for address entries by resident name or street
+7 - Read address entries one section at a time
+8 - Show performance statistics
+9 - Exit program
 >>> ''',
     'BEGIN_CREATE':             "You have chosen to create a new address entry. (If at any time you would like to cancel the creation, enter -1.)",
     'BEGIN_UPDATE':             "You have chosen to update an existing address entry. (If at any time you would like to cancel the update, enter -1. If you would like to leave the address's field unchanged, enter -2.)",
@@ -94,6 +106,25 @@ Please type a number corresponding to the following options:
     'CANCEL_DELETE':            "The deletion was cancelled.",
     'CONFIRM_DELETE':           "Are you sure you want to delete this entry? (y/n): >>> ",
     'CONFIRM_EXIT':             "Are you sure you want to exit? (y/n): >>> ",
+    'NEXT_PAGE':                "Press the enter key to see more address entries, or enter -1 to stop: >>> ",
+    'CHOOSE_EXPORT_FILE':       "Please enter the name of the file to export to, ending in .csv for a CSV file or anything else for a JSON lines file (enter -1 to cancel): >>> ",
+    'CANCEL_EXPORT':            "The export was cancelled.",
+    'ADDRESSES_EXPORTED':       "Number of address entries exported:",
+    'CHOOSE_SEARCH_TEXT':       "Please enter a resident name or street to search for, even if you are unsure of the spelling (enter -1 to cancel): >>> ",
+    'CANCEL_SEARCH':            "The search was cancelled.",
+    'MATCH_SCORE':              "Match score:",
+    'CHOOSE_FIRST_SECTION':     "Please enter the section number to start at, or press the enter key to start at the first section (enter -1 to cancel): >>> ",
+    'CANCEL_SECTIONS':          "The section read was cancelled.",
+    'SECTION_HEADER':           "Section",
+    'NEXT_SECTION':             "Press the enter key to see the next section, or enter -1 to stop: >>> ",
+    'CONFIRM_INSTRUMENTATION':  "Performance statistics are not being collected. Would you like to start collecting them? (y/n): >>> ",
+    'INSTRUMENTATION_ENABLED':  "Performance statistics are now being collected. Choose this option again to see them.",
+    'NO_STATS':                 "No operations have been timed yet.",
+    'OPERATIONS_HEADER':        f"{'Operation':<42}{'Calls':>8}{'Mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'Max ms':>10}",
+    'COUNTERS_HEADER':          "Storage counters:",
+    'LOCK_STATS_HEADER':        "File lock:",
+    'CHOOSE_STATS_FILE':        "Please enter the name of a JSON file to save the statistics to, or press the enter key to go back: >>> ",
+    'STATS_SAVED':              "Statistics saved to",
     'ADDRESS_CREATED':          "Address created:",
     'ADDRESS_UPDATED':          "Address updated:",
     'ADDRESS_DELETED':          "Address Deleted:",
@@ -106,8 +137,15 @@ errorOutputs = {
     'MISSING_FIELD':        "A field is missing data!",
     'INVALID_INPUT':        "That is not a valid input. Please try again.",
     'INVALID_SECTION':      "The section number is invalid because it is not within the sections of the address before or after it.",
+    'EXPORT_FAILED':        "The file could not be written! Please check the file name and try again.",
+    'NO_MATCHES':           "No address entries match what you searched for.",
+    'SECTION_NOT_FOUND':    "There are no address entries in that section! Please try again.",
+    'ADDRESS_BOOK_BUSY':    "The address book is being changed by another user right now! Please try again in a moment.",
 }
 
+# PAGE_SIZE is the number of address entries printed at a time before asking to continue, when the output is a terminal.
+PAGE_SIZE = 20
+
 # This is where the properties for each of the fields/attributes/columns for the table in the database are defined.
 addressFields = [
     Field(
@@ -188,37 +226,121 @@ addressFields = [
 # Functions
 
 '''
-print_all_addresses() prints a formatted version of the entire address book to the console.
+print_all_addresses() prints a formatted version of the entire address book to the console, one page of pageSize addresses at a time.
+It takes an optional int for pageSize, and when the output is a terminal, it asks whether to continue after every page, so the user can stop early.
+Each page is read with controller.read_page() in its own short operation, so the address book is not locked while waiting for the user, and other processes can change it in between pages.
 If the address book is empty or the read fails for some other reason, then a relevant error message is printed to the console.
 '''
-def print_all_addresses():
+def print_all_addresses(pageSize = PAGE_SIZE):
     logging.debug("Beginning function execution.")
-    addressesRead = controller.read_all_addresses()
-    if (addressesRead['success']):
-        logging.info("Since the addresses read was a success, returning True.")
-        print(output_address_book(addressesRead['result']))
-        return True
-    else:
-        logging.warning(f"Since the addresses read was a failure, returning False. Error info: {errorOutputs[addressesRead['errorType']]}")
-        print(errorOutputs[addressesRead['errorType']])
+    isPaging = bool(pageSize) and sys.stdout.isatty()
+    pageRead = controller.read_page(None, pageSize or PAGE_SIZE)
+    if (not pageRead['success']):
+        logging.warning("Since the addresses read was a failure, returning False. Error info: %s", errorOutputs[pageRead['errorType']])
+        print(errorOutputs[pageRead['errorType']])
         return False
+    logging.info("Since the addresses read was a success, printing each page of addresses and returning True.")
+    while (True):
+        for addressString in output_address_book(pageRead['result']['addresses']):
+            print(addressString)
+        cursor = pageRead['result']['nextCursor']
+        if (cursor is None):
+            break
+        if (isPaging and (input(outputStrings['NEXT_PAGE']).strip() == inputCodes['CANCEL'])):
+            logging.debug("The user chose to stop printing the address book.")
+            break
+        pageRead = controller.read_page(cursor, pageSize or PAGE_SIZE)
+        if (not pageRead['success']):
+            logging.info("Since the rest of the address book was deleted while the user was reading it, stopping.")
+            break
+    return True
+
+
+'''
+print_sections() prints the address book one section at a time, starting at a section chosen by the user and asking whether to continue before each following section.
+Only the addresses of the section being printed are read.
+If the address book is empty, the user cancels, or the chosen section does not exist, then a relevant message is printed to the console.
+'''
+def print_sections():
+    logging.debug("Beginning function execution.")
+    sectionsRead = controller.read_section_numbers()
+    if (not sectionsRead['success']):
+        logging.warning("Since the section numbers read was a failure, returning. Error info: %s", errorOutputs[sectionsRead['errorType']])
+        print(errorOutputs[sectionsRead['errorType']])
+        return
+    sections = sectionsRead['result']
+    sectionInput = input(outputStrings['CHOOSE_FIRST_SECTION']).strip()
+    if (sectionInput == inputCodes['CANCEL']):
+        logging.debug("The user has cancelled the section read.")
+        print(outputStrings['CANCEL_SECTIONS'])
+        return
+    firstSection = convert_input(sectionInput, int) if sectionInput else sections[0]
+    if (firstSection not in sections):
+        logging.info("Since section %s does not exist, returning.", firstSection)
+        print(errorOutputs['SECTION_NOT_FOUND'])
+        return
+    for index in range(sections.index(firstSection), len(sections)):
+        sectionRead = controller.read_section(sections[index])
+        if (not sectionRead['success']):
+            logging.warning("The section read was a failure. Error info: %s", errorOutputs[sectionRead['errorType']])
+            print(errorOutputs[sectionRead['errorType']])
+            return
+        print(outputStrings['SECTION_HEADER'], sections[index])
+        for addressString in output_address_book(sectionRead['result']):
+            print(addressString)
+        if ((index < (len(sections) - 1)) and (input(outputStrings['NEXT_SECTION']).strip() == inputCodes['CANCEL'])):
+            logging.debug("The user chose to stop reading the sections.")
+            return
+
+
+'''
+print_stats() prints the timings of each operation and the storage counters collected in this session, and offers to save them to a JSON file.
+If the statistics are not being collected, it asks whether to start collecting them instead.
+'''
+def print_stats():
+    logging.debug("Beginning function execution.")
+    stats = controller.read_stats()['result']
+    if (not stats['enabled']):
+        if (input(outputStrings['CONFIRM_INSTRUMENTATION']).strip().upper() == 'Y'):
+            logging.debug("The user chose to start collecting performance statistics.")
+            controller.set_instrumentation(True)
+            print(outputStrings['INSTRUMENTATION_ENABLED'])
+        return
+    if (not stats['operations']):
+        print(outputStrings['NO_STATS'])
+    else:
+        print(outputStrings['OPERATIONS_HEADER'])
+        for name, operation in stats['operations'].items():
+            print(f"{name:<42}{operation['calls']:>8}{operation['meanMs']:>10.2f}{operation['p50Ms']:>10.2f}{operation['p99Ms']:>10.2f}{operation['maxMs']:>10.2f}")
+            if (operation['countersPerCall']):
+                print('    ' + ', '.join(f"{counter} {value:.1f}" for counter, value in operation['countersPerCall'].items()))
+    print(outputStrings['COUNTERS_HEADER'])
+    for counter, value in stats['counters'].items():
+        print(f"    {counter:<22}{value:>12}")
+    print(outputStrings['LOCK_STATS_HEADER'])
+    for stat, value in stats['lockStats'].items():
+        print(f"    {stat:<22}{value:>12.3f}" if isinstance(value, float) else f"    {stat:<22}{value:>12}")
+    fileName = input(outputStrings['CHOOSE_STATS_FILE']).strip()
+    if ((not fileName) or (fileName == inputCodes['CANCEL'])):
+        return
+    statsSave = controller.save_stats(fileName)
+    if (statsSave['success']):
+        print(outputStrings['STATS_SAVED'], fileName)
+    else:
+        logging.warning("The statistics save was a failure. Error info: %s", errorOutputs[statsSave['errorType']])
+        print(errorOutputs[statsSave['errorType']])
 
 
 '''
-output_address_book() returns a formatted string containing the data for all of the addresses in the address book.
-If the address book is empty, it simply returns an empty dictionary.
-It receives a list of dictionaries where each dictionary contains the data for an address in the address book.
+output_address_book() is a generator that yields a formatted string for each address in the address book, followed by a separator line.
+It receives an iterable of dictionaries for addressesData, where each dictionary contains the data for an address in the address book.
+Since it formats one address at a time, the address book never has to be held in memory as one string.
 '''
 def output_address_book(addressesData):
     logging.debug("Beginning function execution.")
-    if (not addressesData):
-        return {}
     separator = '-' * 50
-    addressBookString = ''
     for address in addressesData:
-        addressBookString += output_address(address)
-        addressBookString += '\n' + separator + '\n'
-    return addressBookString
+        yield output_address(address) + '\n' + separator
 
 
 '''
@@ -252,20 +374,20 @@ def get_existing_address_choice():
     logging.debug("Beginning function execution.")
     while True:
         choice = input(outputStrings['CHOOSE_EXISTING_ADDRESS'])
-        logging.info(f"User input: {choice}")
+        logging.info("User input: %s", choice)
         if (choice.upper() == inputCodes['CANCEL']):
             logging.info("User entered the cancel code - returning None to cancel the operation.")
             return None
         try:
             choice = int(choice)
         except ValueError as err:
-            logging.warning(f"Restarting input loop since an error occurred when attempting to convert {choice} to an int: {err}")
+            logging.warning("Restarting input loop since an error occurred when attempting to convert %s to an int: %s", choice, err)
             print(errorOutputs['INVALID_INPUT'])
             continue
         if (controller.read_single_address(choice)['success']):
-            logging.info(f"The address entry was found, so returning {choice}.")
+            logging.info("The address entry was found, so returning %s.", choice)
             return choice
-        logging.debug(f"No address entry was found at {choice}, so restarting loop.")
+        logging.debug("No address entry was found at %s, so restarting loop.", choice)
         print(errorOutputs['ADDRESS_NOT_FOUND'])
 
 
@@ -281,17 +403,17 @@ def get_input_for_address_create():
     for field in addressFields:
         while True:
             userInput = get_input_for_field(field)
-            logging.info(f"userInput is {userInput}")
+            logging.info("userInput is %s", userInput)
             if ((isinstance(userInput, str)) and (userInput.upper() == inputCodes['CANCEL'])):
-                logging.info(f"User entered the cancel code - returning None to cancel the creation.")
+                logging.info("User entered the cancel code - returning None to cancel the creation.")
                 return None
             validInput = True
             if ((not userInput) and (not field.isRequired)):
-                logging.debug(f"Since userInput is empty, and this field is not required, setting {field.key} to None and moving on to the next field.")
+                logging.debug("Since userInput is empty, and this field is not required, setting %s to None and moving on to the next field.", field.key)
                 data[field.key] = None
                 break
             userInput = convert_input(userInput, field.dataType)
-            logging.info(f"Result of calling convert_input(): {userInput}")
+            logging.info("Result of calling convert_input(): %s", userInput)
             if (userInput is None):
                 logging.debug("userInput could not be converted, so setting validInput to False.")
                 validInput = False
@@ -302,14 +424,14 @@ def get_input_for_address_create():
                 logging.debug("Since the userInput was not valid, restarting input loop.")
                 print(errorOutputs['INVALID_INPUT'])
                 continue
-            logging.info(f"Setting {field.key} to {userInput}.")
+            logging.info("Setting %s to %s.", field.key, userInput)
             data[field.key] = userInput
             break
     data = validate_context(data, method = 'create')
     if (isinstance(data, str) and (data.upper() == inputCodes['CANCEL'])):
-        logging.info(f"User entered the cancel code - returning None to cancel the creation.")
+        logging.info("User entered the cancel code - returning None to cancel the creation.")
         return None
-    logging.info(f"Final result of data after calling validate_context(): {data}")
+    logging.info("Final result of data after calling validate_context(): %s", data)
     return data
 
 
@@ -322,11 +444,11 @@ If the user decides to cancel the creation, it returns None.
 If by some chance the positionToUpdate does not match an existing address entry, then it returns False.
 '''
 def get_input_for_address_update(positionToUpdate):
-    logging.debug(f"Beginning function execution with positionToUpdate = {positionToUpdate}.")
+    logging.debug("Beginning function execution with positionToUpdate = %s.", positionToUpdate)
     try:
             positionToUpdate = int(positionToUpdate)
     except ValueError as err:
-        logging.warning(f"Returning False since an error occurred when attempting to convert {positionToUpdate} to an int: {err}")
+        logging.warning("Returning False since an error occurred when attempting to convert %s to an int: %s", positionToUpdate, err)
         print(errorOutputs['INVALID_INPUT'])
         return False
     findAddressToUpdate = controller.read_single_address(positionToUpdate)
@@ -334,11 +456,11 @@ def get_input_for_address_update(positionToUpdate):
         logging.debug("Since the address to update was not found, returning False")
         return False
     data = findAddressToUpdate['result']
-    logging.info(f"Current information of the address that is about to be updated: {data}")
+    logging.info("Current information of the address that is about to be updated: %s", data)
     for field in addressFields:
         while True:
             userInput = get_input_for_field(field)
-            logging.info(f"userInput is {userInput}")
+            logging.info("userInput is %s", userInput)
             if ((isinstance(userInput, str)) and (userInput.upper() == inputCodes['CANCEL'])):
                 logging.info("User entered the cancel code - returning None to cancel the update.")
                 return None
@@ -347,11 +469,11 @@ def get_input_for_address_update(positionToUpdate):
                 break
             validInput = True
             if ((not userInput) and (not field.isRequired)):
-                logging.debug(f"Since userInput is empty, and this field is not required, setting {field.key} to None and moving on to the next field.")
+                logging.debug("Since userInput is empty, and this field is not required, setting %s to None and moving on to the next field.", field.key)
                 data[field.key] = None
                 break
             userInput = convert_input(userInput, field.dataType)
-            logging.info(f"Result of calling convert_input(): {userInput}")
+            logging.info("Result of calling convert_input(): %s", userInput)
             if (userInput is None):
                 logging.debug("userInput could not be converted, so setting validInput to False.")
                 validInput = False
@@ -362,14 +484,14 @@ def get_input_for_address_update(positionToUpdate):
                 logging.debug("Since the userInput was not valid, restarting input loop.")
                 print(errorOutputs['INVALID_INPUT'])
                 continue
-            logging.info(f"Setting {field.key} to {userInput}.")
+            logging.info("Setting %s to %s.", field.key, userInput)
             data[field.key] = userInput
             break
     data = validate_context(data, method = 'update', initialPosition = positionToUpdate)
     if (isinstance(data, str) and (data.upper() == inputCodes['CANCEL'])):
-        logging.info(f"User entered the cancel code - returning None to cancel the creation.")
+        logging.info("User entered the cancel code - returning None to cancel the creation.")
         return None
-    logging.info(f"Final result of data after calling validate_context(): {data}")
+    logging.info("Final result of data after calling validate_context(): %s", data)
     return data
 
 
@@ -381,13 +503,13 @@ It also checks for the inputCodes that the user may input.
 It returns the user's input, but it does not validate the input since that is the job of a separate function.
 '''
 def get_input_for_field(field):
-    logging.debug(f"Beginning function execution with field = {field}.")
+    logging.debug("Beginning function execution with field = %s.", field)
     if (isinstance(field.dataType, tuple)):
-        logging.debug(f"{field}'s data type is list, so getting input for a list.")
+        logging.debug("%s's data type is list, so getting input for a list.", field)
         userInput = []
         while True:
             item = input(field.prompt)
-            logging.info(f"User input for the list item: {item}")
+            logging.info("User input for the list item: %s", item)
             if (item == ''):
                 logging.debug("Since the user entered an empty string, assume they are done entering inputs for the list and break from input loop.")
                 break
@@ -396,13 +518,13 @@ def get_input_for_field(field):
                 logging.info("Since the user entered a value that matches either the code for CANCEL or SKIP, returning the code they entered to signal to the calling function their intention.")
                 return item
             userInput.append(item)
-            logging.info(f"The input list is now {userInput}")
+            logging.info("The input list is now %s", userInput)
     else:
-        logging.debug(f"{field}'s data type is not a list, so getting input for a single value.")
+        logging.debug("%s's data type is not a list, so getting input for a single value.", field)
         userInput = input(field.prompt)
-        logging.info(f"User input for {field} is {userInput}")
+        logging.info("User input for %s is %s", field, userInput)
         userInput = userInput.strip()
-    logging.info(f"Returning {userInput}")
+    logging.info("Returning %s", userInput)
     return userInput
 
 
@@ -416,9 +538,9 @@ If it fails to convert the userInput, then it returns None.
 Otherwise, it returns the converted userInput.
 '''
 def convert_input(userInput, dataType):
-    logging.debug(f"Beginning function execution with userInput = {userInput}, dataType = {dataType}.")
+    logging.debug("Beginning function execution with userInput = %s, dataType = %s.", userInput, dataType)
     if not (isinstance(dataType, type) or (isinstance(dataType, tuple) and len(dataType) == 2 and isinstance(dataType[0], type) and issubclass(dataType[0], list) and isinstance(dataType[1], type))):
-        logging.warning(f"Returning None since the argument for dataType, {dataType}, was invalid.")
+        logging.warning("Returning None since the argument for dataType, %s, was invalid.", dataType)
         return None
     try:
         if (isinstance(dataType, tuple)):
@@ -441,9 +563,9 @@ def convert_input(userInput, dataType):
             logging.debug("Data type is not list or bool.")
             newInput = dataType(userInput)
     except ValueError as err:
-        logging.warning(f"Returning None since an error occurred when attempting to convert {userInput} to the datatype {dataType}: {err}")
+        logging.warning("Returning None since an error occurred when attempting to convert %s to the datatype %s: %s", userInput, dataType, err)
         return None
-    logging.info(f"Returning {newInput}")
+    logging.info("Returning %s", newInput)
     return newInput
 
 
@@ -453,7 +575,7 @@ It takes a Field object for the field, and the value for userInput is assumed to
 If any of the validators fail, it returns False, otherwise it returns True.
 '''
 def validate_field(field, userInput):
-    logging.debug(f"Beginning function execution with field = {field}, userInput = {userInput}.")
+    logging.debug("Beginning function execution with field = %s, userInput = %s.", field, userInput)
     if (field.viewValidator and not field.viewValidator(userInput)):
         logging.info("Since the view validator exists, and it failed to validate the input, returning False.")
         return False
@@ -475,7 +597,7 @@ If the user enters the inputCode for cancel, then it returns the cancel code ins
 It returns the dictionary containing the data for the address entry once the input finally passes the context validation.
 '''
 def validate_context(data, method = 'create', initialPosition = None):
-    logging.debug(f"Beginning function execution with data = {data}, method = {method}, initialPosition = {initialPosition}.")
+    logging.debug("Beginning function execution with data = %s, method = %s, initialPosition = %s.", data, method, initialPosition)
     for field in addressFields:
         if (field.key == 'section'):
             logging.debug("Section field was located.")
@@ -497,7 +619,7 @@ def validate_context(data, method = 'create', initialPosition = None):
         if (sectionInput.upper() == inputCodes['CANCEL']):
             logging.info("Since the user entered a value that matches the code for CANCEL, returning the code they entered to signal to the calling function their intention.")
             return sectionInput
-        logging.info(f"User input: {sectionInput}")
+        logging.info("User input: %s", sectionInput)
         sectionInput = convert_input(sectionInput, sectionField.dataType)
         if (not sectionInput):
             logging.debug("User entered an input that could not be converted, so restart input loop.")
@@ -526,107 +648,150 @@ def clear_console():
 
 # Beginning execution of main program
 logging.debug("Beginning main program execution.")
+controller.open_address_book() # Keep the address book open for the whole session instead of reopening it for every operation
 print(outputStrings['INTRODUCTION'])
 while (True):
+    controller.checkpoint_if_needed() # The journal is checkpointed while waiting for the user's choice, so no operation has to wait for it
     choice = input(outputStrings['MENU']).strip()
-    logging.info(f"The user's choice is {choice}.")
-    match choice:
-        case '1': # Read address entries
-            logging.debug("The user chose to read the address entries.")
-            print_all_addresses()
-        case '2': # Create a new address entry
-            logging.debug("The user chose to create a new address entry.")
-            clear_console()
-            print(outputStrings['BEGIN_CREATE'])
-            addressData = get_input_for_address_create()
-            logging.info(f"The address data received from the creation is: {addressData}")
-            if (not addressData):
-                logging.debug("Since the user decided to cancel the creation, restarting main loop.")
-                print(outputStrings['CANCEL_CREATE'])
-                continue
-            addressCreate = controller.create_address(addressData)
-            if (addressCreate['success']):
-                logging.debug("The address creation was a success.")
-                print(outputStrings['ADDRESS_CREATED'])
-                print(output_address(addressCreate['result']))
-            else:
-                logging.warning(f"The address creation was a failure. Error info: {errorOutputs[addressCreate['errorType']]}")
-                print(errorOutputs[addressCreate['errorType']])
-        case '3': # Update an existing address entry
-            logging.debug("The user chose to update an existing address entry.")
-            clear_console()
-            addressBookRead = print_all_addresses()
-            if (not addressBookRead):
-                logging.debug("The address book read was a failure.")
-                continue
-            print(outputStrings['BEGIN_UPDATE'])
-            positionToUpdate = get_existing_address_choice()
-            logging.info(f"The position to update is {positionToUpdate}.")
-            if (not positionToUpdate):
-                logging.debug("The user has cancelled the update, so restarting main loop.")
-                print(outputStrings['CANCEL_UPDATE'])
-                continue
-            clear_console()
-            findAddressToUpdate = controller.read_single_address(positionToUpdate)
-            if (findAddressToUpdate['success'] == False):
-                logging.warning(f"The address to update was not able to be found. Error info: {errorOutputs[findAddressToUpdate['errorType']]}")
-                print(errorOutputs[findAddressToUpdate['errorType']])
-                continue
-            print(output_address(findAddressToUpdate['result']))
-            addressData = get_input_for_address_update(positionToUpdate)
-            if (not addressData):
-                logging.debug("The user has cancelled the update, so restarting main loop.")
-                print(outputStrings['CANCEL_UPDATE'])
-                continue
-            addressUpdate = controller.update_address(addressData, positionToUpdate)
-            if (addressUpdate['success']):
-                logging.debug("The address update was a success.")
-                print(outputStrings['ADDRESS_UPDATED'])
-                print(output_address(addressUpdate['result']))
-            else:
-                logging.warning(f"The address update was a failure. Error info: {errorOutputs[addressUpdate['errorType']]}")
-                print(errorOutputs[addressUpdate['errorType']])
-        case '4': # Delete an existing address entry
-            logging.debug("The user chose to delete an existing address entry.")
-            clear_console()
-            addressBookRead = print_all_addresses()
-            if (not addressBookRead):
-                logging.debug("The address book read was a failure.")
-                continue
-            print(outputStrings['BEGIN_DELETE'])
-            positionToDelete = get_existing_address_choice()
-            logging.info(f"The position to delete is {positionToDelete}.")
-            if (not positionToDelete):
-                logging.debug("The user has cancelled the deletion, so restarting main loop.")
-                print(outputStrings['CANCEL_DELETE'])
-                continue
-            findAddressToDelete = controller.read_single_address(positionToDelete)
-            if (findAddressToDelete['success'] == False):
-                logging.warning(f"The address to delete was not able to be found. Error info: {errorOutputs[findAddressToDelete['errorType']]}")
-                print(errorOutputs[findAddressToDelete['errorType']])
-                continue
-            print(output_address(findAddressToDelete['result']))
-            confirmation = input(outputStrings['CONFIRM_DELETE'])
-            if (not (confirmation.upper() == 'Y')):
-                logging.debug("The user has cancelled the deletion, so restarting main loop.")
-                print(outputStrings['CANCEL_DELETE'])
+    logging.info("The user's choice is %s.", choice)
+    try:
+        match choice:
+            case '1': # Read address entries
+                logging.debug("The user chose to read the address entries.")
+                print_all_addresses()
+            case '2': # Create a new address entry
+                logging.debug("The user chose to create a new address entry.")
+                clear_console()
+                print(outputStrings['BEGIN_CREATE'])
+                addressData = get_input_for_address_create()
+                logging.info("The address data received from the creation is: %s", addressData)
+                if (not addressData):
+                    logging.debug("Since the user decided to cancel the creation, restarting main loop.")
+                    print(outputStrings['CANCEL_CREATE'])
+                    continue
+                addressCreate = controller.create_address(addressData)
+                if (addressCreate['success']):
+                    logging.debug("The address creation was a success.")
+                    print(outputStrings['ADDRESS_CREATED'])
+                    print(output_address(addressCreate['result']))
+                else:
+                    logging.warning("The address creation was a failure. Error info: %s", errorOutputs[addressCreate['errorType']])
+                    print(errorOutputs[addressCreate['errorType']])
+            case '3': # Update an existing address entry
+                logging.debug("The user chose to update an existing address entry.")
+                clear_console()
+                addressBookRead = print_all_addresses()
+                if (not addressBookRead):
+                    logging.debug("The address book read was a failure.")
+                    continue
+                print(outputStrings['BEGIN_UPDATE'])
+                positionToUpdate = get_existing_address_choice()
+                logging.info("The position to update is %s.", positionToUpdate)
+                if (not positionToUpdate):
+                    logging.debug("The user has cancelled the update, so restarting main loop.")
+                    print(outputStrings['CANCEL_UPDATE'])
+                    continue
+                clear_console()
+                findAddressToUpdate = controller.read_single_address(positionToUpdate)
+                if (findAddressToUpdate['success'] == False):
+                    logging.warning("The address to update was not able to be found. Error info: %s", errorOutputs[findAddressToUpdate['errorType']])
+                    print(errorOutputs[findAddressToUpdate['errorType']])
+                    continue
+                print(output_address(findAddressToUpdate['result']))
+                addressData = get_input_for_address_update(positionToUpdate)
+                if (not addressData):
+                    logging.debug("The user has cancelled the update, so restarting main loop.")
+                    print(outputStrings['CANCEL_UPDATE'])
+                    continue
+                addressUpdate = controller.update_address(addressData, positionToUpdate)
+                if (addressUpdate['success']):
+                    logging.debug("The address update was a success.")
+                    print(outputStrings['ADDRESS_UPDATED'])
+                    print(output_address(addressUpdate['result']))
+                else:
+                    logging.warning("The address update was a failure. Error info: %s", errorOutputs[addressUpdate['errorType']])
+                    print(errorOutputs[addressUpdate['errorType']])
+            case '4': # Delete an existing address entry
+                logging.debug("The user chose to delete an existing address entry.")
+                clear_console()
+                addressBookRead = print_all_addresses()
+                if (not addressBookRead):
+                    logging.debug("The address book read was a failure.")
+                    continue
+                print(outputStrings['BEGIN_DELETE'])
+                positionToDelete = get_existing_address_choice()
+                logging.info("The position to delete is %s.", positionToDelete)
+                if (not positionToDelete):
+                    logging.debug("The user has cancelled the deletion, so restarting main loop.")
+                    print(outputStrings['CANCEL_DELETE'])
+                    continue
+                findAddressToDelete = controller.read_single_address(positionToDelete)
+                if (findAddressToDelete['success'] == False):
+                    logging.warning("The address to delete was not able to be found. Error info: %s", errorOutputs[findAddressToDelete['errorType']])
+                    print(errorOutputs[findAddressToDelete['errorType']])
+                    continue
+                print(output_address(findAddressToDelete['result']))
+                confirmation = input(outputStrings['CONFIRM_DELETE'])
+                if (not (confirmation.upper() == 'Y')):
+                    logging.debug("The user has cancelled the deletion, so restarting main loop.")
+                    print(outputStrings['CANCEL_DELETE'])
+                    continue
+                addressDelete = controller.delete_address(positionToDelete)
+                if (addressDelete['success']):
+                    logging.debug("The address deletion was a success.")
+                    print(outputStrings['ADDRESS_DELETED'])
+                    print(output_address(addressDelete['result']))
+                else:
+                    logging.warning("The address deletion was a failure. Error info: %s", errorOutputs[addressDelete['errorType']])
+                    print(errorOutputs[addressDelete['errorType']])
+            case '5': # Export address entries to a file
+                logging.debug("The user chose to export the address entries.")
+                fileName = input(outputStrings['CHOOSE_EXPORT_FILE']).strip()
+                if ((not fileName) or (fileName == inputCodes['CANCEL'])):
+                    logging.debug("The user has cancelled the export, so restarting main loop.")
+                    print(outputStrings['CANCEL_EXPORT'])
+                    continue
+                addressExport = exporter.export_addresses(fileName)
+                if (addressExport['success']):
+                    logging.debug("The address export was a success.")
+                    print(outputStrings['ADDRESSES_EXPORTED'], addressExport['result'])
+                else:
+                    logging.warning("The address export was a failure. Error info: %s", errorOutputs[addressExport['errorType']])
+                    print(errorOutputs[addressExport['errorType']])
+            case '6': # Search for address entries by resident name or street
+                logging.debug("The user chose to search the address entries.")
+                searchText = input(outputStrings['CHOOSE_SEARCH_TEXT']).strip()
+                if ((not searchText) or (searchText == inputCodes['CANCEL'])):
+                    logging.debug("The user has cancelled the search, so restarting main loop.")
+                    print(outputStrings['CANCEL_SEARCH'])
+                    continue
+                addressSearch = controller.search_addresses(searchText)
+                if (addressSearch['success']):
+                    logging.debug("The address search was a success.")
+                    for match in addressSearch['result']:
+                        print(outputStrings['MATCH_SCORE'], f"{match['score']:.2f}")
+                        print(output_address(match['address']) + '-' * 50)
+                else:
+                    logging.warning("The address search was a failure. Error info: %s", errorOutputs[addressSearch['errorType']])
+                    print(errorOutputs[addressSearch['errorType']])
+            case '7': # Read address entries one section at a time
+                logging.debug("The user chose to read the address entries one section at a time.")
+                print_sections()
+            case '8': # Show performance statistics
+                logging.debug("The user chose to show the performance statistics.")
+                print_stats()
+            case '9': # Exit program
+                logging.debug("The user chose to exit the program.")
+                exitInput = input(outputStrings['CONFIRM_EXIT'])
+                if (exitInput.strip().upper() == 'Y'):
+                    logging.debug("The user confirmed their choice to exit the program.")
+                    break
+            case _:
+                logging.debug("The user entered an invalid input.")
+                print(errorOutputs['INVALID_INPUT'])
                 continue
-            addressDelete = controller.delete_address(positionToDelete)
-            if (addressDelete['success']):
-                logging.debug("The address deletion was a success.")
-                print(outputStrings['ADDRESS_DELETED'])
-                print(output_address(addressDelete['result']))
-            else:
-                logging.warning(f"The address deletion was a failure. Error info: {errorOutputs[addressDelete['errorType']]}")
-                print(errorOutputs[addressDelete['errorType']])
-        case '5': # Exit program
-            logging.debug("The user chose to exit the program.")
-            exitInput = input(outputStrings['CONFIRM_EXIT'])
-            if (exitInput.strip().upper() == 'Y'):
-                logging.debug("The user confirmed their choice to exit the program.")
-                break
-        case _:
-            logging.debug("The user entered an invalid input.")
-            print(errorOutputs['INVALID_INPUT'])
-            continue
+    except TimeoutError as err: # Another process held the address book for longer than the lock timeout
+        logging.warning("The operation was cancelled since the address book was busy: %s", err)
+        print(errorOutputs['ADDRESS_BOOK_BUSY'])
+controller.close_address_book()
 logging.debug("Program has completed execution.")
\ No newline at end of file